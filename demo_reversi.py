@@ -1,21 +1,14 @@
 """
-The following five lines were added to this previously text-based stdio
+The following four lines were added to this previously text-based stdio
 program. You can play the original program by commenting out the following
-five lines. This demostrates how stdio programs can be converted to Pygcurse
+four lines. This demostrates how stdio programs can be converted to Pygcurse
 programs with minimal effort.
 
 Simplified BSD License, Copyright 2011 Al Sweigart
 """
-import pygcurse
+import pygcurse, sys
 win = pygcurse.PygcurseWindow(50, 25, 'Reversi')
-print = win.pygprint
-input = win.input
-# To get this to work in Python 2, comment the previous two lines and
-# uncomment the following lines: (And also modify the print() calls in the code
-# to get rid of the "end" keyword argument.
-#import sys
-#sys.stdout = win
-#input = win.raw_input
+sys.stdout = sys.stdin = pygcurse.PygcurseTextStream(win) # print() and input() now use the window, which is redrawn once per screenful of output (and before input)
 win.setscreencolors('aqua', 'black', clear=True)
 #===========================================================================
 
@@ -55,9 +55,22 @@ import copy
 import time
 import sys
 import textwrap
+import collections
+import bisect
+import io
 import pygame
 from pygame.locals import *
 
+try:
+    import numpy
+except ImportError:
+    numpy = None # numpy is optional, and only needed for PygcurseSurface objects created with usenumpy=True
+
+if sys.version.startswith('2.'):
+    _unichr = unichr # for Python 2
+else:
+    _unichr = chr # for Python 3 and later
+
 """
 Some nomenclature in this module's comments explained:
 
@@ -89,6 +102,13 @@ Note about flickering: If your program is experiencing a lot of flicker, than yo
 DEFAULTFGCOLOR = pygame.Color(164, 164, 164, 255) # default foreground color is gray (must be a pygame.Color object)
 DEFAULTBGCOLOR = pygame.Color(0, 0, 0, 255) # default background color is black (must be a pygame.Color object)
 ERASECOLOR = pygame.Color(0, 0, 0, 0) # erase color has 0 alpha level (must be a pygame.Color object)
+DEFAULTGLYPHCACHESIZE = 512 # default number of rendered character surfaces each PygcurseSurface keeps around for reuse
+TEXTRUNCACHESIZE = 64 # number of rendered runs of text (see _drawtextrun()) each PygcurseSurface keeps around for reuse, separately from its glyph cache
+DEFAULTATLASCOUNT = 32 # default number of glyph atlases (one per foreground color) each PygcurseSurface keeps around when atlas mode is enabled
+TINTCACHESIZE = 4096 # number of tinted colors remembered by _gettintedcolor() before its cache is emptied
+RUNSCACHESIZE = 4096 # number of distinct color runs that scrollback rows share before the cache is emptied
+CURSORBLINKINTERVAL = 500 # number of milliseconds the blinking input cursor stays shown (and then hidden)
+INPUTCALLBACKFPS = 60 # how many times per second input() calls its callbackfn function if fps isn't given
 
 # Internally used constants:
 _NEW_WINDOW = 'new_window'
@@ -123,6 +143,618 @@ colornames = {'white':   pygame.Color(255, 255, 255),
               'black':   pygame.Color(  0,   0,   0)}
 
 
+class _CellGrid(object):
+    """
+    Stores the state of every cell of a PygcurseSurface object: the character, foreground color, background color, and RGB tint, along with which cells are dirty. This is the default storage, which uses Python lists with one list per row. The colors are stored as pygame.Color objects.
+
+    Cell coordinates passed to these methods must already be on the grid. For the char, fgcolor, and bgcolor arguments, None means "leave it as it is". Every method that changes a cell marks it as dirty.
+    """
+    def __init__(self, width, height, fgcolor, bgcolor):
+        self.width = width
+        self.height = height
+        self.chars = [[None] * width for i in range(height)]
+        self.fgcolors = [[fgcolor] * width for i in range(height)]
+        self.bgcolors = [[bgcolor] * width for i in range(height)]
+        self.rdeltas = [[0] * width for i in range(height)]
+        self.gdeltas = [[0] * width for i in range(height)]
+        self.bdeltas = [[0] * width for i in range(height)]
+        self.dirty = set() # the (x, y) coordinates of the dirty cells
+
+
+    def getcell(self, x, y):
+        """Returns a (char, fgcolor, bgcolor, rdelta, gdelta, bdelta) tuple of the cell at xy."""
+        return self.chars[y][x], self.fgcolors[y][x], self.bgcolors[y][x], self.rdeltas[y][x], self.gdeltas[y][x], self.bdeltas[y][x]
+
+
+    def getchar(self, x, y):
+        return self.chars[y][x]
+
+
+    def setcell(self, x, y, char=None, fgcolor=None, bgcolor=None):
+        if char is not None:
+            self.chars[y][x] = char
+        if fgcolor is not None:
+            self.fgcolors[y][x] = fgcolor
+        if bgcolor is not None:
+            self.bgcolors[y][x] = bgcolor
+        self.dirty.add((x, y))
+
+
+    def settext(self, x, y, text, fgcolor=None, bgcolor=None):
+        """Sets the cells in row y, starting at x, to the characters in text (which must fit in the row) and the given colors."""
+        self.chars[y][x:x + len(text)] = list(text)
+        if fgcolor is not None:
+            self.fgcolors[y][x:x + len(text)] = [fgcolor] * len(text)
+        if bgcolor is not None:
+            self.bgcolors[y][x:x + len(text)] = [bgcolor] * len(text)
+        self.markdirty(x, y, len(text), 1)
+
+
+    def fill(self, x, y, width, height, char=None, fgcolor=None, bgcolor=None):
+        for iy in range(y, y + height):
+            if char is not None:
+                self.chars[iy][x:x + width] = [char] * width
+            if fgcolor is not None:
+                self.fgcolors[iy][x:x + width] = [fgcolor] * width
+            if bgcolor is not None:
+                self.bgcolors[iy][x:x + width] = [bgcolor] * width
+        self.markdirty(x, y, width, height)
+
+
+    def settint(self, x, y, width, height, r, g, b):
+        for iy in range(y, y + height):
+            self.rdeltas[iy][x:x + width] = [r] * width
+            self.gdeltas[iy][x:x + width] = [g] * width
+            self.bdeltas[iy][x:x + width] = [b] * width
+        self.markdirty(x, y, width, height)
+
+
+    def addtint(self, x, y, width, height, r, g, b):
+        """Adds r, g, and b to the tint of the cells in the region. Each tint is kept between -255 and 255."""
+        for iy in range(y, y + height):
+            for deltas, amount in ((self.rdeltas[iy], r), (self.gdeltas[iy], g), (self.bdeltas[iy], b)):
+                if amount:
+                    deltas[x:x + width] = [getwithinrange(delta + amount, min=-255) for delta in deltas[x:x + width]]
+        self.markdirty(x, y, width, height)
+
+
+    def swapcolors(self, x, y, width, height):
+        """Swaps the foreground and background colors of the cells in the region."""
+        for iy in range(y, y + height):
+            self.fgcolors[iy][x:x + width], self.bgcolors[iy][x:x + width] = self.bgcolors[iy][x:x + width], self.fgcolors[iy][x:x + width]
+        self.markdirty(x, y, width, height)
+
+
+    def invertcolors(self, x, y, width, height, fg=True, bg=True):
+        """Inverts the RGB values (but not the alpha) of the foreground and/or background colors of the cells in the region."""
+        for iy in range(y, y + height):
+            for colors, invert in ((self.fgcolors[iy], fg), (self.bgcolors[iy], bg)):
+                if invert:
+                    colors[x:x + width] = [pygame.Color(255 - c.r, 255 - c.g, 255 - c.b, c.a) for c in colors[x:x + width]]
+        self.markdirty(x, y, width, height)
+
+
+    def getrowtext(self, x, y, width, gapchar=' '):
+        """Returns a string of the characters in the row y, starting at x. Erased cells (with a None char) are replaced by gapchar, or left out if gapchar is None."""
+        return ''.join([(char is not None) and char or (gapchar or '') for char in self.chars[y][x:x + width]])
+
+
+    def copyfrom(self, srcgrid, srcx, srcy, dstx, dsty, width, height, chars=True, fgcolors=True, bgcolors=True, rdeltas=True, gdeltas=True, bdeltas=True, copyerased=False):
+        """Copies a region of srcgrid (which can be this grid) to this grid. Erased cells in the source do not overwrite the destination's characters, unless copyerased is True."""
+        # read everything from the source before writing anything, so that overlapping regions of the same grid are copied correctly.
+        if isinstance(srcgrid, _NumpyCellGrid):
+            cells = srcgrid.getcells(srcx, srcy, width, height)
+        else:
+            cells = [[srcgrid.getcell(ix, iy) for ix in range(srcx, srcx + width)] for iy in range(srcy, srcy + height)]
+        for iy in range(height):
+            for ix in range(width):
+                char, fgcolor, bgcolor, rdelta, gdelta, bdelta = cells[iy][ix]
+                x, y = dstx + ix, dsty + iy
+                if chars and (char is not None or copyerased):
+                    self.chars[y][x] = char
+                if fgcolors:
+                    self.fgcolors[y][x] = fgcolor
+                if bgcolors:
+                    self.bgcolors[y][x] = bgcolor
+                if rdeltas:
+                    self.rdeltas[y][x] = rdelta
+                if gdeltas:
+                    self.gdeltas[y][x] = gdelta
+                if bdeltas:
+                    self.bdeltas[y][x] = bdelta
+        self.markdirty(dstx, dsty, width, height)
+
+
+    def encoderow(self, y):
+        """Returns the cells of row y in the compact form stored in the scrollback. See _encoderow()."""
+        return _encoderow(self.chars[y], [int(color) for color in self.fgcolors[y]], [int(color) for color in self.bgcolors[y]], list(zip(self.rdeltas[y], self.gdeltas[y], self.bdeltas[y])))
+
+
+    def decoderow(self, y, row):
+        """Sets the cells of row y from a row returned by encoderow() (which may have come from a grid of a different width)."""
+        chars, fgcolors, bgcolors, tints = _decoderow(row, self.width)
+        self.chars[y][:] = chars
+        self.fgcolors[y][:] = [pygame.Color(color) for color in fgcolors]
+        self.bgcolors[y][:] = [pygame.Color(color) for color in bgcolors]
+        self.rdeltas[y][:] = [tint[0] for tint in tints]
+        self.gdeltas[y][:] = [tint[1] for tint in tints]
+        self.bdeltas[y][:] = [tint[2] for tint in tints]
+        self.markdirty(0, y, self.width, 1)
+
+
+    def scroll(self, char, fgcolor, bgcolor, r, g, b, lines=1):
+        """Moves every row up by lines rows and blanks out the rows at the bottom. The dirty flags move up along with the cells, and the blanked rows are marked as dirty."""
+        # Since each row is its own list, scrolling only moves the row references around; none of the cells are copied.
+        lines = min(lines, self.height)
+        for rows, blank in ((self.chars, char), (self.fgcolors, fgcolor), (self.bgcolors, bgcolor), (self.rdeltas, r), (self.gdeltas, g), (self.bdeltas, b)):
+            for i in range(lines):
+                row = rows.pop(0) # reuse the top row's list for the new bottom row
+                row[:] = [blank] * self.width
+                rows.append(row)
+        self.dirty = set([(x, y - lines) for x, y in self.dirty if y >= lines])
+        self.markdirty(0, self.height - lines, self.width, lines)
+
+
+    def resized(self, width, height, fgcolor, bgcolor, r, g, b):
+        """Returns a new grid of the given size with this grid's cells copied over. Cells that are added take the given colors and tint, and are dirty."""
+        newgrid = self.__class__(width, height, fgcolor, bgcolor)
+        copywidth, copyheight = min(width, self.width), min(height, self.height)
+        newgrid.settint(0, 0, width, height, r, g, b)
+        newgrid.copyfrom(self, 0, 0, 0, 0, copywidth, copyheight)
+        newgrid.dirty = set([(x, y) for x in range(width) for y in range(height) if x >= copywidth or y >= copyheight or (x, y) in self.dirty])
+        return newgrid
+
+
+    def erase(self, x, y, width, height):
+        """Erases the characters of the cells in the region, so that they are drawn transparent (like the cells of a new surface.)"""
+        for iy in range(y, y + height):
+            self.chars[iy][x:x + width] = [None] * width
+        self.markdirty(x, y, width, height)
+
+
+    def compositefrom(self, basegrid, layergrids):
+        """
+        Sets each cell that is dirty in basegrid or in any of the layergrids to how it looks with the layers drawn over basegrid, in order. Those cells are marked clean in the source grids and dirty in this grid. All the grids must be the same size as this one.
+
+        A layer's erased cells (whose character is None) are transparent. A layer's cells with a background color that has 0 alpha (such as ERASECOLOR) only cover the character, foreground color, and tint of the cells below.
+        """
+        changed = basegrid.dirty
+        basegrid.dirty = set()
+        for layergrid in layergrids:
+            changed.update(layergrid.dirty)
+            layergrid.dirty = set()
+
+        for x, y in changed:
+            char, fgcolor, bgcolor = basegrid.chars[y][x], basegrid.fgcolors[y][x], basegrid.bgcolors[y][x]
+            rdelta, gdelta, bdelta = basegrid.rdeltas[y][x], basegrid.gdeltas[y][x], basegrid.bdeltas[y][x]
+            for layergrid in layergrids:
+                if layergrid.chars[y][x] is None:
+                    continue # transparent
+                char, fgcolor = layergrid.chars[y][x], layergrid.fgcolors[y][x]
+                if layergrid.bgcolors[y][x].a:
+                    bgcolor = layergrid.bgcolors[y][x]
+                rdelta, gdelta, bdelta = layergrid.rdeltas[y][x], layergrid.gdeltas[y][x], layergrid.bdeltas[y][x]
+            self.chars[y][x], self.fgcolors[y][x], self.bgcolors[y][x] = char, fgcolor, bgcolor
+            self.rdeltas[y][x], self.gdeltas[y][x], self.bdeltas[y][x] = rdelta, gdelta, bdelta
+        self.dirty.update(changed)
+
+
+    def takedisplayeddirty(self):
+        """Returns a list of (x, y, char, fgcolor, bgcolor) tuples of the dirty cells, sorted row by row, with the colors modified for the cell's tint. All cells are marked as clean."""
+        cells = []
+        for x, y in self.takedirty():
+            rdelta, gdelta, bdelta = self.rdeltas[y][x], self.gdeltas[y][x], self.bdeltas[y][x]
+            if rdelta or gdelta or bdelta:
+                cells.append((x, y, self.chars[y][x], _gettintedcolor(self.fgcolors[y][x], rdelta, gdelta, bdelta), _gettintedcolor(self.bgcolors[y][x], rdelta, gdelta, bdelta)))
+            else:
+                cells.append((x, y, self.chars[y][x], self.fgcolors[y][x], self.bgcolors[y][x]))
+        return cells
+
+
+    def markdirty(self, x, y, width=1, height=1):
+        self.dirty.update([(ix, iy) for iy in range(y, y + height) for ix in range(x, x + width)])
+
+
+    def isdirty(self, x, y):
+        return (x, y) in self.dirty
+
+
+    def markclean(self):
+        """Marks every cell as clean."""
+        self.dirty = set()
+
+
+    def takedirty(self):
+        """Returns a list of the (x, y) coordinates of the dirty cells, sorted row by row, and marks all cells as clean."""
+        cells = sorted(self.dirty, key=_rowmajorkey)
+        self.dirty = set()
+        return cells
+
+
+    def _propgetdirtycount(self):
+        return len(self.dirty)
+
+    dirtycount = property(_propgetdirtycount, None)
+
+
+class _NumpyCellGrid(object):
+    """
+    A version of _CellGrid that stores the cells in NumPy arrays instead of lists of Python objects, which uses much less memory and turns region operations (fill, tint, invert, paste, etc.) into array slice assignments. This requires the numpy module.
+
+    The arrays are indexed with [y, x]. Characters are stored as code points (with -1 for erased cells), colors as packed 0xRRGGBBAA integers (the same as int(pygame.Color)), the tints as int16, and the dirty flags as a bool mask.
+    """
+    def __init__(self, width, height, fgcolor, bgcolor):
+        if numpy is None:
+            raise Exception('The numpy module is required for NumPy cell storage.')
+        self.width = width
+        self.height = height
+        self.chars = numpy.empty((height, width), numpy.int32)
+        self.chars.fill(-1)
+        self.fgcolors = numpy.empty((height, width), numpy.uint32)
+        self.fgcolors.fill(int(fgcolor))
+        self.bgcolors = numpy.empty((height, width), numpy.uint32)
+        self.bgcolors.fill(int(bgcolor))
+        self.rdeltas = numpy.zeros((height, width), numpy.int16)
+        self.gdeltas = numpy.zeros((height, width), numpy.int16)
+        self.bdeltas = numpy.zeros((height, width), numpy.int16)
+        self.dirty = numpy.zeros((height, width), numpy.bool_)
+
+
+    def getcell(self, x, y):
+        char = int(self.chars[y, x])
+        return (char >= 0) and _unichr(char) or None, pygame.Color(int(self.fgcolors[y, x])), pygame.Color(int(self.bgcolors[y, x])), int(self.rdeltas[y, x]), int(self.gdeltas[y, x]), int(self.bdeltas[y, x])
+
+
+    def getcells(self, x, y, width, height):
+        """Returns the cells of the region as a list of rows, where each row is a list of the tuples that getcell() returns. This converts the arrays all at once, which is much faster than calling getcell() for each cell."""
+        colors = {} # cells with the same color share a pygame.Color object, like they do in a _CellGrid
+        region = (slice(y, y + height), slice(x, x + width))
+        rows = []
+        for chars, fgcolors, bgcolors, rdeltas, gdeltas, bdeltas in zip(*[getattr(self, name)[region].tolist() for name in ('chars', 'fgcolors', 'bgcolors', 'rdeltas', 'gdeltas', 'bdeltas')]):
+            row = []
+            for char, fgcolor, bgcolor, rdelta, gdelta, bdelta in zip(chars, fgcolors, bgcolors, rdeltas, gdeltas, bdeltas):
+                if fgcolor not in colors:
+                    colors[fgcolor] = pygame.Color(fgcolor)
+                if bgcolor not in colors:
+                    colors[bgcolor] = pygame.Color(bgcolor)
+                row.append(((char >= 0) and _unichr(char) or None, colors[fgcolor], colors[bgcolor], rdelta, gdelta, bdelta))
+            rows.append(row)
+        return rows
+
+
+    def getchar(self, x, y):
+        char = int(self.chars[y, x])
+        return (char >= 0) and _unichr(char) or None
+
+
+    def setcell(self, x, y, char=None, fgcolor=None, bgcolor=None):
+        if char is not None:
+            self.chars[y, x] = ord(char[0])
+        if fgcolor is not None:
+            self.fgcolors[y, x] = int(fgcolor)
+        if bgcolor is not None:
+            self.bgcolors[y, x] = int(bgcolor)
+        self.dirty[y, x] = True
+
+
+    def settext(self, x, y, text, fgcolor=None, bgcolor=None):
+        """Sets the cells in row y, starting at x, to the characters in text (which must fit in the row) and the given colors."""
+        self.chars[y, x:x + len(text)] = [ord(char) for char in text]
+        if fgcolor is not None:
+            self.fgcolors[y, x:x + len(text)] = int(fgcolor)
+        if bgcolor is not None:
+            self.bgcolors[y, x:x + len(text)] = int(bgcolor)
+        self.dirty[y, x:x + len(text)] = True
+
+
+    def fill(self, x, y, width, height, char=None, fgcolor=None, bgcolor=None):
+        if char is not None:
+            self.chars[y:y + height, x:x + width] = ord(char[0])
+        if fgcolor is not None:
+            self.fgcolors[y:y + height, x:x + width] = int(fgcolor)
+        if bgcolor is not None:
+            self.bgcolors[y:y + height, x:x + width] = int(bgcolor)
+        self.dirty[y:y + height, x:x + width] = True
+
+
+    def settint(self, x, y, width, height, r, g, b):
+        self.rdeltas[y:y + height, x:x + width] = r
+        self.gdeltas[y:y + height, x:x + width] = g
+        self.bdeltas[y:y + height, x:x + width] = b
+        self.dirty[y:y + height, x:x + width] = True
+
+
+    def addtint(self, x, y, width, height, r, g, b):
+        """Adds r, g, and b to the tint of the cells in the region. Each tint is kept between -255 and 255."""
+        for deltas, amount in ((self.rdeltas, r), (self.gdeltas, g), (self.bdeltas, b)):
+            if amount:
+                region = deltas[y:y + height, x:x + width]
+                region[...] = numpy.clip(region.astype(numpy.int32) + amount, -255, 255)
+        self.dirty[y:y + height, x:x + width] = True
+
+
+    def swapcolors(self, x, y, width, height):
+        """Swaps the foreground and background colors of the cells in the region."""
+        fgcolors = self.fgcolors[y:y + height, x:x + width].copy()
+        self.fgcolors[y:y + height, x:x + width] = self.bgcolors[y:y + height, x:x + width]
+        self.bgcolors[y:y + height, x:x + width] = fgcolors
+        self.dirty[y:y + height, x:x + width] = True
+
+
+    def invertcolors(self, x, y, width, height, fg=True, bg=True):
+        """Inverts the RGB values (but not the alpha) of the foreground and/or background colors of the cells in the region."""
+        if fg:
+            self.fgcolors[y:y + height, x:x + width] ^= 0xFFFFFF00
+        if bg:
+            self.bgcolors[y:y + height, x:x + width] ^= 0xFFFFFF00
+        self.dirty[y:y + height, x:x + width] = True
+
+
+    def getrowtext(self, x, y, width, gapchar=' '):
+        """Returns a string of the characters in the row y, starting at x. Erased cells (with a None char) are replaced by gapchar, or left out if gapchar is None."""
+        return ''.join([(char >= 0) and _unichr(char) or (gapchar or '') for char in self.chars[y, x:x + width].tolist()])
+
+
+    def copyfrom(self, srcgrid, srcx, srcy, dstx, dsty, width, height, chars=True, fgcolors=True, bgcolors=True, rdeltas=True, gdeltas=True, bdeltas=True, copyerased=False):
+        """Copies a region of srcgrid (which can be this grid) to this grid. Erased cells in the source do not overwrite the destination's characters, unless copyerased is True."""
+        while isinstance(srcgrid, _CellGridView):
+            # copy straight from the arrays of the grid the view is a region of
+            srcgrid, srcx, srcy = srcgrid.grid, srcgrid.x + srcx, srcgrid.y + srcy
+        if not isinstance(srcgrid, _NumpyCellGrid):
+            srcgrid = _NumpyCellGrid.fromgrid(srcgrid, srcx, srcy, width, height)
+            srcx, srcy = 0, 0
+        src = (slice(srcy, srcy + height), slice(srcx, srcx + width))
+        dst = (slice(dsty, dsty + height), slice(dstx, dstx + width))
+        if chars:
+            srcchars = srcgrid.chars[src]
+            if copyerased:
+                self.chars[dst] = srcchars.copy()
+            else:
+                self.chars[dst] = numpy.where(srcchars >= 0, srcchars, self.chars[dst]) # numpy.where makes a new array, so overlapping regions are fine
+        for copy, name in ((fgcolors, 'fgcolors'), (bgcolors, 'bgcolors'), (rdeltas, 'rdeltas'), (gdeltas, 'gdeltas'), (bdeltas, 'bdeltas')):
+            if copy:
+                getattr(self, name)[dst] = getattr(srcgrid, name)[src].copy()
+        self.dirty[dst] = True
+
+
+    def fromgrid(grid, x, y, width, height):
+        """Returns a new _NumpyCellGrid with a copy of a region of any kind of cell grid."""
+        newgrid = _NumpyCellGrid(width, height, DEFAULTFGCOLOR, DEFAULTBGCOLOR)
+        for iy in range(height):
+            for ix in range(width):
+                char, fgcolor, bgcolor, rdelta, gdelta, bdelta = grid.getcell(x + ix, y + iy)
+                newgrid.chars[iy, ix] = (char is None) and -1 or ord(char[0])
+                newgrid.fgcolors[iy, ix] = int(fgcolor)
+                newgrid.bgcolors[iy, ix] = int(bgcolor)
+                newgrid.rdeltas[iy, ix] = rdelta
+                newgrid.gdeltas[iy, ix] = gdelta
+                newgrid.bdeltas[iy, ix] = bdelta
+        return newgrid
+    fromgrid = staticmethod(fromgrid)
+
+
+    def encoderow(self, y):
+        """Returns the cells of row y in the compact form stored in the scrollback. See _encoderow()."""
+        chars = [(char >= 0) and _unichr(char) or None for char in self.chars[y].tolist()]
+        return _encoderow(chars, self.fgcolors[y].tolist(), self.bgcolors[y].tolist(), list(zip(self.rdeltas[y].tolist(), self.gdeltas[y].tolist(), self.bdeltas[y].tolist())))
+
+
+    def decoderow(self, y, row):
+        """Sets the cells of row y from a row returned by encoderow() (which may have come from a grid of a different width)."""
+        chars, fgcolors, bgcolors, tints = _decoderow(row, self.width)
+        self.chars[y] = [(char is None) and -1 or ord(char) for char in chars]
+        self.fgcolors[y] = fgcolors
+        self.bgcolors[y] = bgcolors
+        self.rdeltas[y] = [tint[0] for tint in tints]
+        self.gdeltas[y] = [tint[1] for tint in tints]
+        self.bdeltas[y] = [tint[2] for tint in tints]
+        self.dirty[y] = True
+
+
+    def scroll(self, char, fgcolor, bgcolor, r, g, b, lines=1):
+        """Moves every row up by lines rows and blanks out the rows at the bottom. The dirty flags move up along with the cells, and the blanked rows are marked as dirty."""
+        lines = min(lines, self.height)
+        for array in (self.chars, self.fgcolors, self.bgcolors, self.rdeltas, self.gdeltas, self.bdeltas, self.dirty):
+            array[:self.height - lines] = array[lines:]
+        self.fill(0, self.height - lines, self.width, lines, char, fgcolor, bgcolor)
+        self.settint(0, self.height - lines, self.width, lines, r, g, b)
+
+
+    def resized(self, width, height, fgcolor, bgcolor, r, g, b):
+        """Returns a new grid of the given size with this grid's cells copied over. Cells that are added take the given colors and tint, and are dirty."""
+        newgrid = _NumpyCellGrid(width, height, fgcolor, bgcolor)
+        copywidth, copyheight = min(width, self.width), min(height, self.height)
+        newgrid.settint(0, 0, width, height, r, g, b)
+        newgrid.copyfrom(self, 0, 0, 0, 0, copywidth, copyheight)
+        newgrid.dirty[:copyheight, :copywidth] = self.dirty[:copyheight, :copywidth]
+        return newgrid
+
+
+    def erase(self, x, y, width, height):
+        """Erases the characters of the cells in the region, so that they are drawn transparent (like the cells of a new surface.)"""
+        self.chars[y:y + height, x:x + width] = -1
+        self.dirty[y:y + height, x:x + width] = True
+
+
+    def compositefrom(self, basegrid, layergrids):
+        """
+        Sets each cell that is dirty in basegrid or in any of the layergrids to how it looks with the layers drawn over basegrid, in order. Those cells are marked clean in the source grids and dirty in this grid. All the grids must be the same size as this one.
+
+        A layer's erased cells (whose character is None) are transparent. A layer's cells with a background color that has 0 alpha (such as ERASECOLOR) only cover the character, foreground color, and tint of the cells below.
+        """
+        changed = basegrid.dirty.copy()
+        basegrid.dirty[...] = False
+        for layergrid in layergrids:
+            changed |= layergrid.dirty
+            layergrid.dirty[...] = False
+        ys, xs = numpy.nonzero(changed)
+        if len(xs) == 0:
+            return
+
+        # all of the changed cells are composited at once, one layer at a time
+        names = ('chars', 'fgcolors', 'bgcolors', 'rdeltas', 'gdeltas', 'bdeltas')
+        values = dict([(name, getattr(basegrid, name)[ys, xs]) for name in names])
+        for layergrid in layergrids:
+            drawn = layergrid.chars[ys, xs] >= 0
+            for name in names:
+                layervalues = getattr(layergrid, name)[ys, xs]
+                if name == 'bgcolors':
+                    values[name] = numpy.where(drawn & ((layervalues & 0xFF) != 0), layervalues, values[name]) # the alpha is the low byte
+                else:
+                    values[name] = numpy.where(drawn, layervalues, values[name])
+        for name in names:
+            getattr(self, name)[ys, xs] = values[name]
+        self.dirty |= changed
+
+
+    def takedisplayeddirty(self):
+        """Returns a list of (x, y, char, fgcolor, bgcolor) tuples of the dirty cells, sorted row by row, with the colors modified for the cell's tint. All cells are marked as clean. The colors are returned as (r, g, b, a) tuples."""
+        ys, xs = numpy.nonzero(self.dirty)
+        self.dirty[...] = False
+        if len(xs) == 0:
+            return []
+
+        # The tints of all the dirty cells are applied at once: the packed colors are split into an (n, 4) array of channels, the tints are added, and the results are clamped.
+        tints = numpy.zeros((len(xs), 4), numpy.int32)
+        tints[:, 0] = self.rdeltas[ys, xs]
+        tints[:, 1] = self.gdeltas[ys, xs]
+        tints[:, 2] = self.bdeltas[ys, xs]
+        shifts = numpy.array([24, 16, 8, 0], numpy.uint32)
+        fgcolors = numpy.clip(((self.fgcolors[ys, xs][:, None] >> shifts) & 0xFF).astype(numpy.int32) + tints, 0, 255)
+        bgcolors = numpy.clip(((self.bgcolors[ys, xs][:, None] >> shifts) & 0xFF).astype(numpy.int32) + tints, 0, 255)
+
+        chars = [(char >= 0) and _unichr(char) or None for char in self.chars[ys, xs].tolist()]
+        return list(zip(xs.tolist(), ys.tolist(), chars, map(tuple, fgcolors.tolist()), map(tuple, bgcolors.tolist())))
+
+
+    def markdirty(self, x, y, width=1, height=1):
+        self.dirty[y:y + height, x:x + width] = True
+
+
+    def isdirty(self, x, y):
+        return bool(self.dirty[y, x])
+
+
+    def markclean(self):
+        """Marks every cell as clean."""
+        self.dirty.fill(False)
+
+
+    def takedirty(self):
+        """Returns a list of the (x, y) coordinates of the dirty cells, sorted row by row, and marks all cells as clean."""
+        ys, xs = numpy.nonzero(self.dirty) # nonzero() returns the coordinates in row-major order
+        self.dirty[...] = False
+        return list(zip(xs.tolist(), ys.tolist()))
+
+
+    def _propgetdirtycount(self):
+        return int(numpy.count_nonzero(self.dirty))
+
+    dirtycount = property(_propgetdirtycount, None)
+
+
+class _CellGridView(object):
+    """
+    A region of another PygcurseSurface object's cells, used as the cell storage of a PygcurseSubsurface. It has the same drawing methods as _CellGrid, but with coordinates relative to the top-left corner of the region, and every change goes straight to the cells (and dirty flags) of the surface. Nothing is copied.
+
+    The surface's grid is looked up on every call, so the view still works after the surface replaces its grid (as resize() does), as long as the region is still on the surface.
+    """
+    def __init__(self, pygsurf, x, y, width, height):
+        self._pygsurf = pygsurf
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+
+    def _propgetgrid(self):
+        return self._pygsurf._cells
+
+
+    def getcell(self, x, y):
+        return self.grid.getcell(self.x + x, self.y + y)
+
+
+    def getchar(self, x, y):
+        return self.grid.getchar(self.x + x, self.y + y)
+
+
+    def setcell(self, x, y, char=None, fgcolor=None, bgcolor=None):
+        self.grid.setcell(self.x + x, self.y + y, char, fgcolor, bgcolor)
+
+
+    def settext(self, x, y, text, fgcolor=None, bgcolor=None):
+        self.grid.settext(self.x + x, self.y + y, text, fgcolor, bgcolor)
+
+
+    def fill(self, x, y, width, height, char=None, fgcolor=None, bgcolor=None):
+        self.grid.fill(self.x + x, self.y + y, width, height, char, fgcolor, bgcolor)
+
+
+    def settint(self, x, y, width, height, r, g, b):
+        self.grid.settint(self.x + x, self.y + y, width, height, r, g, b)
+
+
+    def addtint(self, x, y, width, height, r, g, b):
+        self.grid.addtint(self.x + x, self.y + y, width, height, r, g, b)
+
+
+    def swapcolors(self, x, y, width, height):
+        self.grid.swapcolors(self.x + x, self.y + y, width, height)
+
+
+    def invertcolors(self, x, y, width, height, fg=True, bg=True):
+        self.grid.invertcolors(self.x + x, self.y + y, width, height, fg, bg)
+
+
+    def getrowtext(self, x, y, width, gapchar=' '):
+        return self.grid.getrowtext(self.x + x, self.y + y, width, gapchar)
+
+
+    def copyfrom(self, srcgrid, srcx, srcy, dstx, dsty, width, height, chars=True, fgcolors=True, bgcolors=True, rdeltas=True, gdeltas=True, bdeltas=True, copyerased=False):
+        self.grid.copyfrom(srcgrid, srcx, srcy, self.x + dstx, self.y + dsty, width, height, chars, fgcolors, bgcolors, rdeltas, gdeltas, bdeltas, copyerased)
+
+
+    def erase(self, x, y, width, height):
+        self.grid.erase(self.x + x, self.y + y, width, height)
+
+
+    def scroll(self, char, fgcolor, bgcolor, r, g, b, lines=1):
+        """Moves every row of the region up by lines rows and blanks out the rows at the bottom. Unlike the other grids, the scrolled cells are copied (the rows are shared with the rest of the surface) and all of them are marked as dirty."""
+        lines = min(lines, self.height)
+        grid = self.grid
+        if lines < self.height:
+            grid.copyfrom(grid, self.x, self.y + lines, self.x, self.y, self.width, self.height - lines, copyerased=True)
+        grid.fill(self.x, self.y + self.height - lines, self.width, lines, char, fgcolor, bgcolor)
+        grid.settint(self.x, self.y + self.height - lines, self.width, lines, r, g, b)
+
+
+    def markdirty(self, x, y, width=1, height=1):
+        self.grid.markdirty(self.x + x, self.y + y, width, height)
+
+
+    def isdirty(self, x, y):
+        return self.grid.isdirty(self.x + x, self.y + y)
+
+    grid = property(_propgetgrid, None) # the cell grid of the surface this is a view of
+
+
+class _UpdateBatch(object):
+    """The context manager returned by PygcurseSurface.batch()."""
+    def __init__(self, pygsurf):
+        self.pygsurf = pygsurf
+
+
+    def __enter__(self):
+        self.pygsurf._beginbatch()
+        return self.pygsurf
+
+
+    def __exit__(self, exctype, excvalue, traceback):
+        self.pygsurf._endbatch()
+        return False # don't suppress exceptions
+
+
 class PygcurseSurface(object):
 
     """
@@ -136,7 +768,7 @@ class PygcurseSurface(object):
     """
     _pygcurseClass = 'PygcurseSurface'
 
-    def __init__(self, width=24, height=18, font=None, fgcolor=DEFAULTFGCOLOR, bgcolor=DEFAULTBGCOLOR, windowsurface=None):
+    def __init__(self, width=24, height=18, font=None, fgcolor=DEFAULTFGCOLOR, bgcolor=DEFAULTBGCOLOR, windowsurface=None, usenumpy=False):
         """
         Creates a new PygcurseSurface object.
 
@@ -145,6 +777,7 @@ class PygcurseSurface(object):
         - fgcolor is the foreground color  (ie the color of the text). It is set to either a pygame.Color object, an RGB tuple, an RGBA tuple, or a string that is a key in the colornames dict.
         - bgcolor is the background color of the text.
         - windowSurface is optional. If None, than the user is responsible for calling the update() method on this object and blitting it's surface to the screen, and calling pygame.display.update(). If a pygame.Surface object is specified, then PygcurseSurface object handles updating automatically (unless disabled). (See the update() method for more details.)
+        - usenumpy, if True, stores the cells in NumPy arrays instead of Python lists. This uses far less memory for large surfaces and makes operations on regions of cells (fill(), tint(), paste(), etc.) much faster, but requires the numpy module.
         """
         pygame.init()
         self._cursorx = 0
@@ -153,30 +786,35 @@ class PygcurseSurface(object):
         self._width = width
         self._height = height
 
-        # The self._screen* members are 2D lists that store data for each cell of the PygcurseSurface object. _screenchar[x][y] holds the character at cell x, y. _screenfgcolor and _screenbgcolor  stores the foreground/background color of the cell, etc.
-        self._screenchar = [[None] * height for i in range(width)]
-
         # intialize the foreground and background colors of each cell
-        self._fgcolor = fgcolor
-        self._bgcolor = bgcolor
-        # make sure the values in _screenfgcolor and _screenbgcolor are always pygame.Color objects, and not RGB/RGBA tuples or color strings like 'blue'. Use getpygamecolor().
-        self._screenfgcolor = [[None] * height for i in range(width)]
-        self._screenbgcolor = [[None] * height for i in range(width)]
-        for x in range(width):
-            for y in range(height):
-                self._screenfgcolor[x][y] = fgcolor
-                self._screenbgcolor[x][y] = bgcolor
-
-        # intialize the dirty flag for each cell to True. If the cell's dirty flag is True, then update() needs to update this cell on the self._surfaceobj pygame.Surface object.
-        self._screendirty = [[True] * height for i in range(width)]
-
-        # initalize the tinting of each cell to 0. (255 is max, -255 is minimum)
+        # make sure the colors stored for each cell are always pygame.Color objects, and not RGB/RGBA tuples or color strings like 'blue'. Use getpygamecolor().
+        self._fgcolor = getpygamecolor(fgcolor)
+        self._bgcolor = getpygamecolor(bgcolor)
+
+        # The scrollback holds the rows that have scrolled off the top of the surface (oldest first), encoded with _encoderow(). It is None when the scrollback is turned off (which is the default).
+        # When _scrollbackoffset is more than 0, the surface displays an older part of the history: _viewcells is a separate cell grid holding the rows being viewed, and update() draws it instead of self._cells. Drawing functions still change self._cells as usual.
+        self._scrollback = None
+        self._scrollbackoffset = 0
+        self._viewcells = None
+
+        # _layers is a list of the PygcurseLayer objects drawn over the surface's cells, from the bottom one to the top one (see addlayer()). When there are layers, update() draws _compositecells, a cell grid of what the cells look like with the layers drawn over them. It is only composited again where the cells or the layers changed.
+        self._layers = []
+        self._compositecells = None
+
+        # self._cells stores the data for each cell of the PygcurseSurface object: the character, foreground/background color, and tint. It also tracks which cells are "dirty", meaning update() needs to redraw them on the self._surfaceobj pygame.Surface object. Every cell starts off dirty.
+        if usenumpy:
+            self._cells = _NumpyCellGrid(width, height, getpygamecolor(fgcolor), getpygamecolor(bgcolor))
+        else:
+            self._cells = _CellGrid(width, height, getpygamecolor(fgcolor), getpygamecolor(bgcolor))
+        self._markalldirty()
+
+        # _frontbuffer[x][y] holds what is currently drawn for the cell on the self._surfaceobj pygame.Surface object, as a (char, displayed fgcolor, displayed bgcolor) tuple (the colors are RGBA tuples, with the tint already applied). None means the cell's pixels are unknown. self._cells is the "back buffer" that all the drawing methods write to, and update() only repaints the dirty cells whose back buffer state differs from the front buffer. This way, redrawing the entire screen every frame with the same content costs very little.
+        self._frontbuffer = [[None] * height for i in range(width)]
+
+        # the tint given to new cells (such as rows added by scrolling). (255 is max, -255 is minimum)
         self._rdelta = 0
         self._gdelta = 0
         self._bdelta = 0
-        self._screenRdelta = [[0] * height for i in range(width)]
-        self._screenGdelta = [[0] * height for i in range(width)]
-        self._screenBdelta = [[0] * height for i in range(width)]
 
         # The "input cursor" is a separate cursor used by the input() method (and PygcurseInput objects). It tracks where the typed characters should appear. This is separate from the regular cursor which tracks where print() and putchar() should output characters. The mode can be:
         # - None, meaning there is no visible cursor
@@ -188,6 +826,7 @@ class PygcurseSurface(object):
         self.inputcursorblinking = True
         self._inputcursorx = 0
         self._inputcursory = 0
+        self._drawncursor = None # the (x, y, mode) of the input cursor currently drawn on the surface, or None if it isn't drawn (see _drawinputcursor())
 
         self._scrollcount = 0 # the number of times writing text to the bottom row has scrolled the screen up a line.
 
@@ -198,8 +837,28 @@ class PygcurseSurface(object):
 
         # the width and height in pixels of each cell depends on the font used.
         self._cellwidth, self._cellheight = calcfontsize(self._font) # width and height of each cell in pixels
+        self._monofont = _ismonofont(self._font)
+        self._runrendering = True # if True (and the font is monospaced), runs of same-colored characters are rendered with a single font.render() call
+
+        # The glyph cache holds the pygame.Surface objects returned by font.render() so that the same character in the same colors isn't rendered again every time a cell is redrawn. It is keyed by (char, fgcolor, bgcolor, antialias) and the least recently used glyph is thrown out when the cache is full.
+        self._antialias = True
+        self._glyphcache = collections.OrderedDict()
+        self._glyphcachesize = DEFAULTGLYPHCACHESIZE
+        self._textruncache = collections.OrderedDict() # rendered runs of text, keyed the same way (see _gettextrun())
+        self._glyphcachehits = 0
+        self._glyphcachemisses = 0
+
+        # In atlas mode, the printable ASCII characters are prerendered (once per foreground color) into a strip called an atlas, with one cell-sized slot per character. Cells are then drawn by filling in the background and blitting the character's slot from the atlas, so font.render() isn't called at all once the atlas exists.
+        self._atlasmode = False
+        self._atlases = collections.OrderedDict() # keys are (fgcolor, antialias) tuples, values are pygame.Surface objects
+        self._atlascount = DEFAULTATLASCOUNT
+
+        # In bg array mode, the backgrounds of all the repainted cells are written to the pixels of the surface with a single NumPy array assignment instead of with one fill() call per rectangle of cells. This requires the numpy module.
+        self._bgarraymode = False
 
         self._autoupdate = True
+        self._batchdepth = 0 # how many batch() blocks are currently entered
+        self._batchautoupdate = None # the autoupdate setting to restore when the outermost batch() block is exited
         if windowsurface == _NEW_WINDOW:
             self._windowsurface = pygame.display.set_mode((320,240))
             self._managesdisplay = True
@@ -211,6 +870,8 @@ class PygcurseSurface(object):
             self._managesdisplay = False
         self._autodisplayupdate = self._windowsurface is not None
         self._autoblit = self._windowsurface is not None
+        self._fullblitneeded = True # when True, the next update() blits the entire surface to the window surface instead of just the dirty areas
+        self._pendingrects = [] # pixel rects drawn on directly (outside of update()'s cell loop) that still need to be blitted to the window surface
 
         self._tabsize = 8 # how many spaces a tab inserts.
 
@@ -235,35 +896,43 @@ class PygcurseSurface(object):
         - promptfgcolor and promptbgcolor are the foreground and background colors of the prompt.
         - whitelistchars is a string of the characters that are allowed to be entered from the keyboard. If None, then all characters (except those in the blacklist, if one is specified) are allowed.
         - blacklistchars is a string of the characters that are prohibited to be entered from the keyboard. If None, then all characters (if they are in the whitelist, if one is specified) are allowed.
-        - callbackfn is a function that is called during the input() method's loop. This can be used for any additional code that needs to be run while waiting for the user to enter text.
-        - fps specifies how many times per second this function should update the screen (ie, frames per second). If left at None, then input() will simply try to update as fast as possible.
+        - callbackfn is a function that is called during the input() method's loop. This can be used for any additional code that needs to be run while waiting for the user to enter text. It is called once per frame (see fps), and also whenever a key is pressed.
+        - fps specifies how many times per second this function should update the screen (ie, frames per second). If left at None, then input() sleeps until a key is pressed or the cursor blinks, and only updates the screen then, unless a callbackfn is given, in which case the frame rate is INPUTCALLBACKFPS (60).
         """
-        if fps is not None:
-            clock = pygame.time.Clock()
-
         inputObj = PygcurseInput(self, prompt, x, y, maxlength, fgcolor, bgcolor, promptfgcolor, promptbgcolor, whitelistchars, blacklistchars)
         self.inputcursor = inputObj.startx, inputObj.starty
+        if fps is None and callbackfn is not None:
+            fps = INPUTCALLBACKFPS # the callback still has to run while no keys are being pressed
+        redraw = True # the prompt and typed text are only rewritten when a key event changed them (or the surface scrolled)
 
         while True: # the event loop
             self._inputcursormode = inputObj.insertMode and 'insert' or 'underline'
 
-            for event in pygame.event.get((KEYDOWN, KEYUP, QUIT)): # TODO - handle holding down the keys
+            if callbackfn is not None:
+                callbackfn()
+
+            if redraw or inputObj.lastScrollCount < self._scrollcount:
+                inputObj.update()
+                redraw = False
+            self.update() # if nothing changed, this only redraws the cursor's cell when it blinks
+
+            # sleep until a key is pressed, the cursor blinks, or the next frame is due (if fps was given)
+            wakeat = None
+            if self.inputcursorblinking:
+                wakeat = pygame.time.get_ticks() + _cursorblinkphase()[1] + 1 # (a millisecond late, so the phase has surely flipped when it wakes)
+            if fps is not None:
+                frameat = pygame.time.get_ticks() + int(1000 / fps)
+                wakeat = min(wakeat or frameat, frameat)
+
+            for event in _waitforevents((KEYDOWN, KEYUP, QUIT), wakeat): # TODO - handle holding down the keys
                 if event.type == QUIT:
                     pygame.quit()
                     sys.exit()
                 elif event.type in (KEYDOWN, KEYUP):
                     inputObj.sendkeyevent(event)
+                    redraw = True
                     if inputObj.done:
-                        return ''.join(inputObj.buffer)
-
-            if callbackfn is not None:
-                callbackfn()
-
-            inputObj.update()
-            self.update()
-
-            if fps is not None:
-                clock.tick(fps)
+                        return inputObj.text
 
     raw_input = input
 
@@ -354,103 +1023,233 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
                 (Enabled by setting self._windowsurface to the main window AND self._autoblit == True)
             3) Calling pygame.display.update()
                 (Enabled by default if _windowsurface is set, self._autoblit == True, AND if _autodisplayupdate == True)
-        """
 
-        # TODO - None of this code is optimized yet.
+        Only the dirty cells are redrawn, and only the areas that were redrawn are blitted to the window surface and passed to pygame.display.update().
 
-        # "Dirty" means that the cell's state has been altered on the backend and it needs to be redrawn on pygame.Surface object (which will make the cell "clean").
-        for x in range(self._width):
-            for y in range(self._height):
-                if self._screendirty[x][y]: # draw to surfaceobj all the dirty cells.
-                    self._screendirty[x][y] = False
+        Returns a list of pygame.Rect objects of the areas (in pixel coordinates) of the surface that were redrawn. Rects of adjacent areas are merged together.
+        """
 
-                    # modify the fg and bg color if there is a tint
-                    cellfgcolor, cellbgcolor = self.getdisplayedcolors(x, y)
+        # "Dirty" means that the cell's state has been altered on the backend and it needs to be redrawn on pygame.Surface object (which will make the cell "clean"). Only the dirty cells are looked at, so an update() with nothing to redraw costs next to nothing.
+        # Each horizontal run of dirty cells in a row is recorded as an (x, y, width, None) span so that the repainted area can be reported as a few rects instead of one per cell.
+        # The backgrounds are painted first, with neighboring dirty cells that share a background color merged into as few rects as possible. Then the characters are drawn on top, in runs of same-colored cells.
+        dirtyspans = []
+        bgspans = [] # list of [x, y, width, bgcolor] for each horizontal run of dirty cells with the same background color
+        textruns = [] # list of [x, y, list of chars, fgcolor, bgcolor] for each run of same-colored cells
+        frontbuffer = self._frontbuffer # syntactic sugar
+        cells = self._displayedcells()
+        for x, y, char, cellfgcolor, cellbgcolor in cells.takedisplayeddirty(): # draw to surfaceobj all the dirty cells (the colors are already modified for the tint).
+            if char is None:
+                cellbgcolor = ERASECOLOR
+                cellstate = (None, None, tuple(ERASECOLOR))
+            else:
+                cellstate = (char, tuple(cellfgcolor), tuple(cellbgcolor))
+            if frontbuffer[x][y] == cellstate:
+                continue # the cell is already drawn this way, so there's no need to repaint it.
+            frontbuffer[x][y] = cellstate
 
-                    # fill in the entire background of the cell
-                    cellrect = pygame.Rect(self._cellwidth * x, self._cellheight * y, self._cellwidth, self._cellheight)
+            if dirtyspans and dirtyspans[-1][1] == y and dirtyspans[-1][0] + dirtyspans[-1][2] == x:
+                dirtyspans[-1][2] += 1
+            else:
+                dirtyspans.append([x, y, 1, None])
 
-                    if self._screenchar[x][y] is None:
-                        self._surfaceobj.fill(ERASECOLOR, cellrect)
-                        continue
+            if bgspans and bgspans[-1][1] == y and bgspans[-1][0] + bgspans[-1][2] == x and bgspans[-1][3] == cellbgcolor:
+                bgspans[-1][2] += 1
+            else:
+                bgspans.append([x, y, 1, cellbgcolor])
 
-                    self._surfaceobj.fill(cellbgcolor, cellrect)
+            if char is None:
+                continue
 
-                    if self._screenchar[x][y] == ' ':
-                        continue # don't need to render anything if it is just a space character.
+            # Group neighboring cells with the same displayed colors into text runs, so each run can be drawn with a single blit.
+            if textruns and textruns[-1][1] == y and textruns[-1][0] + len(textruns[-1][2]) == x and textruns[-1][3] == cellfgcolor and textruns[-1][4] == cellbgcolor:
+                textruns[-1][2].append(char)
+            else:
+                textruns.append([x, y, [char], cellfgcolor, cellbgcolor])
 
-                    # render the character and draw it to the surface
-                    charsurf = self._font.render(self._screenchar[x][y], 1, cellfgcolor, cellbgcolor)
-                    charrect = charsurf.get_rect()
-                    charrect.centerx = self._cellwidth * x + int(self._cellwidth / 2)
-                    charrect.bottom = self._cellheight * (y + 1) # TODO - not correct, this would put stuff like g, p, q higher than normal.
-                    self._surfaceobj.blit(charsurf, charrect)
+        if self._bgarraymode:
+            self._drawbgarray(bgspans)
+        else:
+            for x, y, width, height, bgcolor in self._mergecellspans(bgspans):
+                self._surfaceobj.fill(bgcolor, (self._cellwidth * x, self._cellheight * y, self._cellwidth * width, self._cellheight * height))
+        for x, y, chars, runfgcolor, runbgcolor in textruns:
+            self._drawtextrun(''.join(chars), x, y, runfgcolor, runbgcolor)
 
         self._drawinputcursor()
 
+        updatedrects = [pygame.Rect(self._cellwidth * x, self._cellheight * y, self._cellwidth * width, self._cellheight * height) for x, y, width, height, key in self._mergecellspans(dirtyspans)]
+        for rect in self._pendingrects:
+            # add the areas that were drawn on directly (such as the input cursor) unless they are already covered.
+            if not any(updatedrect.contains(rect) for updatedrect in updatedrects):
+                updatedrects.append(rect)
+        self._pendingrects = []
+
         # automatically blit to "window surface" pygame.Surface object if it was set.
         if self._windowsurface is not None and self._autoblit:
-            self._windowsurface.blit(self._surfaceobj, self._surfaceobj.get_rect())
-            if self._autodisplayupdate:
-                pygame.display.update()
+            if self._fullblitneeded:
+                # the window surface was replaced (or autoblit was just turned on), so the whole surface needs to be copied over.
+                self._fullblitneeded = False
+                blitrects = [self._surfaceobj.get_rect()]
+            else:
+                blitrects = updatedrects
+            if blitrects:
+                for rect in blitrects:
+                    self._windowsurface.blit(self._surfaceobj, rect, rect)
+                if self._autodisplayupdate:
+                    pygame.display.update(blitrects)
+
+        return updatedrects
+
+
+    def _displayedcells(self):
+        """Returns the cell grid that update() draws, after bringing it up to date: the rows of the scrollback history being viewed, or the cells with the layers composited over them, or else self._cells. Anything that paints cells outside of update() must paint them from this grid, or it would record the wrong state in the front buffer."""
+        if self._scrollbackoffset:
+            self._refreshview()
+            return self._viewcells
+        elif self._layers:
+            self._compositecells.compositefrom(self._cells, [layer._cells for layer in self._layers if layer._visible])
+            return self._compositecells
+        return self._cells
+
+
+    def _drawbgarray(self, bgspans):
+        """
+        Paints the backgrounds of the cells in bgspans (a row-sorted list of [x, y, width, bgcolor] spans) onto self._surfaceobj with NumPy. An array with one color per cell is built for the rectangle of cells that holds all the spans, each cell's color is repeated over the cell's pixels, and then the pixels of the cells in the spans are written to the surface in one go.
+        """
+        if not bgspans:
+            return
+        xs, ys, widths, colors = zip(*bgspans)
+        xs, ys, widths = numpy.array(xs), numpy.array(ys), numpy.array(widths)
+        left, right = xs.min(), (xs + widths).max()
+        top, bottom = ys[0], ys[-1] + 1
+
+        # expand the spans into the coordinates of each of their cells, so that all the cells can be set with a single assignment.
+        starts = numpy.cumsum(widths) - widths # the index of each span's first cell in the list of cells
+        cellxs = numpy.repeat(xs - starts - left, widths) + numpy.arange(widths.sum())
+        cellys = numpy.repeat(ys - top, widths)
+
+        # convert the colors to the surface's pixel format, so that each pixel is written as one integer.
+        colors = numpy.array([tuple(color) for color in colors], numpy.uint32)
+        mappedcolors = numpy.zeros(len(bgspans), numpy.uint32)
+        for channel, shift, loss in zip(range(4), self._surfaceobj.get_shifts(), self._surfaceobj.get_losses()):
+            mappedcolors |= (colors[:, channel] >> loss) << shift
+
+        # these arrays are indexed with [x, y] to match pygame.surfarray.
+        cellcolors = numpy.zeros((right - left, bottom - top), numpy.uint32)
+        cellmask = numpy.zeros((right - left, bottom - top), numpy.bool_)
+        cellcolors[cellxs, cellys] = numpy.repeat(mappedcolors, widths)
+        cellmask[cellxs, cellys] = True
+        pixelcolors = cellcolors.repeat(self._cellwidth, 0).repeat(self._cellheight, 1)
+
+        area = self._surfaceobj.subsurface((self._cellwidth * left, self._cellheight * top, self._cellwidth * (right - left), self._cellheight * (bottom - top)))
+        pixels = pygame.surfarray.pixels2d(area)
+        if cellmask.all():
+            pixels[...] = pixelcolors
+        else:
+            pixelmask = cellmask.repeat(self._cellwidth, 0).repeat(self._cellheight, 1)
+            pixels[pixelmask] = pixelcolors[pixelmask]
+        del pixels # the surface stays locked until the pixel array is gone
+
+
+    def batch(self):
+        """
+        Returns a context manager for use with the with statement that suspends autoupdate inside its block, and then calls update() once when the block is exited (even if an exception was raised) if autoupdate was enabled. This way many drawing calls cause only one redraw instead of one redraw each:
+
+            with surf.batch():
+                surf.putchar('@', 3, 4)
+                surf.fill('.', region=(0, 0, 10, 2))
+
+        batch() blocks can be nested, in which case only the outermost block calls update().
+        """
+        return _UpdateBatch(self)
+
+
+    def _beginbatch(self):
+        if self._batchdepth == 0:
+            self._batchautoupdate = self._autoupdate
+            self._autoupdate = False
+        self._batchdepth += 1
+
+
+    def _endbatch(self):
+        self._batchdepth -= 1
+        if self._batchdepth == 0:
+            self._autoupdate = self._batchautoupdate
+            self._batchautoupdate = None
+            if self._autoupdate:
+                self.update()
+
+
+    def _mergecellspans(self, spans):
+        """
+        Merges horizontal spans of cells into rectangles. Each span is an (x, y, width, key) sequence, and the spans must be sorted by row. Spans on consecutive rows that have the same x, width, and key (such as a background color) are stacked into a single rectangle.
+
+        Returns a list of [x, y, width, height, key] lists, in cell coordinates.
+        """
+        rects = []
+        openrects = {} # maps (x, width, key) to the index in rects of the rect that ended on the previous row
+        for x, y, width, key in spans:
+            rectkey = (x, width, key is not None and tuple(key) or None)
+            i = openrects.get(rectkey)
+            if i is not None and rects[i][1] + rects[i][3] == y:
+                rects[i][3] += 1
+            else:
+                openrects[rectkey] = len(rects)
+                rects.append([x, y, width, 1, key])
+        return rects
 
 
     def _drawinputcursor(self):
-        """Draws the input cursor directly onto the self._surfaceobj Surface object, if self._inputcursormode is not None."""
+        """
+        Draws the input cursor directly onto the self._surfaceobj Surface object, if self._inputcursormode is not None.
+
+        The cursor is only drawn (or erased by repainting its cell) when it has moved, changed mode, blinked, or had its cell repainted since it was last drawn. Otherwise this does nothing, so a waiting input() prompt only repaints the one cell when the cursor blinks.
+        """
+        cursor = None
         if self._inputcursormode is not None and self._inputcursorx is not None and self._inputcursory is not None:
-            x = self._inputcursorx # syntactic sugar
-            y = self._inputcursory # syntactic sugar
-
-            if not self.inputcursorblinking or int(time.time() * 2) % 2 == 0:
-                cellfgcolor, cellbgcolor = self.getdisplayedcolors(x, y)
-
-                if self._inputcursormode == 'underline':
-                    # draw a simply underline cursor
-                    pygame.draw.rect(self._surfaceobj, cellfgcolor, (self._cellwidth * x + 2, self._cellheight * (y+1) - 3, self._cellwidth - 4, 3))
-                elif self._inputcursormode == 'insert':
-                    # draw a cursor that takes up about half the cell
-                    pygame.draw.rect(self._surfaceobj, cellfgcolor, (self._cellwidth * x + 2, self._cellheight * (y+1) - int(self._cellheight / 2.5), self._cellwidth - 4, int(self._cellheight / 2.5)))
-                elif self._inputcursormode == 'box':
-                    # draw the reverse the fg & bg colors of the cell (but don't actually modify the backend data)
-                    # TODO - the following is copy pasta. Get rid of it when optimizing?
-                    cellrect = pygame.Rect(self._cellwidth * x, self._cellheight * y, self._cellwidth, self._cellheight)
-                    self._surfaceobj.fill(cellfgcolor, cellrect)
-                    charsurf = self._font.render(self._screenchar[x][y], 1, cellbgcolor, cellfgcolor)
-                    charrect = charsurf.get_rect()
-                    charrect.centerx = self._cellwidth * x + int(self._cellwidth / 2)
-                    charrect.bottom = self._cellheight * (y+1) # TODO - not correct, this would put stuff like g, p, q higher than normal.
-                    self._surfaceobj.blit(charsurf, charrect)
+            if not self.inputcursorblinking or _cursorblinkphase()[0]:
+                cursor = (self._inputcursorx, self._inputcursory, self._inputcursormode)
+
+        if self._drawncursor is not None:
+            drawnx, drawny, drawnmode = self._drawncursor
+            if self._frontbuffer[drawnx][drawny] is not None:
+                self._drawncursor = None # update() has repainted the cell, which already erased the cursor
+            elif self._drawncursor == cursor:
+                return # the cursor is already drawn
             else:
                 # need to blank out the cursor by simply redrawing the cell
-                self._repaintcell(x, y)
+                self._repaintcell(drawnx, drawny)
+                self._drawncursor = None
+
+        if cursor is not None:
+            x, y, mode = cursor
+            self._pendingrects.append(pygame.Rect(self._cellwidth * x, self._cellheight * y, self._cellwidth, self._cellheight))
+            cellfgcolor, cellbgcolor = self.getdisplayedcolors(x, y)
+            self._frontbuffer[x][y] = None # the cursor is drawn over the cell, so it no longer matches the front buffer
+            self._drawncursor = cursor
+
+            if mode == 'underline':
+                # draw a simply underline cursor
+                pygame.draw.rect(self._surfaceobj, cellfgcolor, (self._cellwidth * x + 2, self._cellheight * (y+1) - 3, self._cellwidth - 4, 3))
+            elif mode == 'insert':
+                # draw a cursor that takes up about half the cell
+                pygame.draw.rect(self._surfaceobj, cellfgcolor, (self._cellwidth * x + 2, self._cellheight * (y+1) - int(self._cellheight / 2.5), self._cellwidth - 4, int(self._cellheight / 2.5)))
+            elif mode == 'box':
+                # draw the reverse the fg & bg colors of the cell (but don't actually modify the backend data)
+                self._surfaceobj.fill(cellfgcolor, (self._cellwidth * x, self._cellheight * y, self._cellwidth, self._cellheight))
+                self._drawglyph(self._displayedcells().getchar(x, y), x, y, cellbgcolor, cellfgcolor)
+
 
     def getdisplayedcolors(self, x, y):
-        """Returns the fg and bg colors of the given cell as pygame.Color objects, modified for the tint. If x and y is not on the surface, returns (None, None)"""
+        """Returns the fg and bg colors of the given cell as pygame.Color objects, modified for the tint. These are the colors update() draws the cell with, so they include any layers over the cell, or come from the scrollback history when it is being viewed. If x and y is not on the surface, returns (None, None)"""
 
         if x < 0 or y < 0 or x >= self._width or y >= self._height:
             return None, None
 
-        fgcolor = (self._screenfgcolor[x][y] is None) and (DEFAULTFGCOLOR) or (self._screenfgcolor[x][y])
-        bgcolor = (self._screenbgcolor[x][y] is None) and (DEFAULTBGCOLOR) or (self._screenbgcolor[x][y])
-
-        # NOTE - The ternary trick does work here, because the case where the wrong value of the two is used, both values are the same.
-        rdelta = (self._screenRdelta[x][y] is not None) and (self._screenRdelta[x][y]) or (0)
-        gdelta = (self._screenGdelta[x][y] is not None) and (self._screenGdelta[x][y]) or (0)
-        bdelta = (self._screenBdelta[x][y] is not None) and (self._screenBdelta[x][y]) or (0)
-
+        char, fgcolor, bgcolor, rdelta, gdelta, bdelta = self._displayedcells().getcell(x, y)
 
         if rdelta or gdelta or bdelta:
-            r, g, b, a = fgcolor.r, fgcolor.g, fgcolor.b, fgcolor.a
-            r = getwithinrange(r + rdelta)
-            g = getwithinrange(g + gdelta)
-            b = getwithinrange(b + bdelta)
-            displayedfgcolor = pygame.Color(r, g, b, a)
-
-            r, g, b, a = self._screenbgcolor[x][y].r, self._screenbgcolor[x][y].g, self._screenbgcolor[x][y].b, self._screenbgcolor[x][y].a
-            r = getwithinrange(r + rdelta)
-            g = getwithinrange(g + gdelta)
-            b = getwithinrange(b + bdelta)
-            displayedbgcolor = pygame.Color(r, g, b, a)
+            displayedfgcolor = _gettintedcolor(fgcolor, rdelta, gdelta, bdelta)
+            displayedbgcolor = _gettintedcolor(bgcolor, rdelta, gdelta, bdelta)
         else:
             displayedfgcolor = fgcolor
             displayedbgcolor = bgcolor
@@ -468,13 +1267,132 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         cellfgcolor, cellbgcolor = self.getdisplayedcolors(x, y)
         cellrect = pygame.Rect(self._cellwidth * x, self._cellheight * y, self._cellwidth, self._cellheight)
         self._surfaceobj.fill(cellbgcolor, cellrect)
-        charsurf = self._font.render(self._screenchar[x][y], 1, cellfgcolor, cellbgcolor)
+        char = self._displayedcells().getchar(x, y)
+        self._drawglyph(char, x, y, cellfgcolor, cellbgcolor)
+        self._pendingrects.append(cellrect)
+        if char is None:
+            self._frontbuffer[x][y] = None # an erased cell is painted with its bg color here, not ERASECOLOR like update() does
+        else:
+            self._frontbuffer[x][y] = (char, tuple(cellfgcolor), tuple(cellbgcolor))
+
+
+    def _drawglyph(self, char, x, y, fgcolor, bgcolor):
+        """Draws a single character centered in the cell at xy. The background of the cell is not filled in."""
+        if self._atlasmode and char is not None and len(char) == 1 and ' ' <= char <= '~':
+            # blit the character's slot from the atlas for this foreground color.
+            self._surfaceobj.blit(self._getatlas(fgcolor), (self._cellwidth * x, self._cellheight * y), (self._cellwidth * (ord(char) - 32), 0, self._cellwidth, self._cellheight))
+            return
+
+        charsurf = self._getglyph(char, fgcolor, bgcolor)
         charrect = charsurf.get_rect()
         charrect.centerx = self._cellwidth * x + int(self._cellwidth / 2)
         charrect.bottom = self._cellheight * (y+1) # TODO - not correct, this would put stuff like g, p, q higher than normal.
         self._surfaceobj.blit(charsurf, charrect)
 
 
+    def _drawtextrun(self, text, x, y, fgcolor, bgcolor):
+        """
+        Draws a run of characters that all have the same fg and bg colors, starting at the cell at xy and going right. The background of the cells is not filled in. Leading and trailing spaces are skipped, since there is nothing to draw for them.
+
+        If runrendering is enabled, atlas mode is not, and the font is monospaced, the run is rendered as a single string with one blit. Otherwise (or if the text is not exactly one cell wide per character, which can happen with characters outside of the font) each character is placed in its own cell.
+        """
+        stripped = text.lstrip(' ')
+        x += len(text) - len(stripped)
+        text = stripped.rstrip(' ')
+        if text == '':
+            return # don't need to render anything if it is just space characters.
+
+        if self._runrendering and self._monofont and not self._atlasmode and len(text) > 1 and self._font.size(text)[0] == self._cellwidth * len(text):
+            charsurf = self._gettextrun(text, fgcolor, bgcolor)
+            charrect = charsurf.get_rect()
+            charrect.left = self._cellwidth * x
+            charrect.bottom = self._cellheight * (y+1)
+            self._surfaceobj.blit(charsurf, charrect)
+            return
+
+        for i in range(len(text)):
+            if text[i] != ' ':
+                self._drawglyph(text[i], x + i, y, fgcolor, bgcolor)
+
+
+    def _getglyph(self, char, fgcolor, bgcolor):
+        """Returns a pygame.Surface of char rendered in the given colors. Surfaces are reused from the glyph cache when possible, and the least recently used one is evicted when the cache is full."""
+        key = (char, tuple(fgcolor), tuple(bgcolor), self._antialias)
+        charsurf = self._glyphcache.pop(key, None)
+        if charsurf is None:
+            self._glyphcachemisses += 1
+            charsurf = self._font.render(char, self._antialias, fgcolor, bgcolor)
+            if self._glyphcachesize < 1:
+                return charsurf # caching is disabled
+            while len(self._glyphcache) >= self._glyphcachesize:
+                self._glyphcache.popitem(last=False) # evict the least recently used glyph
+        else:
+            self._glyphcachehits += 1
+        self._glyphcache[key] = charsurf # (re)inserting puts the key at the most recently used end
+        return charsurf
+
+
+    def _gettextrun(self, text, fgcolor, bgcolor):
+        """Returns a pygame.Surface of a run of characters rendered in the given colors. Runs are kept in their own small cache instead of the glyph cache, so that a screen full of lines that are each only drawn once doesn't evict every cached single character."""
+        key = (text, tuple(fgcolor), tuple(bgcolor), self._antialias)
+        runsurf = self._textruncache.pop(key, None)
+        if runsurf is None:
+            runsurf = self._font.render(text, self._antialias, fgcolor, bgcolor)
+            if self._glyphcachesize < 1:
+                return runsurf # caching is disabled
+            while len(self._textruncache) >= TEXTRUNCACHESIZE:
+                self._textruncache.popitem(last=False) # evict the least recently used run
+        self._textruncache[key] = runsurf
+        return runsurf
+
+
+    def _getatlas(self, fgcolor):
+        """
+        Returns the atlas for the foreground color fgcolor, building it first if this color hasn't been used yet. An atlas is a pygame.Surface with per-pixel alpha that has the printable ASCII characters (space to tilde) drawn in cell-sized slots from left to right, each placed the same way update() places a single character in a cell.
+        """
+        key = (tuple(fgcolor), self._antialias)
+        atlas = self._atlases.pop(key, None)
+        if atlas is None:
+            atlas = pygame.Surface((self._cellwidth * 95, self._cellheight), pygame.SRCALPHA)
+            for i in range(95):
+                charsurf = self._font.render(chr(i + 32), self._antialias, fgcolor).convert_alpha()
+                charrect = charsurf.get_rect()
+                charrect.centerx = self._cellwidth * i + int(self._cellwidth / 2)
+                charrect.bottom = self._cellheight
+                atlas.blit(charsurf, charrect, special_flags=pygame.BLEND_RGBA_MAX) # copies the pixels (including alpha) instead of blending them with the transparent atlas
+            while len(self._atlases) >= max(1, self._atlascount):
+                self._atlases.popitem(last=False) # throw out the least recently used atlas
+        self._atlases[key] = atlas
+        return atlas
+
+
+    def clearatlases(self):
+        """Throws out all of the glyph atlases. They will be rebuilt as each foreground color is used again."""
+        self._atlases.clear()
+
+
+    def clearglyphcache(self):
+        """Empties the glyph cache and resets its hit and miss counters."""
+        self._glyphcache.clear()
+        self._textruncache.clear()
+        self._glyphcachehits = 0
+        self._glyphcachemisses = 0
+
+
+    def _markalldirty(self):
+        """Marks every cell on the surface as dirty, so that the next update() redraws all of them."""
+        self._cells.markdirty(0, 0, self._width, self._height)
+        if self._viewcells is not None:
+            self._viewcells.markdirty(0, 0, self._width, self._height)
+
+
+    def _resetfrontbuffer(self):
+        """Forgets what is drawn on the pygame.Surface object, so that the next update() repaints every cell. Call this whenever the pixels of the surface no longer match the front buffer, such as after changing the font."""
+        self._frontbuffer = [[None] * self._height for i in range(self._width)]
+        self._drawncursor = None
+        self._markalldirty()
+
+
     _debugcolorkey = {(255,0,0): 'R',
                       (0,255,0): 'G',
                       (0,0,255): 'B',
@@ -498,7 +1416,8 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
 
 
     def _debugfgFn(self, x, y):
-        r, g, b = self._screenfgcolor[x][y].r, self._screenfgcolor[x][y].g, self._screenfgcolor[x][y].b
+        fgcolor = self._cells.getcell(x, y)[1]
+        r, g, b = fgcolor.r, fgcolor.g, fgcolor.b
         if (r, g, b) in PygcurseSurface._debugcolorkey:
             return PygcurseSurface._debugcolorkey[(r, g, b)]
         else:
@@ -510,7 +1429,8 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
 
 
     def _debugbgFn(self, x, y):
-        r, g, b = self._screenbgcolor[x][y].r, self._screenbgcolor[x][y].g, self._screenbgcolor[x][y].b
+        bgcolor = self._cells.getcell(x, y)[2]
+        r, g, b = bgcolor.r, bgcolor.g, bgcolor.b
         if (r, g, b) in PygcurseSurface._debugcolorkey:
             return PygcurseSurface._debugcolorkey[(r, g, b)]
         else:
@@ -522,10 +1442,11 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
 
 
     def _debugcharsFn(self, x, y):
-        if self._screenchar[x][y] in (None, '\n', '\t'):
+        char = self._cells.getchar(x, y)
+        if char in (None, '\n', '\t'):
             return '.'
         else:
-            return self._screenchar[x][y]
+            return char
 
 
     def _debugchars(self, returnstr=False):
@@ -533,7 +1454,7 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
 
 
     def _debugdirtyFn(self, x, y):
-        if self._screendirty[x][y]:
+        if self._cells.isdirty(x, y):
             return 'D'
         else:
             return '.'
@@ -589,7 +1510,7 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         x, y = self.getcoordinatesatpixel(pixelx, pixely)
         if (x, y) == (None, None):
             return (None, None)
-        return self._screenchar[x][y]
+        return self._cells.getchar(x, y)
 
 
     def resize(self, newwidth=None, newheight=None, fgcolor=None, bgcolor=None):
@@ -613,32 +1534,18 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
             bgcolor = self._bgcolor
         bgcolor = getpygamecolor(bgcolor)
 
-        # create new _screen* data structures
-        newchars = [[None] * newheight for i in range(newwidth)]
-        newfg = [[None] * newheight for i in range(newwidth)]
-        newbg = [[None] * newheight for i in range(newwidth)]
-        newdirty = [[True] * newheight for i in range(newwidth)]
-        newRdelta = [[0] * newheight for i in range(newwidth)]
-        newGdelta = [[0] * newheight for i in range(newwidth)]
-        newBdelta = [[0] * newheight for i in range(newwidth)]
-        for x in range(newwidth):
-            for y in range(newheight):
-                if x >= self._width or y >= self._height:
-                    # Create new color objects
-                    newfg[x][y] = fgcolor
-                    newbg[x][y] = bgcolor
-                    newRdelta[x][y] = self._rdelta
-                    newGdelta[x][y] = self._gdelta
-                    newBdelta[x][y] = self._bdelta
-                else:
-                    newchars[x][y] = self._screenchar[x][y]
-                    newdirty[x][y] = self._screendirty[x][y]
-                    # Copy over old color objects
-                    newfg[x][y] = self._screenfgcolor[x][y]
-                    newbg[x][y] = self._screenbgcolor[x][y]
-                    newRdelta[x][y] = self._screenRdelta[x][y]
-                    newGdelta[x][y] = self._screenGdelta[x][y]
-                    newBdelta[x][y] = self._screenBdelta[x][y]
+        self._showlive()
+
+        # create the new cell storage, copying over the old cells that are still on the surface
+        self._cells = self._cells.resized(newwidth, newheight, fgcolor, bgcolor, self._rdelta, self._gdelta, self._bdelta)
+        for layer in self._layers:
+            layer._cells = layer._cells.resized(newwidth, newheight, fgcolor, ERASECOLOR, 0, 0, 0) # the new cells of a layer are transparent
+        if self._layers:
+            self._compositecells = self._cells.__class__(newwidth, newheight, fgcolor, bgcolor)
+            self._cells.markdirty(0, 0, newwidth, newheight)
+        newfront = [[None] * newheight for i in range(newwidth)]
+        for x in range(min(newwidth, self._width)):
+            newfront[x][:min(newheight, self._height)] = self._frontbuffer[x][:min(newheight, self._height)] # the old pixels are copied to the new surface, so they are still valid
 
         # set new dimensions
         self._width = newwidth
@@ -651,14 +1558,14 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         newsurf.blit(self._surfaceobj, (0, 0))
         self._surfaceobj = newsurf
 
-        self._screenchar = newchars
-        self._screenfgcolor = newfg
-        self._screenbgcolor = newbg
-        self._screendirty = newdirty
+        self._frontbuffer = newfront
+        if self._drawncursor is not None and (self._drawncursor[0] >= newwidth or self._drawncursor[1] >= newheight):
+            self._drawncursor = None # the cursor's pixels were cut off along with its cell
 
         if self._managesdisplay:
             # resize the pygame window itself
             self._windowsurface = pygame.display.set_mode((self._pixelwidth, self._pixelheight))
+            self._fullblitneeded = True
             self.update()
         elif self._autoupdate:
             self.update()
@@ -671,17 +1578,14 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         - fgcolor is the color to set the foreground to.
         """
         if region == None:
-            self._fgcolor = fgcolor
+            self._fgcolor = getpygamecolor(fgcolor)
             return
 
         regionx, regiony, regionwidth, regionheight = self.getregion(region)
         if (regionx, regiony, regionwidth, regionheight) == (None, None, None, None):
             return
 
-        for ix in range(regionx, regionx + regionwidth):
-            for iy in range(regiony, regiony + regionheight):
-                self._screenfgcolor[ix][iy] = fgcolor
-                self._screendirty[ix][iy] = True
+        self._cells.fill(regionx, regiony, regionwidth, regionheight, fgcolor=getpygamecolor(fgcolor))
         if self._autoupdate:
             self.update()
 
@@ -693,17 +1597,14 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         - bgcolor is the color to set the background to.
         """
         if region == None:
-            self._fgcolor = fgcolor
+            self._bgcolor = getpygamecolor(bgcolor)
             return
 
         regionx, regiony, regionwidth, regionheight = self.getregion(region)
         if (regionx, regiony, regionwidth, regionheight) == (None, None, None, None):
             return
 
-        for ix in range(regionx, regionx + regionwidth):
-            for iy in range(regiony, regiony + regionheight):
-                self._screenbgcolor[ix][iy] = bgcolor
-                self._screendirty[ix][iy] = True
+        self._cells.fill(regionx, regiony, regionwidth, regionheight, bgcolor=getpygamecolor(bgcolor))
         if self._autoupdate:
             self.update()
 
@@ -716,28 +1617,11 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         if (regionx, regiony, regionwidth, regionheight) == (None, None, None, None):
             return
 
-        for ix in range(regionx, regionx + regionwidth):
-            for iy in range(regiony, regiony + regionheight):
-                self._screenfgcolor[ix][iy], self._screenbgcolor[ix][iy] = self._screenbgcolor[ix][iy], self._screenfgcolor[ix][iy]
-                self._screendirty[ix][iy] = True
+        self._cells.swapcolors(regionx, regiony, regionwidth, regionheight)
         if self._autoupdate:
             self.update()
 
 
-    def _invertfg(self, x, y):
-        # NOTE - This function does not set the dirty flag.
-        fgcolor = self._screenfgcolor[x][y]
-        invR, invG, invB = 255 - fgcolor.r, 255 - fgcolor.g, 255 - fgcolor.b
-        self._screenfgcolor[x][y] = pygame.Color(invR, invG, invB, fgcolor.a)
-
-
-    def _invertbg(self, x, y):
-        # NOTE - This function does not set the dirty flag.
-        bgcolor = self._screenbgcolor[x][y]
-        invR, invG, invB = 255 - bgcolor.r, 255 - bgcolor.g, 255 - bgcolor.b
-        self._screenbgcolor[x][y] = pygame.Color(invR, invG, invB, bgcolor.a)
-
-
     def invertcolors(self, region=None):
         """
         Invert the colors of a region of cells on this surface. (For example, black and white are inverse of each other, as are blue and yellow.)
@@ -746,11 +1630,7 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         if (regionx, regiony, regionwidth, regionheight) == (None, None, None, None):
             return
 
-        for ix in range(regionx, regionx + regionwidth):
-            for iy in range(regiony, regiony + regionheight):
-                self._invertfg(ix, iy)
-                self._invertbg(ix, iy)
-                self._screendirty[ix][iy] = True
+        self._cells.invertcolors(regionx, regiony, regionwidth, regionheight)
         if self._autoupdate:
             self.update()
 
@@ -763,10 +1643,7 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         if (regionx, regiony, regionwidth, regionheight) == (None, None, None, None):
             return
 
-        for ix in range(regionx, regionx + regionwidth):
-            for iy in range(regiony, regiony + regionheight):
-                self._invertfg(ix, iy)
-                self._screendirty[ix][iy] = True
+        self._cells.invertcolors(regionx, regiony, regionwidth, regionheight, bg=False)
         if self._autoupdate:
             self.update()
 
@@ -779,10 +1656,7 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         if (regionx, regiony, regionwidth, regionheight) == (None, None, None, None):
             return
 
-        for ix in range(regionx, regionx + regionwidth):
-            for iy in range(regiony, regiony + regionheight):
-                self._invertbg(ix, iy)
-                self._screendirty[ix][iy] = True
+        self._cells.invertcolors(regionx, regiony, regionwidth, regionheight, fg=False)
         if self._autoupdate:
             self.update()
 
@@ -795,40 +1669,15 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         if dstsurf is None:
             # Create a new PygcurseSurface to paste to.
             dstsurf = PygcurseSurface(srcwidth, srcheight, font=self._font, fgcolor=self._fgcolor, bgcolor=self._bgcolor)
-        elif dstsurf._pygcurseClass not in ('PygcurseSurface', 'PygcurseWindow'): # TODO - is this the right way to do this?
+        elif dstsurf._pygcurseClass not in ('PygcurseSurface', 'PygcurseWindow', 'PygcurseSubsurface', 'PygcursePad'): # TODO - is this the right way to do this?
             return
 
         dstx, dsty, dstwidth, dstheight = dstsurf.getregion(dstregion)
         if (dstx, dsty, dstwidth, dstheight) == (None, None, None, None):
             return
 
-        if self == dstsurf and regionsoverlap((srcx, srcy, srcwidth, srcheight), (dstx, dsty, dstwidth, dstheight)):
-            # Since we are trying to copy/paste over the same region, in order to prevent any weird side effects, paste to a new surface object first
-            tempsurf = self.paste((srcx, srcy, srcwidth, srcheight))
-            tempsurf.paste(None, self, (dstx, dsty, dstwidth, dstheight))
-            return
-
-        for ix in range(srcx, srcx + srcwidth):
-            for iy in range(srcy, srcy + srcheight):
-                finx = dstx + (ix - srcx)
-                finy = dsty + (iy - srcy)
-
-                if not dstsurf.isonscreen(finx, finy) or ix - srcx >= dstwidth or iy - srcy >= dstheight:
-                    continue
-
-                if pastechars and self._screenchar[ix][iy] is not None:
-                    dstsurf._screenchar[finx][finy] = self._screenchar[ix][iy]
-                if pastefgcolor and self._screenfgcolor[ix][iy] is not None:
-                    dstsurf._screenfgcolor[finx][finy] = self._screenfgcolor[ix][iy]
-                if pastebgcolor and self._screenbgcolor[ix][iy] is not None:
-                    dstsurf._screenbgcolor[finx][finy] = self._screenbgcolor[ix][iy]
-                if pasteredtint and self._screenRdelta[ix][iy] is not None:
-                    dstsurf._screenRdelta[finx][finy] = self._screenRdelta[ix][iy]
-                if pastegreentint and self._screenGdelta[ix][iy] is not None:
-                    dstsurf._screenGdelta[finx][finy] = self._screenGdelta[ix][iy]
-                if pastebluetint and self._screenBdelta[ix][iy] is not None:
-                    dstsurf._screenBdelta[finx][finy] = self._screenBdelta[ix][iy]
-                dstsurf._screendirty[finx][finy] = True
+        # NOTE - The cell storage reads the whole source region before writing to the destination, so pasting over an overlapping region of the same surface works fine.
+        dstsurf._cells.copyfrom(self._cells, srcx, srcy, dstx, dsty, min(srcwidth, dstwidth), min(srcheight, dstheight), pastechars, pastefgcolor, pastebgcolor, pasteredtint, pastegreentint, pastebluetint)
 
         if dstsurf._autoupdate:
             dstsurf.update()
@@ -899,61 +1748,62 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
                 if direction in (WEST, EAST):
                     yoffset = 0
 
-        # north shadow
-        if yoffset < 0 and (-width < xoffset < width):
-            self.darken(amount, (x + getwithinrange(xoffset, 0, width),
-                                 y + yoffset,
-                                 width-abs(xoffset),
-                                 min(abs(yoffset), height)))
-
-        # south shadow
-        if yoffset > 0 and (-width < xoffset < width):
-            self.darken(amount, (x + getwithinrange(xoffset, 0, width),
-                            y+max(yoffset, height),
-                            width-abs(xoffset),
-                            min(abs(yoffset), height)))
-
-        # west shadow
-        if xoffset < 0 and (-height < yoffset < height):
-            self.darken(amount, (x + xoffset,
-                                 y + getwithinrange(yoffset, 0, height),
-                                 getwithinrange(abs(xoffset), 0, width),
-                                 height - abs(yoffset)))
-
-        # east shadow
-        if xoffset > 0 and (-height < yoffset < height):
-            self.darken(amount, (x + max(xoffset, width),
-                                 y + getwithinrange(yoffset, 0, height),
-                                 min(abs(xoffset), width),
-                                 height - abs(yoffset)))
-
-        # northwest shadow
-        if xoffset < 0 and yoffset < 0:
-            self.darken(amount, (x + xoffset,
-                                 y + yoffset,
-                                 min(abs(xoffset), width),
-                                 min(abs(yoffset), height)))
-
-        # northeast shadow
-        if xoffset > 0 and yoffset < 0:
-            self.darken(amount, (x + getwithinrange(xoffset, width, xoffset),
-                                 y + yoffset,
-                                 min(abs(xoffset), width),
-                                 min(abs(yoffset), height)))
-
-        # southwest shadow
-        if xoffset < 0 and yoffset > 0:
-            self.darken(amount, (x + xoffset,
-                                 y + getwithinrange(yoffset, height, yoffset),
-                                 min(abs(xoffset), width),
-                                 min(abs(yoffset), height)))
-
-        # southeast shadow
-        if xoffset > 0 and yoffset > 0:
-            self.darken(amount, (x + getwithinrange(xoffset, width, xoffset),
-                                 y + getwithinrange(yoffset, height, yoffset),
-                                 getwithinrange(abs(xoffset), 0, width),
-                                 getwithinrange(abs(yoffset), 0, height)))
+        with self.batch(): # darken() is called once per side of the shadow, so only update once at the end
+            # north shadow
+            if yoffset < 0 and (-width < xoffset < width):
+                self.darken(amount, (x + getwithinrange(xoffset, 0, width),
+                                     y + yoffset,
+                                     width-abs(xoffset),
+                                     min(abs(yoffset), height)))
+
+            # south shadow
+            if yoffset > 0 and (-width < xoffset < width):
+                self.darken(amount, (x + getwithinrange(xoffset, 0, width),
+                                y+max(yoffset, height),
+                                width-abs(xoffset),
+                                min(abs(yoffset), height)))
+
+            # west shadow
+            if xoffset < 0 and (-height < yoffset < height):
+                self.darken(amount, (x + xoffset,
+                                     y + getwithinrange(yoffset, 0, height),
+                                     getwithinrange(abs(xoffset), 0, width),
+                                     height - abs(yoffset)))
+
+            # east shadow
+            if xoffset > 0 and (-height < yoffset < height):
+                self.darken(amount, (x + max(xoffset, width),
+                                     y + getwithinrange(yoffset, 0, height),
+                                     min(abs(xoffset), width),
+                                     height - abs(yoffset)))
+
+            # northwest shadow
+            if xoffset < 0 and yoffset < 0:
+                self.darken(amount, (x + xoffset,
+                                     y + yoffset,
+                                     min(abs(xoffset), width),
+                                     min(abs(yoffset), height)))
+
+            # northeast shadow
+            if xoffset > 0 and yoffset < 0:
+                self.darken(amount, (x + getwithinrange(xoffset, width, xoffset),
+                                     y + yoffset,
+                                     min(abs(xoffset), width),
+                                     min(abs(yoffset), height)))
+
+            # southwest shadow
+            if xoffset < 0 and yoffset > 0:
+                self.darken(amount, (x + xoffset,
+                                     y + getwithinrange(yoffset, height, yoffset),
+                                     min(abs(xoffset), width),
+                                     min(abs(yoffset), height)))
+
+            # southeast shadow
+            if xoffset > 0 and yoffset > 0:
+                self.darken(amount, (x + getwithinrange(xoffset, width, xoffset),
+                                     y + getwithinrange(yoffset, height, yoffset),
+                                     getwithinrange(abs(xoffset), 0, width),
+                                     getwithinrange(abs(yoffset), 0, height)))
 
 
     def tint(self, r=0, g=0, b=0, region=None):
@@ -966,12 +1816,7 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         if (x, y, width, height) == (None, None, None, None):
             return
 
-        for ix in range(x, x + width):
-            for iy in range(y, y + height):
-                self._screenRdelta[ix][iy] = getwithinrange(r + self._screenRdelta[ix][iy], min=-255)
-                self._screenGdelta[ix][iy] = getwithinrange(g + self._screenGdelta[ix][iy], min=-255)
-                self._screenBdelta[ix][iy] = getwithinrange(b + self._screenBdelta[ix][iy], min=-255)
-                self._screendirty[ix][iy] = True
+        self._cells.addtint(x, y, width, height, r, g, b)
         if self._autoupdate:
             self.update()
 
@@ -992,12 +1837,7 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         if (x, y, width, height) == (None, None, None, None):
             return
 
-        for ix in range(x, x + width):
-            for iy in range(y, y + height):
-                self._screenRdelta[ix][iy] = getwithinrange(r, min=-255)
-                self._screenGdelta[ix][iy] = getwithinrange(g, min=-255)
-                self._screenBdelta[ix][iy] = getwithinrange(b, min=-255)
-                self._screendirty[ix][iy] = True
+        self._cells.settint(x, y, width, height, getwithinrange(r, min=-255), getwithinrange(g, min=-255), getwithinrange(b, min=-255))
 
         if self._autoupdate:
             self.update()
@@ -1006,7 +1846,7 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         """Returns the character at cell x, y."""
         if x < 0 or y < 0 or x >= self._width or y >= self._height:
             return None
-        return self._screenchar[x][y]
+        return self._cells.getchar(x, y)
 
 
     def getchars(self, region=None, gapChar=' '):
@@ -1019,16 +1859,7 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         if (x, y, width, height) == (None, None, None, None):
             return
 
-        lines = []
-        for iy in range(y, y + height):
-            line = []
-            for ix in range(x, x + width):
-                if self._screenchar[ix][iy] is None and gapChar is not None:
-                    line.append(gapChar)
-                else:
-                    line.append(self._screenchar[ix][iy])
-            lines.append(''.join(line))
-        return lines
+        return [self._cells.getrowtext(x, iy, width, gapChar) for iy in range(y, y + height)]
 
 
     def putchar(self, char, x=None, y=None, fgcolor=None, bgcolor=None):
@@ -1050,12 +1881,11 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
             return None
 
         if fgcolor is not None:
-            self._screenfgcolor[x][y] = getpygamecolor(fgcolor)
+            fgcolor = getpygamecolor(fgcolor)
         if bgcolor is not None:
-            self._screenbgcolor[x][y] = getpygamecolor(bgcolor)
+            bgcolor = getpygamecolor(bgcolor)
 
-        self._screenchar[x][y] = char[0]
-        self._screendirty[x][y] = True
+        self._cells.setcell(x, y, char[0], fgcolor, bgcolor)
 
         if self._autoupdate:
             self.update()
@@ -1092,12 +1922,7 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
             if tempcury >= self._height: # putchars() does not cause a scroll.
                 break
 
-            self._screenchar[tempcurx][tempcury] = chars[i]
-            self._screendirty[tempcurx][tempcury] = True
-            if fgcolor is not None:
-                self._screenfgcolor[tempcurx][tempcury] = fgcolor
-            if bgcolor is not None:
-                self._screenbgcolor[tempcurx][tempcury] = bgcolor
+            self._cells.setcell(tempcurx, tempcury, chars[i], fgcolor, bgcolor)
             tempcurx += 1
 
         if self._autoupdate:
@@ -1114,11 +1939,13 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         """
         if fgcolor is not None:
             self.fgcolor = getpygamecolor(fgcolor)
+            self.clearatlases() # every cell is getting the new foreground color, so the atlases for the old colors aren't needed anymore
         if bgcolor is not None:
             self.bgcolor = getpygamecolor(bgcolor)
         char = clear and ' ' or None
-        self.fill(char, fgcolor, bgcolor)
-        self.setbrightness()
+        with self.batch():
+            self.fill(char, fgcolor, bgcolor)
+            self.setbrightness()
 
 
     def erase(self, region=None):
@@ -1137,38 +1964,157 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         fgcolor = (fgcolor is not None) and (getpygamecolor(fgcolor)) or (self._fgcolor)
         bgcolor = (bgcolor is not None) and (getpygamecolor(bgcolor)) or (self._bgcolor)
 
-        for ix in range(x, x + width):
-            for iy in range(y, y + height):
-                if char is not None:
-                    self._screenchar[ix][iy] = char
-                if fgcolor is not None:
-                    self._screenfgcolor[ix][iy] = fgcolor
-                if bgcolor is not None:
-                    self._screenbgcolor[ix][iy] = bgcolor
-                self._screendirty[ix][iy] = True
+        self._cells.fill(x, y, width, height, char, fgcolor, bgcolor)
 
         if self._autoupdate:
             self.update()
 
 
-    def _scroll(self):
-        """Scroll the content of the entire screen up one row. This is done when characters are printed to the screen that go past the end of the last row."""
-        for x in range(self._width):
-            for y in range(self._height - 1):
-                self._screenchar[x][y] = self._screenchar[x][y+1]
-                self._screenfgcolor[x][y] = self._screenfgcolor[x][y+1]
-                self._screenbgcolor[x][y] = self._screenbgcolor[x][y+1]
-                self._screenRdelta[x][y] = self._screenRdelta[x][y+1]
-                self._screenGdelta[x][y] = self._screenGdelta[x][y+1]
-                self._screenBdelta[x][y] = self._screenBdelta[x][y+1]
-            self._screenchar[x][self._height-1] = ' ' # bottom row is blanked
-            self._screenfgcolor[x][self._height-1] = self._fgcolor
-            self._screenbgcolor[x][self._height-1] = self._bgcolor
-            self._screenRdelta[x][self._height-1] = self._rdelta
-            self._screenGdelta[x][self._height-1] = self._gdelta
-            self._screenBdelta[x][self._height-1] = self._bdelta
-        self._screendirty = [[True] * self._height for i in range(self._width)]
-        self._scrollcount += 1
+    def _scroll(self, lines=1, offscreenrows=()):
+        """
+        Scroll the content of the entire screen up by lines rows. This is done when characters are printed to the screen that go past the end of the last row.
+
+        - offscreenrows is a sequence of encoded rows (see _encoderow()) that are added to the scrollback after the rows scrolled off the top. write() uses this for rows of text that scroll off the surface without ever being drawn on it.
+        """
+        if lines < 1:
+            return
+        if self._scrollback is not None:
+            # the deque drops the oldest rows once it is full
+            self._scrollback.extend([self._cells.encoderow(y) for y in range(min(lines, self._height))])
+            self._scrollback.extend(offscreenrows)
+        self._cells.scroll(' ', self._fgcolor, self._bgcolor, self._rdelta, self._gdelta, self._bdelta, lines) # bottom rows are blanked
+        self._scrollcount += lines
+
+        if self._scrollbackoffset:
+            # Keep showing the same rows of history, which are now further back (unless they were dropped from the scrollback.) The pixels are left alone since the view didn't move.
+            self._scrollbackoffset = min(self._scrollbackoffset + lines, len(self._scrollback))
+            return
+
+        if self._layers:
+            # The layers don't scroll along with the cells, so the drawn pixels can't just be moved up. Instead, every cell is composited again (and only the ones that look different are repainted.)
+            self._cells.markdirty(0, 0, self._width, self._height)
+            return
+
+        # Instead of redrawing every cell, the already drawn pixels are scrolled up along with the cells. Only the new bottom rows (and any cells that were already dirty) need to be drawn by the next update().
+        lines = min(lines, self._height)
+        self._surfaceobj.scroll(0, -self._cellheight * lines)
+        for column in self._frontbuffer:
+            column[:] = column[lines:] + [None] * lines
+        if self._drawncursor is not None:
+            # the drawn input cursor's pixels moved up too
+            x, y, mode = self._drawncursor
+            self._drawncursor = y >= lines and (x, y - lines, mode) or None
+        self._pendingrects.append(self._surfaceobj.get_rect()) # every pixel moved, so the whole surface has to be blitted again
+
+
+    def _movedrawncells(self, x, y, width, height, dx, dy):
+        """Moves the pixels drawn for the cells in the region by dx and dy cells (positive values move them right and down), along with their front buffer entries, so that the next update() doesn't repaint cells whose contents moved the same way. The cells uncovered at the edges of the region get repainted."""
+        if (dx, dy) == (0, 0) or abs(dx) >= width or abs(dy) >= height:
+            return # nothing drawn stays in the region, so update() has to repaint all of it anyway
+        rect = pygame.Rect(x * self._cellwidth, y * self._cellheight, width * self._cellwidth, height * self._cellheight)
+        clip = self._surfaceobj.get_clip()
+        self._surfaceobj.set_clip(rect) # scroll() only moves the pixels inside the clipping area
+        self._surfaceobj.scroll(dx * self._cellwidth, dy * self._cellheight)
+        self._surfaceobj.set_clip(clip)
+
+        oldcolumns = [column[y:y + height] for column in self._frontbuffer[x:x + width]]
+        for ix in range(width):
+            if 0 <= ix - dx < width:
+                column = oldcolumns[ix - dx]
+                column = dy >= 0 and [None] * dy + column[:height - dy] or column[-dy:] + [None] * -dy
+            else:
+                column = [None] * height
+            self._frontbuffer[x + ix][y:y + height] = column
+        if self._drawncursor is not None:
+            # the drawn input cursor's pixels moved too (or were scrolled out of the region)
+            cursorx, cursory, mode = self._drawncursor
+            if x <= cursorx < x + width and y <= cursory < y + height:
+                cursorx, cursory = cursorx + dx, cursory + dy
+                self._drawncursor = (x <= cursorx < x + width and y <= cursory < y + height) and (cursorx, cursory, mode) or None
+        self._pendingrects.append(rect)
+
+
+    def subsurface(self, region):
+        """
+        Returns a PygcurseSubsurface object: a view of a region of this surface with its own cursor, colors, and coordinates, where (0, 0) is the top-left cell of the region (like the subwin() and derwin() functions of curses). Drawing on it changes this surface's cells directly. The part of the region that is off this surface is cut off.
+        """
+        x, y, width, height = self.getregion(region)
+        if (x, y, width, height) == (None, None, None, None):
+            raise Exception('The subsurface region must be on the surface.')
+        return PygcurseSubsurface(self, x, y, width, height)
+
+
+    def addlayer(self, z=None):
+        """
+        Creates and returns a new, completely transparent PygcurseLayer object that is drawn over this surface's cells. See the PygcurseLayer class for details.
+
+        - z is the layer's place in the z-order: layers with higher z values are drawn over the ones with lower z values, and layers with the same z value are drawn in the order they were added. By default, the new layer goes on top of all the others.
+        """
+        if z is None:
+            z = self._layers and self._layers[-1]._z + 1 or 0
+        layer = PygcurseLayer(self, z)
+        if self._compositecells is None:
+            self._compositecells = self._cells.__class__(self._width, self._height, getpygamecolor(self._fgcolor), getpygamecolor(self._bgcolor))
+            self._cells.markdirty(0, 0, self._width, self._height) # the composite cells start off blank, so every cell has to be composited
+        self._layers.append(layer)
+        self._layers.sort(key=_zorderkey)
+        return layer
+
+
+    def removelayer(self, layer):
+        """Removes a PygcurseLayer object from the surface, so it is no longer drawn."""
+        if layer not in self._layers:
+            return
+        self._layers.remove(layer)
+        if not self._layers:
+            self._compositecells = None
+        self._cells.markdirty(0, 0, self._width, self._height) # the cells under the layer's are composited again (update() only repaints the ones that changed)
+        if self._autoupdate:
+            self.update()
+
+
+    def scrollbackup(self, lines=None):
+        """
+        Moves the view of the surface back through the scrollback history by the given number of lines (by default, the height of the surface.) The scrollback must be enabled by setting the scrollbacksize property. Drawing functions keep changing the current cells while the history is viewed; call scrollbackdown() or set scrollbackoffset to 0 to view them again.
+        """
+        if lines is None:
+            lines = self._height
+        self.scrollbackoffset = self._scrollbackoffset + lines
+
+
+    def scrollbackdown(self, lines=None):
+        """Moves the view of the surface forward through the scrollback history by the given number of lines (by default, the height of the surface.)"""
+        if lines is None:
+            lines = self._height
+        self.scrollbackoffset = self._scrollbackoffset - lines
+
+
+    def clearscrollback(self):
+        """Deletes all of the rows in the scrollback history."""
+        if self._scrollback is not None:
+            self._scrollback.clear()
+        self.scrollbackoffset = 0
+
+
+    def _refreshview(self):
+        """Sets the rows of self._viewcells to the part of the scrollback history (and the top of the current cells) that is being viewed. Only the cells that are different from what is drawn get repainted by update()."""
+        if self._viewcells is None:
+            self._viewcells = self._cells.__class__(self._width, self._height, self._fgcolor, self._bgcolor)
+        start = len(self._scrollback) - self._scrollbackoffset
+        for y in range(self._height):
+            if start + y < len(self._scrollback):
+                self._viewcells.decoderow(y, self._scrollback[start + y])
+            else:
+                self._viewcells.decoderow(y, self._cells.encoderow(start + y - len(self._scrollback)))
+        self._cells.takedirty() # these cells are all marked dirty again by _showlive()
+
+
+    def _showlive(self):
+        """Stops viewing the scrollback history, so that the surface displays its current cells again."""
+        if self._scrollbackoffset or self._viewcells is not None:
+            self._scrollbackoffset = 0
+            self._viewcells = None
+            self._cells.markdirty(0, 0, self._width, self._height) # update() compares them with the front buffer, so only the cells that differ from the history rows are repainted
 
 
     def getregion(self, region=None, truncate=True):
@@ -1240,82 +2186,93 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         fgcolor = (fgcolor is None) and (self._fgcolor) or (getpygamecolor(fgcolor))
         bgcolor = (bgcolor is None) and (self._bgcolor) or (getpygamecolor(bgcolor))
 
-        # TODO - we can calculate in advance what how many scrolls to do.
-
-
-        # replace tabs with appropriate number of spaces
-        i = 0
-        tempcursorx = self._cursorx - 1
-        while i < len(text):
-            if text[i] == '\n':
-                tempcursorx = 0
-            elif text[i] == '\t':
-                numspaces = self._tabsize - ((i+1) + tempcursorx % self._tabsize)
-                if tempcursorx + numspaces >= self._width:
-                    # tabbed past the edge, just go to first
-                    # TODO - this doesn't work at all.
-                    text = text[:i] + (' ' * (self._width - tempcursorx + 1)) + text[i+1:]
-                    tempcursorx += (self._width - tempcursorx + 1)
-                else:
-                    text = text[:i] + (' ' * numspaces) + text[i+1:]
-                    tempcursorx += numspaces
-            else:
-                tempcursorx += 1
-
-            if tempcursorx >= self._width:
-                tempcursorx = 0
-            i += 1
-
-        """
-        # create a cache of surface objects for each letter in text
-        letterSurfs = {}
-        for letter in text:
-            if ord(letter) in range(33, 127) and letter not in letterSurfs:
-                letterSurfs[letter] = self._font.render(letter, 1, fgcolor, bgcolor)
-                #letterSurfs[letter] = letterSurfs[letter].convert_alpha() # TODO - wait a sec, I don't think pygame lets fonts have transparent backgrounds.
-            elif letter == ' ':
-                continue
-            elif letter not in letterSurfs and '?' not in letterSurfs:
-                letterSurfs['?'] = self._font.render('?', 1, fgcolor, bgcolor)
-                #letterSurfs['?'] = letterSurfs['?'].convert_alpha()
-        """
-
-        for i in range(len(text)):
-            if text[i] in ('\n', '\r'): # TODO - wait, this isn't right. We should be ignoring one of these newlines. Otherwise \r\n shows up as two newlines.
-                self._cursory += 1
-                self._cursorx = 0
-            else:
-                # set the backend data structures that track the screen state
-                self._screenchar[self._cursorx][self._cursory] = text[i]
-                self._screenfgcolor[self._cursorx][self._cursory] = fgcolor
-                self._screenbgcolor[self._cursorx][self._cursory] = bgcolor
-                self._screendirty[self._cursorx][self._cursory] = True
-
-                """
-                r = pygame.Rect(self._cellwidth * self._cursorx, self._cellheight * self._cursory, self._cellwidth, self._cellheight)
-                self._surfaceobj.fill(bgcolor, r)
-                charsurf = letterSurfs[text[i]]
-                charrect = charsurf.get_rect()
-                charrect.centerx = self._cellwidth * self._cursorx + int(self._cellwidth / 2)
-                charrect.bottom = self._cellheight * (self._cursory+1)
-                self._surfaceobj.blit(charsurf, charrect)
-                self._screendirty[self._cursorx][self._cursory] = False
-                """
-
-                # Move cursor over (and to next line if it moves past the right edge)
-                self._cursorx += 1
-                if self._cursorx >= self._width:
-                    self._cursorx = 0
-                    self._cursory += 1
-            if self._cursory >= self._height:
-                # scroll up a line if we try to print on the line after the last one
-                self._scroll()
-                self._cursory = self._height - 1
+        # The text is laid out in one pass before anything is written. Each line (the text between newlines) gets its tabs expanded and is placed at a "virtual row", which counts rows down from the top of the surface as if it never scrolled. Rows past the bottom edge have virtual rows of self._height or more.
+        width = self._width
+        lines = [] # list of (virtual row, x, text) tuples, one for each line
+        vrow, col = self._cursory, self._cursorx
+        for line in text.replace('\r', '\n').split('\n'): # TODO - wait, this isn't right. We should be ignoring one of these newlines. Otherwise \r\n shows up as two newlines.
+            if lines:
+                vrow, col = vrow + 1, 0 # move down for the newline
+            if '\t' in line:
+                line = self._expandtabs(line, col)
+            lines.append((vrow, col, line))
+            vrow += (col + len(line)) // width # the cursor moves to the next row whenever it goes past the right edge
+            col = (col + len(line)) % width
+        numscrolls = max(0, vrow - (self._height - 1))
+
+        # Only the rows that end up on the surface (or in the scrollback) are written; everything in between is skipped.
+        firstkeptrow = numscrolls
+        if self._scrollback is not None:
+            firstkeptrow = max(0, numscrolls - self._scrollback.maxlen)
+        segments = [] # list of (virtual row, x, text) tuples for each row's part of a line
+        for linevrow, linex, line in lines:
+            for i in range(0, max(1, linex + len(line)), width):
+                segmentvrow = linevrow + i // width
+                if segmentvrow < self._height or segmentvrow >= firstkeptrow:
+                    start = max(i - linex, 0)
+                    end = i + width - linex
+                    if start < len(line):
+                        segments.append((segmentvrow, (linex + start) % width, line[start:end]))
+
+        # write the rows that are on the surface right now, then scroll them up all at once.
+        for segmentvrow, x, segment in segments:
+            if segmentvrow < self._height:
+                self._cells.settext(x, segmentvrow, segment, fgcolor, bgcolor)
+        offscreenrows = []
+        if self._scrollback is not None:
+            # rows of text that scroll off before they would have been drawn go straight into the scrollback.
+            offscreensegments = {}
+            for segmentvrow, x, segment in segments:
+                if self._height <= segmentvrow < numscrolls:
+                    offscreensegments.setdefault(segmentvrow, []).append((x, segment))
+            for offscreenvrow in range(max(self._height, firstkeptrow), numscrolls):
+                offscreenrows.append(self._encodeblankrow(offscreensegments.get(offscreenvrow, ()), fgcolor, bgcolor))
+        self._scroll(numscrolls, offscreenrows)
+
+        # write the rows that were below the bottom edge before the scroll.
+        for segmentvrow, x, segment in segments:
+            if segmentvrow >= self._height and segmentvrow >= numscrolls:
+                self._cells.settext(x, segmentvrow - numscrolls, segment, fgcolor, bgcolor)
+        self._cursorx = col
+        self._cursory = vrow - numscrolls
 
         if self._autoupdate:
             self.update()
 
 
+    def _expandtabs(self, line, x):
+        """Returns line with each tab replaced by spaces up to the next tab stop, where line is written starting at column x. A tab never goes past the right edge of the surface; instead it fills the rest of the row."""
+        parts = line.split('\t')
+        expanded = [parts[0]]
+        col = x + len(parts[0])
+        for part in parts[1:]:
+            rowcol = col % self._width
+            numspaces = min(self._tabsize - (rowcol % self._tabsize), self._width - rowcol)
+            expanded.append(' ' * numspaces)
+            expanded.append(part)
+            col += numspaces + len(part)
+        return ''.join(expanded)
+
+
+    def _encodeblankrow(self, segments, fgcolor, bgcolor):
+        """Returns an encoded row (see _encoderow()) of a row that was blanked by a scroll and then had the (x, text) segments (sorted by x, and not overlapping) written to it in fgcolor and bgcolor. The runs are built straight from the segments instead of cell by cell."""
+        text = []
+        fgruns = []
+        bgruns = []
+        x = 0
+        for segmentx, segment in list(segments) + [(self._width, '')]:
+            for runs, blankcolor, color in ((fgruns, self._fgcolor, fgcolor), (bgruns, self._bgcolor, bgcolor)):
+                for count, value in ((segmentx - x, int(blankcolor)), (len(segment), int(color))):
+                    if count and runs and runs[-1][1] == value:
+                        runs[-1][0] += count
+                    elif count:
+                        runs.append([count, value])
+            text.append(' ' * (segmentx - x))
+            text.append(segment)
+            x = segmentx + len(segment)
+        return ''.join(text), _internruns(fgruns), _internruns(bgruns), _internruns([[self._width, (self._rdelta, self._gdelta, self._bdelta)]])
+
+
     def read(self): # TODO - this isn't right.
         return '\n'.join(self.getchars())
 
@@ -1400,7 +2357,10 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
 
     def _propsetfont(self, value):
         self._font = value # TODO - a lot of this code is copy/paste
+        self.clearglyphcache() # glyphs rendered with the old font can't be reused
+        self.clearatlases()
         self._cellwidth, self._cellheight = calcfontsize(self._font)
+        self._monofont = _ismonofont(self._font)
         if self._managesdisplay and self._fullscreen:
             self._windowsurface = pygame.display.set_mode((self._cellwidth * self.width, self._cellheight * self.height), pygame.FULLSCREEN)
         elif self._managesdisplay:
@@ -1409,7 +2369,8 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         self._pixelheight = self._height * self._cellheight
         self._surfaceobj = pygame.Surface((self._pixelwidth, self._pixelheight))
         self._surfaceobj = self._surfaceobj.convert_alpha() # TODO - This is needed for erasing, but does this have a performance hit?
-        self._screendirty = [[True] * self._height for i in range(self._width)]
+        self._resetfrontbuffer()
+        self._fullblitneeded = True
 
         if self._autoupdate:
             self.update()
@@ -1441,11 +2402,16 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
 
 
     def _propgetautoupdate(self):
+        if self._batchdepth:
+            return self._batchautoupdate
         return self._autoupdate
 
 
     def _propsetautoupdate(self, value):
-        self._autoupdate = bool(value)
+        if self._batchdepth:
+            self._batchautoupdate = bool(value) # takes effect once the batch() block is exited
+        else:
+            self._autoupdate = bool(value)
 
 
     def _propgetautoblit(self):
@@ -1453,6 +2419,8 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
 
 
     def _propsetautoblit(self, value):
+        if value and not self._autoblit:
+            self._fullblitneeded = True # the window surface may be out of date with what was drawn while autoblit was off
         self._autoblit = bool(value)
 
 
@@ -1614,6 +2582,135 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         return pygame.Rect(0, 0, self._width * self._cellwidth, self._height * self._cellheight)
 
 
+    def _propgetantialias(self):
+        return self._antialias
+
+
+    def _propsetantialias(self, value):
+        value = bool(value)
+        if value == self._antialias:
+            return
+        self._antialias = value
+        self.clearatlases()
+        self._resetfrontbuffer()
+        if self._autoupdate:
+            self.update()
+
+
+    def _propgetrunrendering(self):
+        return self._runrendering
+
+
+    def _propsetrunrendering(self, value):
+        self._runrendering = bool(value)
+
+
+    def _propgetatlasmode(self):
+        return self._atlasmode
+
+
+    def _propsetatlasmode(self, value):
+        value = bool(value)
+        if value == self._atlasmode:
+            return
+        self._atlasmode = value
+        if not value:
+            self.clearatlases()
+        self._resetfrontbuffer()
+        if self._autoupdate:
+            self.update()
+
+
+    def _propgetbgarraymode(self):
+        return self._bgarraymode
+
+
+    def _propsetbgarraymode(self, value):
+        value = bool(value)
+        if value and numpy is None:
+            raise Exception('The numpy module is required for bg array mode.')
+        self._bgarraymode = value
+
+
+    def _propgetscrollbacksize(self):
+        if self._scrollback is None:
+            return 0
+        return self._scrollback.maxlen
+
+
+    def _propsetscrollbacksize(self, value):
+        value = max(0, int(value))
+        if value == self._propgetscrollbacksize():
+            return
+        self._showlive()
+        if value == 0:
+            self._scrollback = None
+        elif self._scrollback is None:
+            self._scrollback = collections.deque(maxlen=value)
+        else:
+            self._scrollback = collections.deque(self._scrollback, maxlen=value) # keeps the newest rows
+        if self._autoupdate:
+            self.update()
+
+
+    def _propgetscrollbacklength(self):
+        if self._scrollback is None:
+            return 0
+        return len(self._scrollback)
+
+
+    def _propgetscrollbackoffset(self):
+        return self._scrollbackoffset
+
+
+    def _propgetlayers(self):
+        return list(self._layers)
+
+
+    def _propsetscrollbackoffset(self, value):
+        value = getwithinrange(int(value), 0, self._propgetscrollbacklength())
+        if value == self._scrollbackoffset:
+            return
+        if value == 0:
+            self._showlive()
+        else:
+            self._scrollbackoffset = value
+        if self._autoupdate:
+            self.update()
+
+
+    def _propgetatlascount(self):
+        return self._atlascount
+
+
+    def _propsetatlascount(self, value):
+        self._atlascount = max(1, int(value))
+        while len(self._atlases) > self._atlascount:
+            self._atlases.popitem(last=False)
+
+
+    def _propgetglyphcachesize(self):
+        return self._glyphcachesize
+
+
+    def _propsetglyphcachesize(self, value):
+        self._glyphcachesize = max(0, int(value))
+        while len(self._glyphcache) > self._glyphcachesize:
+            self._glyphcache.popitem(last=False)
+
+
+    def _propgetglyphcachehits(self):
+        return self._glyphcachehits
+
+
+    def _propgetglyphcachemisses(self):
+        return self._glyphcachemisses
+
+
+    def _propgetdirtycount(self):
+        return self._cells.dirtycount
+
+
     def _propgettabsize(self):
         return self._fgcolor
 
@@ -1645,6 +2742,19 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
     cellsize          = property(_propgetcellsize, None) # Set func will be in VER2
     surface           = property(_propgetsurface, None)
     tabsize           = property(_propgettabsize, _propsettabsize)
+    antialias         = property(_propgetantialias, _propsetantialias)
+    runrendering      = property(_propgetrunrendering, _propsetrunrendering)
+    atlasmode         = property(_propgetatlasmode, _propsetatlasmode)
+    atlascount        = property(_propgetatlascount, _propsetatlascount)
+    bgarraymode       = property(_propgetbgarraymode, _propsetbgarraymode)
+    scrollbacksize    = property(_propgetscrollbacksize, _propsetscrollbacksize) # the maximum number of rows kept in the scrollback history (0 turns it off)
+    scrollbacklength  = property(_propgetscrollbacklength, None) # the number of rows currently in the scrollback history
+    scrollbackoffset  = property(_propgetscrollbackoffset, _propsetscrollbackoffset) # how many rows back into the history the surface is showing (0 shows the current cells)
+    layers            = property(_propgetlayers, None) # a list of the surface's PygcurseLayer objects, from the bottom one to the top one
+    glyphcachesize    = property(_propgetglyphcachesize, _propsetglyphcachesize)
+    glyphcachehits    = property(_propgetglyphcachehits, None)
+    glyphcachemisses  = property(_propgetglyphcachemisses, None)
+    dirtycount        = property(_propgetdirtycount, None) # the number of cells that the next update() will redraw
 
     left        = property(_propgetleft, None)
     right       = property(_propgetright, None) # TODO - need set functions for properties that cause a resize
@@ -1702,39 +2812,41 @@ def pygprint(self, obj='', *objs, sep=' ', end='\n', fgcolor=None, bgcolor=None,
         xdelta = x1 - x0
         ydelta = abs(y1 - y0)
         error = -xdelta / 2 # TODO - float div or int div?
-        y = y0
-        for x in range(x0, x1+1): # +1 to include x1 in the range
-            if isSteep:
-                self.putchar(char, y, x, fgcolor, bgcolor)
-            else:
-                self.putchar(char, x, y, fgcolor, bgcolor)
+        with self.batch(): # putchar() is called for each point on the line, so only update once at the end
+            y = y0
+            for x in range(x0, x1+1): # +1 to include x1 in the range
+                if isSteep:
+                    self.putchar(char, y, x, fgcolor, bgcolor)
+                else:
+                    self.putchar(char, x, y, fgcolor, bgcolor)
 
-            error = error + ydelta
-            if error > 0:
-                y = y + ystep
-                error = error - xdelta
+                error = error + ydelta
+                if error > 0:
+                    y = y + ystep
+                    error = error - xdelta
 
 
     def drawlines(self, pointlist, closed=False, char=' ', fgcolor=None, bgcolor=None):
         if len(pointlist) < 2:
             return
-        for i in range(len(pointlist) - 1):
-            self.drawline(pointlist[i], pointlist[i + 1], char, fgcolor, bgcolor)
-        if closed:
-            self.drawline(pointlist[-1], pointlist[0], char, fgcolor, bgcolor)
+        with self.batch():
+            for i in range(len(pointlist) - 1):
+                self.drawline(pointlist[i], pointlist[i + 1], char, fgcolor, bgcolor)
+            if closed:
+                self.drawline(pointlist[-1], pointlist[0], char, fgcolor, bgcolor)
 
 
 class PygcurseWindow(PygcurseSurface):
     _pygcurseClass = 'PygcurseWindow'
 
-    def __init__(self, width=24, height=18, caption=None, font=None, fgcolor=DEFAULTFGCOLOR, bgcolor=DEFAULTBGCOLOR, fullscreen=False):
+    def __init__(self, width=24, height=18, caption=None, font=None, fgcolor=DEFAULTFGCOLOR, bgcolor=DEFAULTBGCOLOR, fullscreen=False, usenumpy=False):
         pygame.init()
         self._fullscreen = fullscreen
         fullscreen = fullscreen and FULLSCREEN or _NEW_WINDOW
         if sys.version.startswith('2.'):
-            super(PygcurseWindow, self).__init__(width, height, font, fgcolor, bgcolor, fullscreen) # for Python 2
+            super(PygcurseWindow, self).__init__(width, height, font, fgcolor, bgcolor, fullscreen, usenumpy) # for Python 2
         else:
-            super().__init__(width, height, font, fgcolor, bgcolor, fullscreen) # for Python 3 and later
+            super().__init__(width, height, font, fgcolor, bgcolor, fullscreen, usenumpy) # for Python 3 and later
         if caption is not None:
             pygame.display.set_caption(caption)
 
@@ -1754,25 +2866,591 @@ class PygcurseWindow(PygcurseSurface):
         if value and not self._fullscreen:
             self._fullscreen = True
             self._windowsurface = pygame.display.set_mode((self.pixelwidth, self.pixelheight), pygame.FULLSCREEN)
+            self._fullblitneeded = True
         elif not value and self._fullscreen:
             self._fullscreen = False
             self._windowsurface = pygame.display.set_mode((self.pixelwidth, self.pixelheight))
+            self._fullblitneeded = True
 
     fullscreen = property(_propgetfullscreen, _propsetfullscreen)
 
 
+def _parentproperty(name):
+    # Returns a property that gets and sets the attribute called name of a PygcurseSubsurface's parent instead of its own. This is used for everything that belongs to the parent surface, such as the font, the cell size, the caches, and the rendering settings.
+    def getter(self):
+        return getattr(self._parent, name)
+    def setter(self, value):
+        setattr(self._parent, name, value)
+    return property(getter, setter)
+
+
+class PygcurseSubsurface(PygcurseSurface):
+    """
+    A view of a region of a PygcurseSurface object, created with the surface's subsurface() method. It has the drawing methods of a PygcurseSurface (write(), putchars(), fill(), tint(), and so on) along with its own cursor and default colors, but it uses the coordinates of the region and its text is cut off (and scrolled) at the region's edges.
+
+    A subsurface doesn't have any cells or pixels of its own: drawing on it changes the cells of the parent surface, and update() updates the parent surface. So creating one is cheap, and any number of them can share a surface (overlapping or not.) The font, cell size, glyph caches, rendering settings (such as atlasmode and antialias), and input cursor are the parent's, and setting them on a subsurface sets them on the parent. The surface property is the part of the parent's pygame.Surface object that the region covers. Subsurfaces don't have layers or a scrollback, don't support input(), and can't be resized.
+    """
+    _pygcurseClass = 'PygcurseSubsurface'
+
+    def __init__(self, parent, x, y, width, height):
+        # PygcurseSurface.__init__() isn't called, since it creates the cells, the pixel surface, and the font.
+        self._parent = parent
+        self._cursorx = 0
+        self._cursory = 0
+        self._cursorstack = []
+        self._width = width
+        self._height = height
+        self._fgcolor = getpygamecolor(parent._fgcolor)
+        self._bgcolor = getpygamecolor(parent._bgcolor)
+        self._rdelta = parent._rdelta
+        self._gdelta = parent._gdelta
+        self._bdelta = parent._bdelta
+        self._cells = _CellGridView(parent, x, y, width, height)
+        self._tabsize = parent._tabsize
+        self._scrollback = None
+        self._scrollbackoffset = 0
+        self._viewcells = None
+        self._layers = []
+        self._scrollcount = 0
+        self._autoupdate = parent.autoupdate
+        self._batchdepth = 0
+        self._batchautoupdate = None
+
+
+    def update(self):
+        """Updates the parent surface, which draws the cells changed through this subsurface (along with any other changed cells of the parent)."""
+        self._parent.update()
+
+
+    def _scroll(self, lines=1, offscreenrows=()):
+        """Scroll the content of the subsurface's region up by lines rows. The parent's pixels aren't moved; the parent's next update() repaints the cells that look different."""
+        if lines < 1:
+            return
+        self._cells.scroll(' ', self._fgcolor, self._bgcolor, self._rdelta, self._gdelta, self._bdelta, lines)
+        self._scrollcount += lines
+
+
+    def resize(self, newwidth=None, newheight=None, fgcolor=None, bgcolor=None):
+        raise Exception('A subsurface cannot be resized. Create a new one with the parent\'s subsurface() method instead.')
+
+
+    def input(self, *args, **kwargs):
+        raise Exception('input() is not supported on a subsurface. Call the parent surface\'s input() instead.')
+
+
+    def addlayer(self, z=None):
+        raise Exception('Subsurfaces don\'t have layers. Add layers to the parent surface instead.')
+
+
+    def getdisplayedcolors(self, x, y):
+        """Returns the colors that the parent's update() draws the given cell with (see PygcurseSurface.getdisplayedcolors()), which include any of the parent's layers over the cell. If x and y is not on the subsurface, returns (None, None)"""
+        if not self.isonscreen(x, y):
+            return None, None
+        return self._parent.getdisplayedcolors(self._cells.x + x, self._cells.y + y)
+
+
+    def clearatlases(self):
+        self._parent.clearatlases()
+
+
+    def clearglyphcache(self):
+        self._parent.clearglyphcache()
+
+
+    def _propgetparent(self):
+        return self._parent
+
+
+    def _propgetoffset(self):
+        return (self._cells.x, self._cells.y)
+
+
+    def _propgetsurface(self):
+        cellwidth, cellheight = self._parent.cellsize
+        return self._parent.surface.subsurface((self._cells.x * cellwidth, self._cells.y * cellheight, self._width * cellwidth, self._height * cellheight)) # shares its pixels with the parent's surface
+
+
+    def _propgetinputcursor(self):
+        x, y = self._parent.inputcursor
+        return (x - self._cells.x, y - self._cells.y)
+
+
+    def _propsetinputcursor(self, value):
+        x = int(value[0])
+        y = int(value[1])
+        if self.isonscreen(x, y):
+            self._parent.inputcursor = (self._cells.x + x, self._cells.y + y)
+
+
+    def _propsetscrollbacksize(self, value):
+        raise Exception('Subsurfaces don\'t have a scrollback. Set the parent surface\'s scrollbacksize instead.')
+
+
+    def _propsetpixelsize(self, value):
+        self.resize() # raises an exception
+
+
+    def _propgetdirtycount(self):
+        return self._parent.dirtycount
+
+    parent            = property(_propgetparent, None) # the surface whose cells this subsurface draws on
+    offset            = property(_propgetoffset, None) # the (x, y) cell coordinates of the subsurface's top-left cell on the parent
+    surface           = property(_propgetsurface, None)
+    inputcursor       = property(_propgetinputcursor, _propsetinputcursor) # in the subsurface's coordinates
+    scrollbacksize    = property(PygcurseSurface._propgetscrollbacksize, _propsetscrollbacksize)
+    pixelsize         = property(PygcurseSurface._propgetpixelsize, _propsetpixelsize)
+    dirtycount        = property(_propgetdirtycount, None) # the number of cells that the parent's next update() will redraw
+    inputcursormode   = _parentproperty('inputcursormode')
+    font              = _parentproperty('font')
+    cellwidth         = _parentproperty('cellwidth')
+    cellheight        = _parentproperty('cellheight')
+    cellsize          = _parentproperty('cellsize')
+    antialias         = _parentproperty('antialias')
+    runrendering      = _parentproperty('runrendering')
+    atlasmode         = _parentproperty('atlasmode')
+    atlascount        = _parentproperty('atlascount')
+    bgarraymode       = _parentproperty('bgarraymode')
+    autoblit          = _parentproperty('autoblit')
+    autodisplayupdate = _parentproperty('autodisplayupdate')
+    glyphcachesize    = _parentproperty('glyphcachesize')
+    glyphcachehits    = _parentproperty('glyphcachehits')
+    glyphcachemisses  = _parentproperty('glyphcachemisses')
+    # the inherited methods that work with pixels (blitto(), gettopleftpixel(), and so on) read these
+    _surfaceobj       = property(_propgetsurface, None)
+    _cellwidth        = _parentproperty('cellwidth')
+    _cellheight       = _parentproperty('cellheight')
+    _font             = _parentproperty('font')
+
+
+class PygcursePad(PygcurseSurface):
+    """
+    A surface of cells that can be much larger than the screen (like the pads of curses), such as the map of a roguelike game or a big spreadsheet. It has the drawing methods of a PygcurseSurface, but no pixels of its own: refresh() shows a region of it on a PygcurseSurface or PygcurseWindow object, which only draws the cells in view.
+
+    By default the cells are stored in NumPy arrays if the numpy module is installed, which take 19 bytes per cell (about 76 MB for a 2000 x 2000 pad). Pads don't have layers, a scrollback, or an input cursor, don't support input(), and can't be resized. Since they don't have pixels either, the font, the cell size, the rendering settings, and the methods that work with pixel coordinates raise an exception.
+    """
+    _pygcurseClass = 'PygcursePad'
+
+    def __init__(self, width=80, height=25, fgcolor=DEFAULTFGCOLOR, bgcolor=DEFAULTBGCOLOR, usenumpy=None):
+        """
+        Creates a new PygcursePad object.
+
+        - width and height are the number of cells in the pad.
+        - fgcolor and bgcolor are the default foreground and background colors.
+        - usenumpy, if True, stores the cells in NumPy arrays, and if False, in Python lists (which takes far more memory for big pads.) If None, NumPy arrays are used if the numpy module is installed.
+        """
+        # PygcurseSurface.__init__() isn't called, since it creates the pixel surface and the font.
+        self._cursorx = 0
+        self._cursory = 0
+        self._cursorstack = []
+        self._width = width
+        self._height = height
+        self._fgcolor = getpygamecolor(fgcolor)
+        self._bgcolor = getpygamecolor(bgcolor)
+        self._rdelta = 0
+        self._gdelta = 0
+        self._bdelta = 0
+        if usenumpy is None:
+            usenumpy = numpy is not None
+        if usenumpy:
+            self._cells = _NumpyCellGrid(width, height, self._fgcolor, self._bgcolor)
+        else:
+            self._cells = _CellGrid(width, height, self._fgcolor, self._bgcolor)
+        self._font = None # pads aren't drawn with a font of their own
+        self._tabsize = 8
+        self._scrollback = None
+        self._scrollbackoffset = 0
+        self._viewcells = None
+        self._layers = []
+        self._scrollcount = 0
+        self._autoupdate = False # there are no pixels to update; call refresh() instead
+        self._batchdepth = 0
+        self._batchautoupdate = None
+        self._lastrefresh = None # the (dstsurf, padx, pady, x, y, width, height) of the last refresh() call
+
+
+    def update(self):
+        """Does nothing, since pads don't have pixels. Call refresh() to show the pad on a surface."""
+        pass
+
+
+    def refresh(self, dstsurf, padx=0, pady=0, region=None):
+        """
+        Shows the part of the pad whose top-left cell is at padx, pady in a region of dstsurf (by default, all of dstsurf), like the prefresh() function of curses. The pad's cells are copied to dstsurf, and dstsurf is updated if its autoupdate is on. The region is cut off at the edges of dstsurf and of the pad.
+
+        If the last refresh() showed the pad in the same region of the same surface at a different padx, pady (as it does when scrolling around a map), the pixels already drawn for the cells that are still in view are moved over instead of drawn again. dstsurf's next update() then only draws the newly exposed cells and the cells that changed.
+        """
+        x, y, width, height = dstsurf.getregion(region)
+        if (x, y, width, height) == (None, None, None, None):
+            return
+        if padx < 0:
+            x, width, padx = x - padx, width + padx, 0
+        if pady < 0:
+            y, height, pady = y - pady, height + pady, 0
+        width = min(width, self._width - padx)
+        height = min(height, self._height - pady)
+        if width < 1 or height < 1:
+            return
+
+        last = self._lastrefresh
+        if last is not None and last[0] is dstsurf and last[3:] == (x, y, width, height):
+            # the pixels belong to the surface that dstsurf is a subsurface of (if it is one)
+            pixelsurf, pixelx, pixely = dstsurf, x, y
+            while isinstance(pixelsurf, PygcurseSubsurface):
+                pixelx, pixely = pixelx + pixelsurf._cells.x, pixely + pixelsurf._cells.y
+                pixelsurf = pixelsurf._parent
+            if not isinstance(pixelsurf, PygcursePad):
+                pixelsurf._movedrawncells(pixelx, pixely, width, height, last[1] - padx, last[2] - pady)
+        self._lastrefresh = (dstsurf, padx, pady, x, y, width, height)
+
+        dstsurf._cells.copyfrom(self._cells, padx, pady, x, y, width, height, copyerased=True)
+        self._cells.markclean() # the pad's own dirty flags aren't used for anything, so don't let them pile up
+
+        if dstsurf._autoupdate:
+            dstsurf.update()
+
+
+    def _scroll(self, lines=1, offscreenrows=()):
+        """Scroll the content of the pad up by lines rows."""
+        if lines < 1:
+            return
+        self._cells.scroll(' ', self._fgcolor, self._bgcolor, self._rdelta, self._gdelta, self._bdelta, lines)
+        self._scrollcount += lines
+
+
+    def resize(self, newwidth=None, newheight=None, fgcolor=None, bgcolor=None):
+        raise Exception('A pad cannot be resized.')
+
+
+    def input(self, *args, **kwargs):
+        raise Exception('input() is not supported on a pad.')
+
+
+    def addlayer(self, z=None):
+        raise Exception('Pads don\'t have layers. Add layers to the surface the pad is shown on instead.')
+
+
+    def clearatlases(self):
+        pass # pads don't render anything, so there is nothing to clear
+
+
+    def clearglyphcache(self):
+        pass
+
+
+    def _nopixels(self, *args):
+        raise Exception('Pads don\'t have pixels. Call refresh() to show the pad on a PygcurseSurface or PygcurseWindow object.')
+
+
+    def _noinputcursor(self, *args):
+        raise Exception('Pads don\'t have an input cursor.')
+
+
+    def _propsetscrollbacksize(self, value):
+        raise Exception('Pads don\'t have a scrollback.')
+
+
+    def _propsetpixelsize(self, value):
+        self.resize() # raises an exception
+
+    blitto = getcharatpixel = getcoordinatesatpixel = gettopleftpixel = gettoppixel = getleftpixel = _nopixels
+    font = cellwidth = cellheight = cellsize = surface = pixelwidth = pixelheight = pixelrect = property(_nopixels, _nopixels)
+    antialias = runrendering = atlasmode = atlascount = bgarraymode = autoblit = autodisplayupdate = property(_nopixels, _nopixels)
+    glyphcachesize = glyphcachehits = glyphcachemisses = property(_nopixels, _nopixels)
+    inputcursor = inputcursormode = property(_noinputcursor, _noinputcursor)
+    scrollbacksize = property(PygcurseSurface._propgetscrollbacksize, _propsetscrollbacksize)
+    pixelsize = property(_nopixels, _propsetpixelsize)
+
+
+class PygcurseLayer(object):
+    """
+    A plane of cells that is drawn over a PygcurseSurface's own cells (and over the layers below it). Create layers with the surface's addlayer() method.
+
+    Layers are for things like sprites, cursors, and popup windows that move around over the rest of the screen: erase them from their layer and draw them somewhere else, and nothing underneath has to be redrawn. update() only composites and repaints the cells that changed in the surface or in any of its layers.
+
+    A new layer's cells are transparent. Erased cells (see erase()) are transparent, and cells with a background color that has 0 alpha (such as ERASECOLOR, the default) show the background color of the cell underneath. Drawing on a layer doesn't change the surface's own cells, so the surface's getchar() and getchars() still return those.
+    """
+    def __init__(self, pygsurf, z=0):
+        self._pygsurf = pygsurf
+        self._z = z
+        self._visible = True
+        self._cells = pygsurf._cells.__class__(pygsurf._width, pygsurf._height, getpygamecolor(pygsurf._fgcolor), ERASECOLOR)
+        self._cells.takedirty() # nothing on the layer has been drawn yet
+
+
+    def _changed(self):
+        if self._pygsurf._autoupdate:
+            self._pygsurf.update()
+
+
+    def getchar(self, x, y):
+        """Returns the character at cell x, y of the layer, or None if the cell is transparent."""
+        if x < 0 or y < 0 or x >= self._pygsurf._width or y >= self._pygsurf._height:
+            return None
+        return self._cells.getchar(x, y)
+
+
+    def putchar(self, char, x, y, fgcolor=None, bgcolor=None):
+        """Draws a single character on the layer at cell x, y. If fgcolor or bgcolor is None, the cell's color is left as it is (a new layer's cells have the surface's foreground color and a transparent background color.)"""
+        if type(char) != str:
+            raise Exception('Argument 1 must be str, not %s' % (str(type(char))))
+        if char == '' or x < 0 or y < 0 or x >= self._pygsurf._width or y >= self._pygsurf._height:
+            return None
+
+        self._cells.setcell(x, y, char[0], fgcolor is not None and getpygamecolor(fgcolor) or None, bgcolor is not None and getpygamecolor(bgcolor) or None)
+        self._changed()
+        return char
+
+
+    def putchars(self, chars, x, y, fgcolor=None, bgcolor=None):
+        """Draws a string of characters on one row of the layer, starting at cell x, y. The characters that are off the edges of the surface are left out. If fgcolor or bgcolor is None, the colors of the cells are left as they are."""
+        if type(chars) != str:
+            raise Exception('Argument 1 must be str, not %s' % (str(type(chars))))
+        start = max(0, -x)
+        end = min(len(chars), self._pygsurf._width - x)
+        if y < 0 or y >= self._pygsurf._height or start >= end:
+            return
+
+        self._cells.settext(x + start, y, chars[start:end], fgcolor is not None and getpygamecolor(fgcolor) or None, bgcolor is not None and getpygamecolor(bgcolor) or None)
+        self._changed()
+
+
+    def fill(self, char=' ', fgcolor=None, bgcolor=None, region=None):
+        """Fills the region of the layer (by default, the whole layer) with char. If char, fgcolor, or bgcolor is None, that part of the cells is left as it is."""
+        x, y, width, height = self._pygsurf.getregion(region)
+        if (x, y, width, height) == (None, None, None, None):
+            return
+
+        self._cells.fill(x, y, width, height, char, fgcolor is not None and getpygamecolor(fgcolor) or None, bgcolor is not None and getpygamecolor(bgcolor) or None)
+        self._changed()
+
+
+    def erase(self, region=None):
+        """Makes the cells in the region of the layer (by default, the whole layer) transparent again."""
+        x, y, width, height = self._pygsurf.getregion(region)
+        if (x, y, width, height) == (None, None, None, None):
+            return
+
+        self._cells.erase(x, y, width, height)
+        self._changed()
+
+
+    def _propgetsurface(self):
+        return self._pygsurf
+
+
+    def _propgetz(self):
+        return self._z
+
+
+    def _propsetz(self, value):
+        if value == self._z:
+            return
+        self._z = value
+        self._pygsurf._layers.sort(key=_zorderkey)
+        self._pygsurf._cells.markdirty(0, 0, self._pygsurf._width, self._pygsurf._height) # the cells are composited again in the new order
+        self._changed()
+
+
+    def _propgetvisible(self):
+        return self._visible
+
+
+    def _propsetvisible(self, value):
+        value = bool(value)
+        if value == self._visible:
+            return
+        self._visible = value
+        self._pygsurf._cells.markdirty(0, 0, self._pygsurf._width, self._pygsurf._height) # the cells are composited again with or without this layer
+        self._changed()
+
+    surface = property(_propgetsurface, None) # the PygcurseSurface object the layer is drawn on
+    z       = property(_propgetz, _propsetz) # layers with higher z values are drawn over the ones with lower z values
+    visible = property(_propgetvisible, _propsetvisible) # if False, the layer isn't drawn
+
+
+class PygcurseTextStream(io.TextIOBase):
+    """
+    A file-like text stream that writes to a PygcurseSurface object. Assigning it to sys.stdout (and sys.stdin) lets a stdio text-based program use the regular print() and input() functions with a Pygcurse window:
+
+        win = pygcurse.PygcurseWindow(40, 25)
+        sys.stdout = sys.stdin = pygcurse.PygcurseTextStream(win)
+
+    Unlike calling the surface's write() directly, the written text is buffered, and the surface is only redrawn when the buffered text is flushed, so printing many lines costs one redraw instead of one redraw per line.
+    """
+    def __init__(self, pygsurf, buffering='block', buffersize=None, maxfps=None, fgcolor=None, bgcolor=None):
+        """
+        - pygsurf is the PygcurseSurface object (or PygcurseWindow object) that the text is written to.
+        - buffering is either 'line', which flushes the text whenever a newline is written, or 'block', which flushes the text whenever buffersize characters have been written.
+        - buffersize is the number of characters buffered in 'block' mode. If None, this is the number of cells on the surface, so that about one screenful of text is drawn at a time.
+        - maxfps is the maximum number of times per second that the surface is redrawn when the text is flushed automatically. If None, the surface is redrawn every time. A redraw that is put off because of maxfps happens on the next write to the stream after 1 / maxfps seconds have passed, or when flush() is called or the stream is read from (whichever comes first.) So a program that stops writing for a while (say, before a time.sleep() call) should call flush() (or use print(..., flush=True)) to make sure its last text is shown. Calling flush() (or reading from the stream) always redraws the surface.
+        - fgcolor and bgcolor are the colors of the written text. If None, the surface's colors are used.
+        """
+        if buffering not in ('line', 'block'):
+            raise Exception("buffering must be 'line' or 'block', not %r" % (buffering,))
+        self.pygsurf = pygsurf
+        self.buffering = buffering
+        self.buffersize = buffersize
+        self.maxfps = maxfps
+        self.fgcolor = fgcolor
+        self.bgcolor = bgcolor
+        self._buffer = [] # the strings written since the last flush
+        self._buffered = 0 # the number of characters in self._buffer
+        self._lastredraw = 0 # the time.time() of the last redraw
+        self._redrawpending = False # True if text was written to the surface's cells but the surface hasn't been redrawn yet
+
+
+    def writable(self):
+        return True
+
+
+    def readable(self):
+        return True
+
+
+    def isatty(self):
+        return False
+
+
+    def write(self, text):
+        if self.closed:
+            raise ValueError('I/O operation on closed file.')
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self.buffering == 'line':
+            flushnow = '\n' in text
+        else:
+            buffersize = (self.buffersize is None) and (self.pygsurf.width * self.pygsurf.height) or (self.buffersize)
+            flushnow = self._buffered >= buffersize
+        if flushnow or (self._redrawpending and self._redrawallowed()):
+            # (the second case delivers a redraw that maxfps put off earlier, along with the text written since then)
+            self._flushtext()
+        return len(text)
+
+
+    def flush(self):
+        """Writes all of the buffered text to the surface and redraws it."""
+        if self.closed or not pygame.get_init():
+            return # (the interpreter flushes sys.stdout at exit, which can be after pygame.quit() was called)
+        self._flushtext(True)
+
+
+    def _flushtext(self, redraw=False):
+        """Writes the buffered text to the surface's cells. The surface is redrawn if redraw is True or if the maxfps limit allows it."""
+        if self._buffer:
+            text = ''.join(self._buffer)
+            self._buffer = []
+            self._buffered = 0
+            autoupdate = self.pygsurf.autoupdate
+            self.pygsurf.autoupdate = False
+            try:
+                self.pygsurf.write(text, fgcolor=self.fgcolor, bgcolor=self.bgcolor)
+            finally:
+                self.pygsurf.autoupdate = autoupdate
+            self._redrawpending = True
+
+        if self._redrawpending and self.pygsurf.autoupdate and (redraw or self._redrawallowed()):
+            self.pygsurf.update()
+            self._lastredraw = time.time()
+            self._redrawpending = False
+
+
+    def _redrawallowed(self):
+        """Returns True if redrawing the surface now wouldn't go over the maxfps limit."""
+        return self.maxfps is None or time.time() - self._lastredraw >= 1.0 / self.maxfps
+
+
+    def readline(self, size=-1):
+        """Flushes the written text, then lets the user type in a line of text with the surface's input() method. The typed text is left on the surface and the cursor moves to the start of the next line, the same as with a terminal."""
+        self.flush()
+        line = self.pygsurf.input() + '\n'
+        if size is not None and size >= 0:
+            line = line[:size]
+        return line
+
+
+class _GapBuffer(object):
+    """
+    A gap buffer of characters, used by PygcurseInput objects to hold the typed text. The characters are kept in a list with a "gap" of unused slots at the position of the last edit, so that typing or deleting at the same place (which is what usually happens) doesn't shift the rest of the text around. Only moving the edit position costs time, in proportion to the distance moved.
+    """
+    def __init__(self, text=''):
+        self.settext(text)
+
+
+    def settext(self, text):
+        """Replaces all of the text in the buffer."""
+        self._chars = list(text) + [None] * 64
+        self._gapstart = len(text) # index of the first unused slot
+        self._gapend = len(self._chars) # index of the first character after the gap
+
+
+    def __len__(self):
+        return len(self._chars) - (self._gapend - self._gapstart)
+
+
+    def gettext(self, start=0, end=None):
+        """Returns the text from index start up to (but not including) index end as a string. Only those characters are looked at."""
+        length = len(self)
+        if end is None or end > length:
+            end = length
+        start = max(0, start)
+        if start >= end:
+            return ''
+        gapstart = self._gapstart # syntactic sugar
+        gaplength = self._gapend - gapstart
+        if end <= gapstart:
+            return ''.join(self._chars[start:end])
+        if start >= gapstart:
+            return ''.join(self._chars[start + gaplength:end + gaplength])
+        return ''.join(self._chars[start:gapstart]) + ''.join(self._chars[self._gapend:end + gaplength])
+
+
+    def _movegap(self, index):
+        """Moves the gap so that it starts at index, by shifting the characters between it and index to the other side of the gap."""
+        gaplength = self._gapend - self._gapstart
+        if index < self._gapstart:
+            self._chars[index + gaplength:self._gapend] = self._chars[index:self._gapstart]
+        elif index > self._gapstart:
+            self._chars[self._gapstart:index] = self._chars[self._gapend:index + gaplength]
+        self._gapstart = index
+        self._gapend = index + gaplength
+
+
+    def insert(self, index, text):
+        """Inserts the string text before the character at index."""
+        self._movegap(index)
+        if len(text) > self._gapend - self._gapstart:
+            # grow the gap (by at least the current length, so that appending one character at a time takes amortized constant time)
+            growth = len(text) + max(64, len(self))
+            self._chars[self._gapend:self._gapend] = [None] * growth
+            self._gapend += growth
+        self._chars[self._gapstart:self._gapstart + len(text)] = list(text)
+        self._gapstart += len(text)
+
+
+    def delete(self, index, count=1):
+        """Deletes count characters starting at index (or fewer, if the text ends before then)."""
+        self._movegap(index)
+        self._gapend = min(self._gapend + count, len(self._chars))
+
+
+    def replace(self, index, text):
+        """Overwrites the characters starting at index with the string text, which can extend past the end of the current text."""
+        self.delete(index, len(text))
+        self.insert(index, text)
+
+
 class PygcurseInput():
     """
     A PygcurseInput object keeps track of the state of a string of text being entered, identical to the behavior of raw_input()/input().
 
-    Keypress events are sent to the object, which tracks the characters entered (in self.buffer) and the position of the cursor. The update() function draws the current state of the input to the PygcurseSurface object associated with it. (This is set in the constructor with the pygsurf parameter.)
+    Keypress events are sent to the object, which tracks the characters entered (in self.text, which is kept in a gap buffer) and the position of the cursor. The update() function draws the current state of the input to the PygcurseSurface object associated with it. (This is set in the constructor with the pygsurf parameter.) Only the part of the input that changed since the last update() is redrawn, so editing long input stays fast.
 
     The design of this class is that it is meant to be polled. It does not use callbacks or multithreading or an event loop.
     """
 
 
     def __init__(self, pygsurf=None, prompt='', x=None, y=None, maxlength=None, fgcolor=None, bgcolor=None, promptfgcolor=None, promptbgcolor=None, whitelistchars=None, blacklistchars=None):
-        self.buffer = []
+        self._buffer = _GapBuffer()
         self.prompt = prompt
         self.pygsurf = pygsurf
         if maxlength is None and pygsurf is None:
@@ -1784,7 +3462,12 @@ class PygcurseInput():
         self.cursor = 0
         self.showCursor = True
         self.blinkingCursor = True
-        self.eraseBufferSize = None # when set to None, nothing needs to be erased. When the buffer decreases in size, we need to remember how big it was so that we can paint blank space characters.
+
+        # What update() last drew, so that the next update() only needs to redraw the text from self._changedfrom onward. _drawnprompt is None if everything (including the prompt) needs to be redrawn.
+        self._changedfrom = 0 # the lowest index in the text that has changed since the last update(), or None if the text hasn't changed
+        self._drawnprompt = None
+        self._drawnsurf = None
+        self._drawnlength = 0 # the number of cells that were drawn (for the prompt and text) by the last update(). Any cells past the new length are erased.
 
         self.insertMode = False
         self.done = False # when True, the enter key has been pressed.
@@ -1836,13 +3519,17 @@ class PygcurseInput():
             raise Exception('Invalid argument passed for pygsurf parameter.')
 
 
+    def _markchanged(self, index):
+        """Records that the text from index onward has changed and needs to be redrawn by the next update()."""
+        if self._changedfrom is None or index < self._changedfrom:
+            self._changedfrom = index
+
+
     def updateerasebuffersize(self):
         """
-        This method must be called whenever a character is deleted from the buffer. The eraseBufferSize member tracks how many characters have been deleted so that the next time this PygcurseInput object is drawn to the PygcurseSurface, it will erase the additional leftover characters.
+        This method used to be called whenever a character was deleted from the buffer, so that update() knew how many leftover characters to erase. update() now does this on its own, so this method does nothing and is only kept for backwards compatibility.
         """
-        # NOTE - don't update if the current buffer size is smaller than the current erase buffer size (two backspaces in a row without calling update() to reset erasebuffersize)
-        if self.eraseBufferSize is None or len(self.buffer) > self.eraseBufferSize:
-            self.eraseBufferSize = len(self.buffer)
+        pass
 
 
     def backspace(self):
@@ -1850,8 +3537,8 @@ class PygcurseInput():
         if self.cursor == 0:
             return
         self.cursor -= 1
-        self.updateerasebuffersize()
-        del self.buffer[self.cursor]
+        self._buffer.delete(self.cursor)
+        self._markchanged(self.cursor)
 
 
     def insert(self):
@@ -1861,10 +3548,10 @@ class PygcurseInput():
 
     def delete(self):
         """Perform the action that happens when the delete key is pressed."""
-        if self.cursor == len(self.buffer):
+        if self.cursor == len(self._buffer):
             return
-        self.updateerasebuffersize()
-        del self.buffer[self.cursor]
+        self._buffer.delete(self.cursor)
+        self._markchanged(self.cursor)
 
 
     def home(self):
@@ -1874,7 +3561,7 @@ class PygcurseInput():
 
     def end(self):
         """Perform the action that happens when the end key is pressed."""
-        self.cursor = len(self.buffer)
+        self.cursor = len(self._buffer)
 
 
     def leftarrow(self):
@@ -1885,37 +3572,52 @@ class PygcurseInput():
 
     def rightarrow(self):
         """Perform the action that happens when the right arrow key is pressed."""
-        if self.cursor < len(self.buffer):
+        if self.cursor < len(self._buffer):
             self.cursor += 1
 
 
-    def paste(text):
+    def paste(self, text):
         """
-        Inserts the string text into the buffer at the position of the cursor. This does not actually use the system's clipboard, it only pastes from the text parameter.
+        Inserts the string text into the buffer at the position of the cursor (or overwrites the text there, in insert mode) and moves the cursor past it. This does not actually use the system's clipboard, it only pastes from the text parameter.
+
+        The text is filtered by the white and black lists and truncated to the maximum length in a single pass, and then added to the buffer all at once. Newlines are dropped and tabs become spaces, like they would if the text was typed in. Nothing is drawn until the next update(), which redraws the pasted text just once.
         """
-        text = str(text)
-        if not self.insertMode and len(text) + len(self.buffer) > self._maxlength:
-            text = text[:self._maxlength - len(self.buffer)] # truncate the pasted text (this is what web browsers do, so I'm copying that behavior)
+        if self.done:
+            return
+        text = str(text).replace('\r', '').replace('\n', '')
+        if self.whitelistchars is not None or self.blacklistchars is not None:
+            # filter before the tabs become spaces, the same as sendkeyevent() does for a typed character
+            whitelist = None
+            if self.whitelistchars is not None:
+                whitelist = set(self.whitelistchars)
+            blacklist = set(self.blacklistchars or '')
+            text = ''.join([char for char in text if (whitelist is None or char in whitelist) and char not in blacklist])
+        text = text.replace('\t', ' ')
+
+        # truncate the pasted text (this is what web browsers do, so I'm copying that behavior)
+        if self.insertMode:
+            text = text[:max(self._maxlength, len(self._buffer)) - self.cursor] # overwritten characters don't make the text longer
+        else:
+            text = text[:max(0, self._maxlength - len(self._buffer))]
+        if not text:
+            return
 
-        if self.cursor == len(self.buffer):
-            # append to end
-            self.buffer.extend(list(text))
-        elif self.cursor == 0:
-            # prepend to beginning
-            self.buffer = list(text) + self.buffer
+        if self.insertMode:
+            # Overwrite characters
+            self._buffer.replace(self.cursor, text)
         else:
-            if self.insertMode:
-                # Overwrite characters
-                self.buffer = self.buffer[:self.cursor] + list(text) + self.buffer[self.cursor + len(text):]
-            else:
-                self.buffer = self.buffer[:self.cursor] + list(text) + self.buffer[self.cursor:]
+            self._buffer.insert(self.cursor, text)
+        self._markchanged(self.cursor)
+        self.cursor += len(text)
+        if self.pygsurf is not None:
+            self.pygsurf.inputcursor = self.pygsurf.getnthcellfrom(self.startx, self.starty, len(self.prompt) + self.cursor)
 
 
     def update(self, pygsurfObj=None):
         """
         Draw the PygcurseInput object to the PygcurseSurface object associated with it (in the self.pygsurf member) or to the pygsurfObj argument.
 
-        This method handles drawing the prompt, typed in text, and cursor of this object.
+        This method handles drawing the prompt, typed in text, and cursor of this object. Only the text from the leftmost character that changed since the last call is redrawn, and any leftover characters from longer text are erased in the same pass. (Everything is redrawn if the prompt, colors, or surface changed.)
         """
         if pygsurfObj is not None and pygsurfObj._pygcurseClass in ('PygcurseWindow', 'PygcurseSurface'): # TODO - need a better way to identify the object
             pygsurfObj = pygsurfObj.surface
@@ -1927,36 +3629,58 @@ class PygcurseInput():
         if self.lastScrollCount < pygsurfObj._scrollcount:
             # pygsurf has scrolled up since the last time this was drawn, move the input up.
             self.starty -= pygsurfObj._scrollcount - self.lastScrollCount
+            self.lastScrollCount = pygsurfObj._scrollcount
             # TODO - need to handle the case where the starty is now negative
 
-        if self.multiline:
-            pygsurfObj.pushcursor()
-            if self.eraseBufferSize is not None:
-                # need to blank out the previous drawn, longer string.
-                pygsurfObj.write(self.prompt + (' ' * self.eraseBufferSize))
-                pygsurfObj.popcursor() # revert to the original cursor before proceeding
-                pygsurfObj.pushcursor()
-                self.eraseBufferSize = None
-            pygsurfObj.write(self.prompt, fgcolor=self._promptfgcolor, bgcolor=self._promptbgcolor)
-            pygsurfObj.write(''.join(self.buffer) + ' ', fgcolor=self._fgcolor, bgcolor=self._bgcolor) # the space at the end is to change the color of the cursor
-            afterPromptX, afterPromptY = pygsurfObj.getnthcellfrom(self.startx, self.starty, len(self.prompt))
-            pygsurfObj.inputcursor = pygsurfObj.getnthcellfrom(afterPromptX, afterPromptY, self.cursor)
-            pygsurfObj._drawinputcursor() # TODO - there's a bug if the prompt goes past the right edge, the screen cursor is in a weird place.
-            pygsurfObj.popcursor() # restore previous cursor position that print() moved.
+        promptlength = len(self.prompt)
+        if self._drawnprompt != self.prompt or self._drawnsurf is not pygsurfObj:
+            start = 0 # redraw everything, starting with the prompt
+            if self._drawnsurf is not pygsurfObj:
+                self._drawnlength = 0 # nothing was drawn on this surface yet, so there is nothing to erase
+        elif self._changedfrom is not None:
+            start = promptlength + self._changedfrom
         else:
-            # all this must fit on one line, with any excess text truncated
-            if self.eraseBufferSize is not None:
-                # need to blank out the previous drawn, longer string.
-                tempcursorx = self.startx
-                while tempcursorx < pygsurfObj.width and tempcursorx < self.startx + len(self.prompt) + eraseBufferSize:
-                    pygsurfObj.putchar(' ', tempcursorx, self.starty)
-                    tempcursorx += 1
-                self.eraseBufferSize = None
-            numToPrint = self._width - self.startx - 1
-            # TODO - implement prompt colors, but keep in mind that this all has to be on one line.
-            pygsurfObj.putchars((self.prompt + ''.join(self.buffer))[:numToPrint], self.startx, self.starty, fgcolor=self._fgcolor, bgcolor=self._bgcolor)
-            pygsurfObj.inputcursor = pygsurfObj.getnthcellfrom(self.startx, self.starty, self.cursor)
-            pygsurfObj._drawinputcursor()
+            start = None # nothing changed, only the cursor needs to be drawn
+        self._drawnprompt = self.prompt
+        self._drawnsurf = pygsurfObj
+        self._changedfrom = None
+        length = promptlength + len(self._buffer) # the number of cells used by the prompt and text
+
+        with pygsurfObj.batch(): # the prompt and text are drawn with several write()/putchar() calls, so only update once at the end
+            if self.multiline:
+                if start is not None:
+                    # write() everything from the first changed cell onward (skipping anything that has scrolled off the top of the surface.)
+                    startcell = max(self.starty * pygsurfObj.width + self.startx + start, 0)
+                    start = startcell - (self.starty * pygsurfObj.width + self.startx)
+                    pygsurfObj.pushcursor()
+                    pygsurfObj.cursor = startcell % pygsurfObj.width, startcell // pygsurfObj.width
+                    if start < promptlength:
+                        pygsurfObj.write(self.prompt[start:], fgcolor=self._promptfgcolor, bgcolor=self._promptbgcolor)
+                    pygsurfObj.write(self._buffer.gettext(start - promptlength) + ' ', fgcolor=self._fgcolor, bgcolor=self._bgcolor) # the space at the end is to change the color of the cursor
+                    if self._drawnlength > length:
+                        # blank out the rest of the previously drawn, longer string.
+                        pygsurfObj.write(' ' * (self._drawnlength - length))
+                    pygsurfObj.popcursor() # restore previous cursor position that print() moved.
+                    self._drawnlength = length
+                    if self.lastScrollCount < pygsurfObj._scrollcount:
+                        # writing past the bottom row scrolled the surface, which moved the input up
+                        self.starty -= pygsurfObj._scrollcount - self.lastScrollCount
+                        self.lastScrollCount = pygsurfObj._scrollcount
+                pygsurfObj.inputcursor = pygsurfObj.getnthcellfrom(self.startx, self.starty, promptlength + self.cursor)
+                pygsurfObj._drawinputcursor() # TODO - there's a bug if the prompt goes past the right edge, the screen cursor is in a weird place.
+            else:
+                # all this must fit on one line, with any excess text truncated
+                numToPrint = pygsurfObj.width - self.startx - 1
+                if start is not None and start < numToPrint:
+                    # TODO - implement prompt colors, but keep in mind that this all has to be on one line.
+                    chars = self.prompt[start:] + self._buffer.gettext(max(start - promptlength, 0), numToPrint - promptlength)
+                    pygsurfObj.putchars(chars[:numToPrint - start], self.startx + start, self.starty, fgcolor=self._fgcolor, bgcolor=self._bgcolor)
+                    if self._drawnlength > length:
+                        # need to blank out the rest of the previously drawn, longer string.
+                        pygsurfObj.putchars(' ' * (min(self._drawnlength, numToPrint) - min(length, numToPrint)), self.startx + min(length, numToPrint), self.starty)
+                self._drawnlength = length
+                pygsurfObj.inputcursor = pygsurfObj.getnthcellfrom(self.startx, self.starty, promptlength + self.cursor)
+                pygsurfObj._drawinputcursor()
 
 
     def enter(self):
@@ -1975,9 +3699,10 @@ class PygcurseInput():
         if char in ('\r', '\n') and keyEvent.type == KEYUP: # TODO - figure out which is the right one
             self.done = True
             self.pygsurf.inputcursormode = None
-            x, y = self.pygsurf.getnthcellfrom(self.startx, self.starty, self.cursor)
+            x, y = self.pygsurf.getnthcellfrom(self.startx, self.starty, len(self.prompt) + len(self._buffer))
+            if self.pygsurf.isonscreen(x, y):
+                self.pygsurf.cursor = x, y # move the cursor past the end of the text (which may span several rows)
             self.pygsurf.write('\n') # print a newline to move the pygcurse surface object's cursor.
-            self.pygsurf._repaintcell(x, y)
         elif char not in ('\r', '\n') and keyEvent.type == KEYDOWN:
             if char is None and keyEvent.key in self.KEYMAPPING:
                 (self.KEYMAPPING[keyEvent.key])() # call the related method
@@ -1987,32 +3712,51 @@ class PygcurseInput():
 
                 if char == '\t':
                     char = ' '
-                if (not self.insertMode and len(self.buffer) < self._maxlength) or (self.insertMode and self.cursor == len(self.buffer)):
-                    self.buffer.insert(self.cursor, char)
+                if (not self.insertMode and len(self._buffer) < self._maxlength) or (self.insertMode and self.cursor == len(self._buffer)):
+                    self._buffer.insert(self.cursor, char)
+                    self._markchanged(self.cursor)
                     self.cursor += 1
-                elif len(self.buffer) < self._maxlength:
-                    self.buffer[self.cursor] = char
+                elif len(self._buffer) < self._maxlength:
+                    self._buffer.replace(self.cursor, char)
+                    self._markchanged(self.cursor)
                     self.cursor += 1
-        self.pygsurf.inputcursor = self.pygsurf.getnthcellfrom(self.startx, self.starty, self.cursor)
+        self.pygsurf.inputcursor = self.pygsurf.getnthcellfrom(self.startx, self.starty, len(self.prompt) + self.cursor)
 
 
     def _debug(self):
         """Print out the current state of the PygcurseInput object to stdout."""
-        print(self.prompt + ''.join(self.buffer) + '\t(%s length)' % len(self.buffer))
+        print(self.prompt + self.text + '\t(%s length)' % len(self._buffer))
         print('.' * len(self.prompt) + '.' * self.cursor + '^')
 
 
     def __len__(self):
         """Returns the length of the buffer. This does not include the length of the prompt."""
-        return len(self.buffer)
+        return len(self._buffer)
 
 
     # Properties
+    def _propgettext(self):
+        return self._buffer.gettext()
+
+    def _propsettext(self, value):
+        self._buffer.settext(value)
+        self.cursor = min(self.cursor, len(self._buffer))
+        self._markchanged(0)
+
+
+    def _propgetbuffer(self):
+        return list(self._buffer.gettext()) # (this is a copy, so changing it doesn't change the text. Set the buffer or text property instead.)
+
+    def _propsetbuffer(self, value):
+        self._propsettext(''.join(value))
+
+
     def _propgetfgcolor(self):
         return self._fgcolor
 
     def _propsetfgcolor(self, value):
         self._fgcolor = getpygamecolor(value)
+        self._drawnprompt = None
 
 
     def _propgetbgcolor(self):
@@ -2020,6 +3764,7 @@ class PygcurseInput():
 
     def _propsetbgcolor(self, value):
         self._bgcolor = getpygamecolor(value)
+        self._drawnprompt = None
 
     def _propgetcolors(self):
         return (self._fgcolor, self._bgcolor)
@@ -2027,6 +3772,7 @@ class PygcurseInput():
     def _propsetcolors(self, value):
         self._fgcolor = getpygamecolor(value[0])
         self._bgcolor = getpygamecolor(value[1])
+        self._drawnprompt = None
 
 
     def _propgetpromptfgcolor(self):
@@ -2034,6 +3780,7 @@ class PygcurseInput():
 
     def _propsetpromptfgcolor(self, value):
         self._promptfgcolor = getpygamecolor(value)
+        self._drawnprompt = None
 
 
     def _propgetpromptbgcolor(self):
@@ -2041,6 +3788,7 @@ class PygcurseInput():
 
     def _propsetpromptbgcolor(self, value):
         self._promptbgcolor = getpygamecolor(value)
+        self._drawnprompt = None
 
     def _propgetpromptcolors(self):
         return (self._promptfgcolor, self._promptbgcolor)
@@ -2048,6 +3796,7 @@ class PygcurseInput():
     def _propsetpromptcolors(self, value):
         self._promptfgcolor = getpygamecolor(value[0])
         self._promptbgcolor = getpygamecolor(value[1])
+        self._drawnprompt = None
 
     fgcolor = property(_propgetfgcolor, _propsetfgcolor)
     bgcolor = property(_propgetbgcolor, _propsetbgcolor)
@@ -2055,6 +3804,8 @@ class PygcurseInput():
     promptfgcolor = property(_propgetpromptfgcolor, _propsetpromptfgcolor)
     promptbgcolor = property(_propgetpromptbgcolor, _propsetpromptbgcolor)
     promptcolors = property(_propgetpromptcolors, _propsetpromptcolors)
+    text = property(_propgettext, _propsettext)
+    buffer = property(_propgetbuffer, _propsetbuffer)
 
 
 
@@ -2089,6 +3840,17 @@ class PygcurseTextbox:
         self.shadowxoffset = 1
         self.shadowyoffset = 1
 
+        # (text, width, wrap, lines, offset of the last paragraph in text, index of its first line in lines) from the last time the text was wrapped. See _getwrappedlines().
+        self._wrapcache = None
+
+        # When scrollable is True, the textbox shows the text starting at the scroll position instead of at the beginning, and only the lines of text in view are wrapped. This is meant for displaying very large text. The scroll position is a line of the text (lines are separated by newlines) and how many of its wrapped rows are scrolled past.
+        self.scrollable = False
+        self._scrollline = 0
+        self._scrollrow = 0
+        self._lineoffsets = [0] # the offsets in self._indexedtext where each line starts, found as they are needed (see _getline())
+        self._indexedtext = ''
+        self._indexedto = 0 # how far into self._indexedtext has been searched for newlines
+
     def update(self, pygsurf=None):
         # NOTE - border of 'basic' uses +,-,| scheme. A single letter can be used to use that character for a border. None means no border. '' means an empty border (same as border of None and margin of 1)
         # NOTE - this function does not create scrollbars, any excess characters are just truncated.
@@ -2104,12 +3866,7 @@ class PygcurseTextbox:
         bgcolor = (self.bgcolor is None) and pygsurf.bgcolor or self.bgcolor
 
         # blank out space for box
-        for ix in range(x, x + width):
-            for iy in range(y, y + height):
-                pygsurf._screenfgcolor[ix][iy] = fgcolor
-                pygsurf._screenbgcolor[ix][iy] = bgcolor
-                pygsurf._screenchar[ix][iy] = ' '
-                pygsurf._screendirty[ix][iy] = True
+        pygsurf._cells.fill(x, y, width, height, ' ', getpygamecolor(fgcolor), getpygamecolor(bgcolor))
 
         # Recalculate dimensions, this time including if they are off the surface.
         x, y, width, height = pygsurf.getregion((self.x, self.y, self.width, self.height), False)
@@ -2120,53 +3877,53 @@ class PygcurseTextbox:
         if self.border in ('basic', 'rounded'):
             # corners
             if pygsurf.isonscreen(x, y):
-                pygsurf._screenchar[x][y] = (self.border == 'basic') and '+' or '/'
+                pygsurf._cells.setcell(x, y, (self.border == 'basic') and '+' or '/')
             if pygsurf.isonscreen(x + width - 1, y):
-                pygsurf._screenchar[x + width - 1][y] = (self.border == 'basic') and '+' or '\\'
+                pygsurf._cells.setcell(x + width - 1, y, (self.border == 'basic') and '+' or '\\')
             if pygsurf.isonscreen(x, y + height - 1):
-                pygsurf._screenchar[x][y + height - 1] = (self.border == 'basic') and '+' or '\\'
+                pygsurf._cells.setcell(x, y + height - 1, (self.border == 'basic') and '+' or '\\')
             if pygsurf.isonscreen(x + width - 1, y + height - 1):
-                pygsurf._screenchar[x + width - 1][y + height - 1] = (self.border == 'basic') and '+' or '/'
+                pygsurf._cells.setcell(x + width - 1, y + height - 1, (self.border == 'basic') and '+' or '/')
 
             # top/bottom side
             for ix in range(x + 1, x + width - 1):
                 if pygsurf.isonscreen(ix, y):
-                    pygsurf._screenchar[ix][y] = '-'
+                    pygsurf._cells.setcell(ix, y, '-')
                 if pygsurf.isonscreen(ix, y + height-1):
-                    pygsurf._screenchar[ix][y + height-1] = '-'
+                    pygsurf._cells.setcell(ix, y + height-1, '-')
 
             # left/right side
             for iy in range(y+1, y + height-1):
                 if pygsurf.isonscreen(x, iy):
-                    pygsurf._screenchar[x][iy] = '|'
+                    pygsurf._cells.setcell(x, iy, '|')
                 if pygsurf.isonscreen(x + width - 1, iy):
-                    pygsurf._screenchar[x + width - 1][iy] = '|'
+                    pygsurf._cells.setcell(x + width - 1, iy, '|')
         elif self.border is not None and len(self.border) == 1:
             # use a single character to draw the entire border
             # top/bottom side
             for ix in range(x, x + width):
                 if pygsurf.isonscreen(ix, y):
-                    pygsurf._screenchar[ix][y] = self.border
+                    pygsurf._cells.setcell(ix, y, self.border)
                 if pygsurf.isonscreen(ix, y + height-1):
-                    pygsurf._screenchar[ix][y + height-1] = self.border
+                    pygsurf._cells.setcell(ix, y + height-1, self.border)
 
             # left/right side
             for iy in range(y+1, y + height-1):
                 if pygsurf.isonscreen(x, iy):
-                    pygsurf._screenchar[x][iy] = border
+                    pygsurf._cells.setcell(x, iy, self.border)
                 if pygsurf.isonscreen(x + width - 1, iy):
-                    pygsurf._screenchar[x + width - 1][iy] = border
+                    pygsurf._cells.setcell(x + width - 1, iy, self.border)
 
         # draw caption:
         if self.caption:
             for i in range(len(self.caption)):
                 if i + 2 > self.width - 2 or not pygsurf.isonscreen(x + i + 2, y):
                     continue
-                pygsurf._screenchar[x + i + 2][y] = self.caption[i]
+                pygsurf._cells.setcell(x + i + 2, y, self.caption[i])
 
         # draw the textbox shadow
         if self.shadow is not None:
-            pygsurf.addshadow(x=x, y=y, width=width, height=height, amount=self.shadowamount, direction=self.shadow, xoffset=self.shadowxoffset, yoffset=self.shadowyoffset)
+            pygsurf.addshadow(amount=self.shadowamount, region=(x, y, width, height), direction=self.shadow, xoffset=self.shadowxoffset, yoffset=self.shadowyoffset)
 
 
         if self.text == '':
@@ -2199,13 +3956,25 @@ class PygcurseTextbox:
         for line in text:
             if y + iy >= pygsurf._height:
                 break
-            for ix in range(truncateLeftChars, min(len(line), maxDisplayedLength)):
-                pygsurf._screenchar[x + ix][y + iy] = line[ix]
+            line = line[truncateLeftChars:maxDisplayedLength]
+            if line:
+                pygsurf._cells.settext(x + truncateLeftChars, y + iy, line)
             iy += 1
 
 
     def getdisplayedtext(self):
-    # returns the text that can be displayed given the box's current width, height, border, and margins
+    # returns the text that can be displayed given the box's current width, height, border, and margins (and the scroll position, if the textbox is scrollable)
+        width, height = self._getinnersize()
+        if width < 1 or height < 1:
+            return '' # no room for text
+
+        if self.scrollable:
+            return self._getvisiblelines(width, height)
+        return self._getwrappedlines(width)[:height]
+
+
+    def _getinnersize(self):
+        """Returns the (width, height) of the area inside the border and margins where the text is displayed."""
         margintop = self.margintop
         marginbottom = self.marginbottom
         marginright = self.marginright
@@ -2220,19 +3989,184 @@ class PygcurseTextbox:
         elif self.caption:
             margintop += 1
 
-        width = self.width - marginleft - marginright
-        height = self.height - margintop - marginbottom
+        return self.width - marginleft - marginright, self.height - margintop - marginbottom
 
-        if width < 1 or height < 1:
-            return '' # no room for text
 
+    def _wrapparagraph(self, paragraph, width):
+        """Returns a list of the rows that a single line of text (without newlines) is word wrapped (or just split, if self.wrap is False) into. An empty line is one empty row."""
         # handle word wrapping
         if self.wrap:
-            text = textwrap.wrap(self.text, width=width)
-        else:
-            text = spitintogroupsof(width, self.text) # TODO - slight bug where if a line ends with \n, it could show an additional character. (this is the behavior of textwrap.wrap())
+            return textwrap.wrap(paragraph, width=width) or ['']
+        return spitintogroupsof(width, paragraph) or ['']
 
-        return text[:height]
+
+    def _getwrappedlines(self, width):
+        """
+        Returns a list of all the lines of self.text, word wrapped (or just split, if self.wrap is False) to width characters. Each line of self.text is a paragraph that is wrapped separately.
+
+        The lines are cached, so calling this again for the same text, width, and wrap mode costs nothing. If text was only appended to self.text since then, just the last paragraph (and any new ones after it) are wrapped again. This way, a textbox that grows a line at a time doesn't rewrap all of the text before it on every update.
+        """
+        text = self.text
+        lines = []
+        start = 0 # the offset in text of the first paragraph that needs to be wrapped
+        if self._wrapcache is not None and self._wrapcache[1:3] == (width, self.wrap):
+            cachedtext, cachedwidth, cachedwrap, cachedlines, tailoffset, tailindex = self._wrapcache
+            if text is cachedtext or text == cachedtext:
+                return cachedlines
+            if text.startswith(cachedtext):
+                lines = cachedlines
+                del lines[tailindex:] # the last paragraph may have been appended to, so it has to be wrapped again
+                start = tailoffset
+
+        for paragraph in text[start:].split('\n'):
+            tailindex = len(lines)
+            lines.extend(self._wrapparagraph(paragraph, width))
+
+        self._wrapcache = (text, width, self.wrap, lines, text.rfind('\n') + 1, tailindex)
+        return lines
+
+
+    def _checklineindex(self):
+        """Makes sure the line offset index is for the current self.text. If text was only appended to it, the index so far is still good and is kept."""
+        text = self.text
+        if text is self._indexedtext:
+            return
+        if not text.startswith(self._indexedtext):
+            self._lineoffsets = [0]
+            self._indexedto = 0
+        self._indexedtext = text
+
+
+    def _indexlines(self, line=None, offset=None):
+        """Searches self.text for newlines (adding to the line offset index) until the index has the given line number, or reaches past the given text offset, or the end of the text is reached."""
+        self._checklineindex()
+        text = self._indexedtext
+        offsets = self._lineoffsets
+        while (line is None or len(offsets) <= line) and (offset is None or offsets[-1] <= offset) and self._indexedto < len(text):
+            newline = text.find('\n', self._indexedto)
+            if newline == -1:
+                self._indexedto = len(text)
+            else:
+                offsets.append(newline + 1)
+                self._indexedto = newline + 1
+
+
+    def _getline(self, line):
+        """Returns the given line of self.text (without the newline), or None if the text doesn't have that many lines."""
+        self._indexlines(line=line + 1)
+        offsets = self._lineoffsets
+        if line >= len(offsets) or line < 0:
+            return None
+        if line + 1 < len(offsets):
+            return self._indexedtext[offsets[line]:offsets[line + 1] - 1]
+        return self._indexedtext[offsets[line]:] # this is the last line
+
+
+    def _getvisiblelines(self, width, height):
+        """Returns the (at most height) wrapped rows of a scrollable textbox, starting at the scroll position. Only the lines of text in view are wrapped."""
+        rows = []
+        line = self._scrollline
+        skip = self._scrollrow
+        while len(rows) < height:
+            paragraph = self._getline(line)
+            if paragraph is None:
+                break
+            rows.extend(self._wrapparagraph(paragraph, width)[skip:])
+            skip = 0
+            line += 1
+        return rows[:height]
+
+
+    def scrollup(self, rows=1):
+        """Scrolls a scrollable textbox up by the given number of displayed (that is, wrapped) rows, stopping at the beginning of the text."""
+        width = self._getinnersize()[0]
+        if width < 1:
+            return
+        line = self._scrollline
+        row = self._scrollrow
+        while rows > 0:
+            if row >= rows:
+                row -= rows
+                break
+            rows -= row
+            if line == 0:
+                row = 0
+                break
+            line -= 1
+            row = len(self._wrapparagraph(self._getline(line), width)) # the position just past the end of the previous line
+        self._scrollline = line
+        self._scrollrow = row
+
+
+    def scrolldown(self, rows=1):
+        """Scrolls a scrollable textbox down by the given number of displayed (that is, wrapped) rows, stopping when the end of the text is at the bottom of the textbox."""
+        width = self._getinnersize()[0]
+        if width < 1:
+            return
+        line = self._scrollline
+        row = self._scrollrow
+        while rows > 0:
+            paragraph = self._getline(line)
+            if paragraph is None:
+                break
+            numrows = len(self._wrapparagraph(paragraph, width))
+            if row + rows < numrows:
+                row += rows
+                break
+            rows -= numrows - row
+            line += 1
+            row = 0
+        self._scrollline = line
+        self._scrollrow = row
+        self._clampscroll()
+
+
+    def scrolltoline(self, line):
+        """Scrolls a scrollable textbox so that the given line of text (counting from 0, with lines separated by newlines) is at the top. Once the line offset index reaches that line, this takes constant time."""
+        self._indexlines(line=line + 1)
+        self._scrollline = max(0, min(line, len(self._lineoffsets) - 1))
+        self._scrollrow = 0
+        self._clampscroll()
+
+
+    def scrolltopercent(self, percent):
+        """Scrolls a scrollable textbox so that the line of text at the given percent (0 to 100) of the way through the text is at the top. The line is found with a binary search of the line offset index."""
+        self._checklineindex()
+        offset = int(len(self._indexedtext) * getwithinrange(percent, 0, 100) / 100.0)
+        self._indexlines(offset=offset)
+        self._scrollline = bisect.bisect_right(self._lineoffsets, offset) - 1
+        self._scrollrow = 0
+        self._clampscroll()
+
+
+    def _clampscroll(self):
+        """If the scroll position is so far down that the textbox isn't full, scroll it back up so that the end of the text is at the bottom of the textbox (or the scroll position is at the beginning of the text)."""
+        width, height = self._getinnersize()
+        if width < 1 or height < 1:
+            return
+        self._indexlines(line=self._scrollline + 1)
+        if self._scrollline >= len(self._lineoffsets):
+            # scrolled past the end of the text (or the text has fewer lines than it used to), so start from just past the last row
+            self._scrollline = len(self._lineoffsets) - 1
+            self._scrollrow = len(self._wrapparagraph(self._getline(self._scrollline), width))
+        shown = len(self._getvisiblelines(width, height))
+        if shown < height:
+            self.scrollup(height - shown)
+
+
+    def _getdrawstate(self):
+        """Returns a tuple of everything that affects how this textbox is drawn. PygcurseWidgetManager objects compare it to the tuple from when the textbox was last drawn to tell if it needs to be redrawn."""
+        return (self.text, self.x, self.y, self.width, self.height, _colorkey(self.fgcolor), _colorkey(self.bgcolor), self.wrap, self.border, self.caption,
+                self.margintop, self.marginbottom, self.marginleft, self.marginright, self.shadow, self.shadowamount, self.shadowxoffset, self.shadowyoffset,
+                self.scrollable, self._scrollline, self._scrollrow)
+
+
+    def _getfootprint(self):
+        """Returns a pygame.Rect of the cells that update() changes: the textbox's region and its shadow (if it has one)."""
+        footprint = pygame.Rect(self.x, self.y, self.width, self.height)
+        if self.shadow is not None:
+            footprint.union_ip(footprint.move(self.shadowxoffset, self.shadowyoffset))
+        return footprint
 
 
     def erase(self):
@@ -2326,6 +4260,17 @@ class PygcurseTextbox:
         newheight = int(value[1])
         if newwidth != self.width or newheight != self.height:
             self.resize(newwidth, newheight)
+    def _propgetscrollline(self):
+        return self._scrollline
+    def _propsetscrollline(self, value):
+        self.scrolltoline(int(value))
+    def _propgetscrollpercent(self):
+        self._indexlines(line=self._scrollline)
+        if self._scrollline >= len(self._lineoffsets) or not self._indexedtext:
+            return 0.0
+        return 100.0 * self._lineoffsets[self._scrollline] / len(self._indexedtext)
+    def _propsetscrollpercent(self, value):
+        self.scrolltopercent(value)
     def _propgetpixelwidth(self):
         return self.width * self._cellwidth
     def _propsetpixelwidth(self, value):
@@ -2367,6 +4312,122 @@ class PygcurseTextbox:
     pixelheight = property(_propgetsize, _propsetsize)
     pixelsize   = property(_propgetsize, _propsetsize)
     size        = property(_propgetsize, _propsetsize)
+    scrollline  = property(_propgetscrollline, _propsetscrollline)
+    scrollpercent = property(_propgetscrollpercent, _propsetscrollpercent)
+
+
+class PygcurseWidgetManager(object):
+    """
+    Keeps track of the PygcurseTextbox objects drawn on a PygcurseSurface, and redraws only the ones that changed. Add textboxes with add() and call update() instead of calling each textbox's update() every frame. A textbox is redrawn when anything about how it looks (its text, region, colors, border, shadow, and so on) has changed since the last time it was drawn.
+
+    The cells underneath the textboxes are remembered when a textbox first covers them, so moving, resizing, or removing a textbox restores only the cells it uncovers. Textboxes are drawn in the order they were added (so later ones are on top), and any textbox overlapping an area that is redrawn is redrawn too. Don't draw to the cells under the textboxes while the manager is in use, since that is overwritten when those cells are uncovered.
+    """
+    def __init__(self, pygsurf):
+        self.pygsurf = pygsurf
+        self.widgets = [] # the textboxes, from the bottom one to the top one
+        self._drawn = {} # maps each drawn textbox to a (draw state, footprint) tuple from when it was last drawn
+        self._background = None # a cell grid the size of the surface, holding the cells underneath the textboxes
+        self._covered = set() # the (x, y) cells under the footprint of at least one drawn textbox. Only these cells in self._background are used.
+
+
+    def add(self, widget):
+        """Adds a textbox on top of the other ones. It is drawn by the next update()."""
+        if widget not in self.widgets:
+            self.widgets.append(widget)
+
+
+    def remove(self, widget):
+        """Removes a textbox. The next update() restores the cells it covered."""
+        if widget in self.widgets:
+            self.widgets.remove(widget)
+
+
+    def redrawall(self):
+        """Makes the next update() redraw every textbox, even if they haven't changed."""
+        self._drawn = dict([(widget, (None, footprint)) for widget, (state, footprint) in self._drawn.items()])
+
+
+    def update(self):
+        """Redraws the textboxes that changed since the last update() (and the ones they overlap), after restoring the cells that changed textboxes have uncovered."""
+        pygsurf = self.pygsurf
+        cells = pygsurf._cells
+        if self._background is None:
+            self._background = cells.resized(pygsurf._width, pygsurf._height, pygsurf._fgcolor, pygsurf._bgcolor, 0, 0, 0)
+        elif (self._background.width, self._background.height) != (pygsurf._width, pygsurf._height):
+            # the surface was resized
+            self._background = self._background.resized(pygsurf._width, pygsurf._height, pygsurf._fgcolor, pygsurf._bgcolor, 0, 0, 0)
+            self._covered = set([(x, y) for x, y in self._covered if x < pygsurf._width and y < pygsurf._height])
+
+        # find the textboxes that changed, along with the areas that they cover now and covered when they were last drawn.
+        surfacerect = pygame.Rect(0, 0, pygsurf._width, pygsurf._height)
+        states = {}
+        footprints = {}
+        redraw = set()
+        dirtyrects = []
+        moved = False # True if any footprint changed, which means self._covered has to be updated
+        for widget in self.widgets:
+            states[widget] = widget._getdrawstate()
+            footprints[widget] = widget._getfootprint().clip(surfacerect)
+            drawn = self._drawn.get(widget)
+            if drawn is None or drawn[0] != states[widget]:
+                redraw.add(widget)
+                dirtyrects.append(footprints[widget])
+                if drawn is not None and drawn[1] != footprints[widget]:
+                    dirtyrects.append(drawn[1])
+                    moved = True
+                moved = moved or drawn is None
+        for widget in list(self._drawn):
+            if widget not in states:
+                dirtyrects.append(self._drawn.pop(widget)[1]) # this textbox was removed
+                moved = True
+        if not dirtyrects:
+            return # nothing changed
+
+        # Textboxes overlapping the areas being redrawn have to be redrawn as well. (Their footprints are restored first, so that their shadows aren't darkened twice.)
+        growing = True
+        while growing:
+            growing = False
+            for widget in self.widgets:
+                if widget not in redraw and footprints[widget].collidelist(dirtyrects) != -1:
+                    redraw.add(widget)
+                    dirtyrects.append(footprints[widget])
+                    growing = True
+
+        with pygsurf.batch():
+            # remember the cells that are about to be covered for the first time, then restore every covered cell in the dirty areas.
+            covered = self._covered
+            for widget in redraw:
+                self._copyspans(self._background, cells, footprints[widget], False)
+            for rect in dirtyrects:
+                self._copyspans(cells, self._background, rect, True)
+
+            for widget in self.widgets:
+                if widget in redraw:
+                    widget.update(pygsurf)
+                    self._drawn[widget] = (states[widget], footprints[widget])
+
+        if moved:
+            # cells no longer under any textbox were restored above, and their old contents don't need to be remembered anymore.
+            covered.clear()
+            for footprint in footprints.values():
+                covered.update([(x, y) for y in range(footprint.top, footprint.bottom) for x in range(footprint.left, footprint.right)])
+
+
+    def _copyspans(self, dstgrid, srcgrid, rect, covered):
+        """Copies the cells in rect that are in self._covered (if covered is True) or aren't (if covered is False) from srcgrid to dstgrid, one horizontal span at a time. When covered is False, the copied cells are added to self._covered."""
+        for y in range(rect.top, rect.bottom):
+            x = rect.left
+            while x < rect.right:
+                if ((x, y) in self._covered) != covered:
+                    x += 1
+                    continue
+                spanx = x
+                while x < rect.right and ((x, y) in self._covered) == covered:
+                    x += 1
+                dstgrid.copyfrom(srcgrid, spanx, y, spanx, y, x - spanx, 1, copyerased=True)
+                if not covered:
+                    self._covered.update([(ix, y) for ix in range(spanx, x)])
+
 
 _shiftchars = {',':';', '.':':', '@':'/', '?':'(', '!':')', "'":'&'}
 
@@ -2389,6 +4450,83 @@ def interpretkeyevent(keyEvent):
     return None # None means that there is no printable character corresponding to this keyEvent
 
 
+# _CLAMPTABLE[value + 255] is value kept within 0 to 255, for any value from -255 to 510 (a color channel plus a tint).
+_CLAMPTABLE = tuple([0] * 255 + list(range(256)) + [255] * 255)
+_tintcache = {} # maps (color tuple, rdelta, gdelta, bdelta) to the tinted pygame.Color object
+
+def _gettintedcolor(color, rdelta, gdelta, bdelta):
+    # Returns a pygame.Color of color with the tint applied. The results are memoized, since the same few colors and tints (such as a shadow's) get resolved over and over.
+    key = (tuple(color), rdelta, gdelta, bdelta)
+    tintedcolor = _tintcache.get(key)
+    if tintedcolor is None:
+        if len(_tintcache) >= TINTCACHESIZE:
+            _tintcache.clear()
+        tintedcolor = pygame.Color(_CLAMPTABLE[color[0] + rdelta + 255], _CLAMPTABLE[color[1] + gdelta + 255], _CLAMPTABLE[color[2] + bdelta + 255], color[3])
+        _tintcache[key] = tintedcolor
+    return tintedcolor
+
+
+_runscache = {} # used by _runlengthencode() so that rows with the same colors share one tuple of runs
+
+def _runlengthencode(values):
+    # Returns a tuple of (count, value) pairs for the runs of equal values in the values list.
+    runs = []
+    for value in values:
+        if runs and runs[-1][1] == value:
+            runs[-1][0] += 1
+        else:
+            runs.append([1, value])
+    return _internruns(runs)
+
+
+def _internruns(runs):
+    # Returns runs (a list of [count, value] lists) as a tuple of tuples, using the same tuple object for equal runs.
+    runs = tuple([tuple(run) for run in runs])
+    if len(_runscache) >= RUNSCACHESIZE:
+        _runscache.clear()
+    return _runscache.setdefault(runs, runs)
+
+
+def _runlengthdecode(runs, width, pad):
+    # Returns a list of width values from the (count, value) pairs in runs, truncated or padded with pad.
+    values = []
+    for count, value in runs:
+        values.extend([value] * count)
+    return values[:width] + [pad] * (width - len(values))
+
+
+def _encoderow(chars, fgcolors, bgcolors, tints):
+    # Encodes a row of cells for the scrollback as a (text, fgruns, bgruns, tintruns) tuple, which takes far less memory than a row of cells. In text, erased cells (None) are stored as '\0'. The colors are packed 0xRRGGBBAA integers and the tints are (r, g, b) tuples, both run-length encoded since rows are mostly one or two colors.
+    text = ''.join([(char is None) and '\0' or char for char in chars])
+    return text, _runlengthencode(fgcolors), _runlengthencode(bgcolors), _runlengthencode(tints)
+
+
+def _decoderow(row, width):
+    # Returns (chars, fgcolors, bgcolors, tints) lists of width cells from a row made by _encoderow().
+    text, fgruns, bgruns, tintruns = row
+    chars = [(char != '\0') and char or None for char in text[:width]] + [None] * (width - len(text))
+    fgcolors = _runlengthdecode(fgruns, width, fgruns and fgruns[-1][1] or int(DEFAULTFGCOLOR))
+    bgcolors = _runlengthdecode(bgruns, width, bgruns and bgruns[-1][1] or int(DEFAULTBGCOLOR))
+    return chars, fgcolors, bgcolors, _runlengthdecode(tintruns, width, (0, 0, 0))
+
+
+def _colorkey(color):
+    """Returns a value that compares equal for equal colors, even for pygame.Color objects (which are mutable, so the same object might be a different color later.)"""
+    if isinstance(color, pygame.Color):
+        return tuple(color)
+    return color
+
+
+def _zorderkey(layer):
+    # sort key that orders PygcurseLayer objects from the bottom one to the top one.
+    return layer._z
+
+
+def _rowmajorkey(cell):
+    # sort key that orders (x, y) cell coordinates row by row, left to right.
+    return cell[1], cell[0]
+
+
 def spitintogroupsof(groupSize, theList):
     # splits a sequence into a list of sequences, where the inner lists have at
     # most groupSize number of items.
@@ -2425,21 +4563,11 @@ def calcfontsize(font):
 
 
 def _ismonofont(font):
-    """Returns True if all the characters in the font are of the same width, indicating that this is a monospace font.
-
-    TODO - Not sure what I was planning to use this function for. I'll leave it in here for now.
-    """
-    minwidth = 0
-    minheight = 0
+    """Returns True if all the printable ASCII characters in the font have the same advance width, indicating that this is a monospace font. Runs of text in a monospace font can be rendered as a single string and still line up with the cells."""
+    widths = set()
     for i in range(32, 127):
-        surf = font.render(chr(i), True, (0,0,0))
-        if surf.get_width() < minwidth:
-            minwidth = surf.get_width()
-        if surf.get_height() < minheight:
-            minheight = surf.get_height()
-
-    maxwidth, maxheight = calcfontsize(font)
-    return maxwidth - minwidth <= 3 and maxheight - minheight <= 3
+        widths.add(font.size(chr(i))[0])
+    return len(widths) == 1
 
 
 def getpygamecolor(value):
@@ -2447,7 +4575,7 @@ def getpygamecolor(value):
     if type(value) in (tuple, list):
         alpha = len(value) > 3 and value[3] or 255
         return pygame.Color(value[0], value[1], value[2], alpha)
-    elif str(type(value)) in ("<class 'pygame.Color'>", "<type 'pygame.Color'>"):
+    elif isinstance(value, pygame.Color):
         return value
     elif value in colornames:
         return colornames[value]
@@ -2459,13 +4587,13 @@ def getpygamecolor(value):
     return color
 
 def waitforkeypress(fps=None):
-    # Go through event queue looking for a KEYUP event.
+    # Sleep until there is a KEYUP event in the event queue.
     # Grab KEYDOWN events to remove them from the event queue.
-    if fps is not None:
-        clock = pygame.time.Clock()
+    # (fps is no longer used since nothing is drawn while waiting, but it is kept for backwards compatibility.)
+    pygame.display.update()
 
     while True:
-        for event in pygame.event.get([KEYDOWN, KEYUP, QUIT]):
+        for event in _waitforevents((KEYDOWN, KEYUP, QUIT)):
             if event.type == KEYDOWN:
                 continue
             elif event.type == QUIT:
@@ -2473,9 +4601,60 @@ def waitforkeypress(fps=None):
                 sys.exit()
             elif event.type == KEYUP:
                 return interpretkeyevent(event)
-        pygame.display.update()
-        if fps is not None:
-            clock.tick(fps)
+
+def _cursorblinkphase():
+    """Returns a tuple of a bool (True if a blinking input cursor should currently be shown) and the number of milliseconds until that changes."""
+    now = int(time.time() * 1000)
+    return (now // CURSORBLINKINTERVAL) % 2 == 0, CURSORBLINKINTERVAL - now % CURSORBLINKINTERVAL
+
+def _waitforevent(timeout):
+    """Blocks until there is an event in the event queue and returns it, or returns an event of type NOEVENT once timeout milliseconds have passed."""
+    try:
+        return pygame.event.wait(max(1, timeout)) # (a timeout of 0 would mean "wait forever")
+    except TypeError:
+        # Pygame versions before 2.0 can't pass a timeout to pygame.event.wait(), so poll the event queue and sleep in between instead.
+        wakeat = pygame.time.get_ticks() + timeout
+        while True:
+            event = pygame.event.poll()
+            if event.type != NOEVENT or pygame.time.get_ticks() >= wakeat:
+                return event
+            pygame.time.wait(min(10, max(1, wakeat - pygame.time.get_ticks())))
+
+def _waitforevents(eventtypes, wakeat=None):
+    """
+    Sleeps until there are events of the given types in the event queue, or until pygame.time.get_ticks() reaches wakeat (if it isn't None). Returns a list of those events (taken off the event queue), which is empty if the wait timed out. Events of other types are left in the event queue, in the order they arrived, just as pygame.event.get(eventtypes) would have left them.
+
+    While the event queue is empty, this sleeps in pygame.event.wait(). But pygame can't wait for only some types of events, so while other events are in the queue, it checks the queue every few milliseconds instead.
+    """
+    while True:
+        events = pygame.event.get(eventtypes)
+        if events:
+            return events
+
+        timeout = None
+        if wakeat is not None:
+            timeout = wakeat - pygame.time.get_ticks()
+            if timeout <= 0:
+                return []
+        if pygame.event.peek():
+            # pygame.event.wait() would take one of the waiting events off of the queue
+            pygame.time.wait((timeout is None) and 10 or min(10, timeout))
+            continue
+
+        if timeout is None:
+            event = pygame.event.wait()
+        else:
+            event = _waitforevent(timeout)
+        if event.type == NOEVENT:
+            continue # timed out (which the next pass finds out)
+        if event.type in eventtypes:
+            return [event] + pygame.event.get(eventtypes)
+
+        # put the event back at the front of the queue, ahead of any events that arrived after it
+        laterevents = pygame.event.get()
+        pygame.event.post(event)
+        for laterevent in laterevents:
+            pygame.event.post(laterevent)
 
 def regionsoverlap(region1, region2):
     return withinregion(region1[0], region1[1], region2) or \
@@ -0,0 +1,936 @@
+import os
+import random
+import textwrap
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+import pygcurse
+
+
+def setUpModule():
+    pygame.init()
+    pygame.display.set_mode((10, 10)) # PygcurseSurface calls convert_alpha(), which needs a display mode
+
+
+class ConstructionTest(unittest.TestCase):
+    def test_default_colors(self):
+        surf = pygcurse.PygcurseSurface(10, 5)
+        self.assertEqual(surf.fgcolor, pygcurse.DEFAULTFGCOLOR)
+        self.assertEqual(surf.bgcolor, pygcurse.DEFAULTBGCOLOR)
+        surf.write('hello')
+        self.assertEqual(surf.getchar(0, 0), 'h')
+
+    def test_numpy_storage(self):
+        if pygcurse.numpy is None:
+            self.skipTest('numpy is not installed')
+        for fgcolor, bgcolor in ((pygcurse.DEFAULTFGCOLOR, pygcurse.DEFAULTBGCOLOR), ((255, 0, 0), (0, 0, 128, 255)), ('red', 'navy')):
+            surf = pygcurse.PygcurseSurface(10, 3, fgcolor=fgcolor, bgcolor=bgcolor, usenumpy=True)
+            surf.write('hello\n' * 4) # scrolls, which fills the new row with the default colors
+            surf.fill('#', region=(0, 0, 2, 1))
+            self.assertEqual(surf.getchars((0, 0, 5, 3)), ['##llo', 'hello', '     '])
+            self.assertEqual(surf.getdisplayedcolors(3, 1), (pygcurse.getpygamecolor(fgcolor), pygcurse.getpygamecolor(bgcolor)))
+
+    def test_color_setters(self):
+        surf = pygcurse.PygcurseSurface(10, 5)
+        surf.fgcolor = pygcurse.DEFAULTBGCOLOR
+        surf.bgcolor = 'red'
+        surf.colors = (pygame.Color(1, 2, 3), (4, 5, 6))
+        self.assertEqual(surf.colors, (pygame.Color(1, 2, 3), pygame.Color(4, 5, 6)))
+
+    def test_getpygamecolor(self):
+        color = pygame.Color(1, 2, 3)
+        self.assertTrue(pygcurse.getpygamecolor(color) is color)
+        self.assertEqual(pygcurse.getpygamecolor((1, 2, 3)), color)
+        self.assertEqual(pygcurse.getpygamecolor('red'), pygcurse.colornames['red'])
+        self.assertRaises(Exception, pygcurse.getpygamecolor, 'not a color')
+
+
+def _storagekwargs():
+    # The usenumpy keyword arguments of each cell storage that can be tested here.
+    if pygcurse.numpy is None:
+        return [{'usenumpy': False}]
+    return [{'usenumpy': False}, {'usenumpy': True}]
+
+
+class ScrollbackTest(unittest.TestCase):
+    def _viewedrows(self, surf):
+        grid = (surf._viewcells is not None) and surf._viewcells or surf._cells
+        return [grid.getrowtext(0, y, surf.width) for y in range(surf.height)]
+
+    def test_paging_with_colors(self):
+        red, navy, green = pygame.Color(255, 0, 0), pygcurse.colornames['navy'], pygcurse.colornames['green']
+        for kwargs in _storagekwargs():
+            surf = pygcurse.PygcurseSurface(10, 3, fgcolor=(255, 0, 0), bgcolor='navy', **kwargs)
+            surf.scrollbacksize = 5
+            surf.write('line 0\nline 1\n')
+            surf.write('line 2', fgcolor='green')
+            surf.write('\nline 3\nline 4\nline 5\n') # scrolls line 2 and line 3 off in one write
+            self.assertEqual(surf.scrollbacklength, 4)
+            surf.scrollbackup(2)
+            self.assertEqual(self._viewedrows(surf), ['line 2    ', 'line 3    ', 'line 4    '])
+            self.assertEqual(surf._viewcells.getcell(0, 0)[1:3], (green, navy))
+            self.assertEqual(surf._viewcells.getcell(9, 0)[1:3], (red, navy)) # blanked by the scroll
+            self.assertEqual(surf._viewcells.getcell(0, 1)[1:3], (red, navy))
+            surf.scrollbackup() # stops at the oldest row
+            self.assertEqual(surf.scrollbackoffset, 4)
+            self.assertEqual(self._viewedrows(surf)[0], 'line 0    ')
+            surf.write('line 6') # drawing changes the current cells, not the view
+            self.assertEqual(self._viewedrows(surf)[0], 'line 0    ')
+            surf.scrollbackdown() # moves forward by the height of the surface
+            self.assertEqual(surf.scrollbackoffset, 1)
+            surf.scrollbackdown()
+            self.assertEqual(surf.scrollbackoffset, 0)
+            self.assertEqual(self._viewedrows(surf), ['line 4    ', 'line 5    ', 'line 6    '])
+
+    def test_one_write_matches_many(self):
+        text = 'ab\tc\n' * 3 + 'x' * 25 + '\n\nlast'
+        for kwargs in _storagekwargs():
+            surfs = [pygcurse.PygcurseSurface(10, 3, fgcolor=(255, 0, 0), bgcolor='navy', **kwargs) for i in range(2)]
+            for surf in surfs:
+                surf.scrollbacksize = 20
+            surfs[0].write(text)
+            for char in text:
+                surfs[1].write(char)
+            self.assertEqual(list(surfs[0]._scrollback), list(surfs[1]._scrollback))
+            self.assertEqual(surfs[0].getchars(), surfs[1].getchars())
+            self.assertEqual(surfs[0].cursor, surfs[1].cursor)
+
+    def test_clearscrollback(self):
+        surf = pygcurse.PygcurseSurface(10, 3)
+        surf.scrollbacksize = 5
+        surf.write('a\nb\nc\nd\n')
+        surf.scrollbackup()
+        surf.clearscrollback()
+        self.assertEqual((surf.scrollbacklength, surf.scrollbackoffset), (0, 0))
+        self.assertEqual(self._viewedrows(surf)[0], 'c         ')
+
+
+class _WriteModel(object):
+    # A simple model of write() that handles one character at a time, the way a terminal does. Cells are (char, fgcolor, bgcolor) tuples with the colors as integers.
+    def __init__(self, width, height, tabsize, scrollbacksize, fgcolor, bgcolor):
+        self.width, self.height, self.tabsize, self.scrollbacksize = width, height, tabsize, scrollbacksize
+        self.blank = (' ', int(fgcolor), int(bgcolor))
+        self.rows = [[(None, int(fgcolor), int(bgcolor))] * width for y in range(height)]
+        self.scrollback = []
+        self.x = self.y = 0
+
+    def newline(self):
+        self.x = 0
+        self.y += 1
+        if self.y == self.height:
+            self.scrollback = (self.scrollback + [self.rows.pop(0)])[-self.scrollbacksize:]
+            self.rows.append([self.blank] * self.width)
+            self.y -= 1
+
+    def put(self, char, fgcolor, bgcolor):
+        self.rows[self.y][self.x] = (char, int(fgcolor), int(bgcolor))
+        self.x += 1
+        if self.x == self.width:
+            self.newline()
+
+    def write(self, text, fgcolor, bgcolor):
+        for char in text:
+            if char in '\r\n':
+                self.newline()
+            elif char == '\t':
+                for i in range(min(self.tabsize - self.x % self.tabsize, self.width - self.x)):
+                    self.put(' ', fgcolor, bgcolor)
+            else:
+                self.put(char, fgcolor, bgcolor)
+
+
+class WriteTest(unittest.TestCase):
+    def _surfacerows(self, surf):
+        return [[(cell[0], int(cell[1]), int(cell[2])) for cell in [surf._cells.getcell(x, y) for x in range(surf.width)]] for y in range(surf.height)]
+
+    def _scrollbackrows(self, surf):
+        rows = []
+        for row in surf._scrollback:
+            chars, fgcolors, bgcolors, tints = pygcurse._decoderow(row, surf.width)
+            rows.append(list(zip(chars, fgcolors, bgcolors)))
+        return rows
+
+    def test_matches_model(self):
+        rng = random.Random(14)
+        colors = [pygame.Color(255, 0, 0), pygame.Color(0, 255, 0), pygcurse.colornames['navy']]
+        for kwargs in _storagekwargs():
+            for trial in range(30):
+                surf = pygcurse.PygcurseSurface(7, 4, fgcolor=(255, 255, 0), bgcolor='black', **kwargs)
+                surf.autoupdate = False
+                surf.tabsize = 3
+                surf.scrollbacksize = 6
+                model = _WriteModel(7, 4, 3, 6, surf.fgcolor, surf.bgcolor)
+                for i in range(8):
+                    text = ''.join([rng.choice('ab \t\n\r') for j in range(rng.randint(0, 40))])
+                    fgcolor, bgcolor = rng.choice(colors), rng.choice(colors)
+                    surf.write(text, fgcolor=fgcolor, bgcolor=bgcolor)
+                    model.write(text, fgcolor, bgcolor)
+                    self.assertEqual(surf.cursor, (model.x, model.y), repr(text))
+                    self.assertEqual(self._surfacerows(surf), model.rows, repr(text))
+                    self.assertEqual(self._scrollbackrows(surf), model.scrollback, repr(text))
+
+
+class GlyphCacheTest(unittest.TestCase):
+    def test_text_runs_do_not_evict_glyphs(self):
+        surf = pygcurse.PygcurseSurface(10, 5)
+        surf.glyphcachesize = 4
+        fgcolor, bgcolor = pygame.Color(255, 255, 255), pygame.Color(0, 0, 0)
+        glyph = surf._getglyph('a', fgcolor, bgcolor)
+        for i in range(pygcurse.TEXTRUNCACHESIZE * 2):
+            surf._gettextrun('line %d' % i, fgcolor, bgcolor)
+        self.assertEqual(len(surf._textruncache), pygcurse.TEXTRUNCACHESIZE)
+        self.assertTrue(surf._getglyph('a', fgcolor, bgcolor) is glyph)
+        self.assertEqual(surf.glyphcachehits, 1)
+
+    def test_clearglyphcache(self):
+        surf = pygcurse.PygcurseSurface(10, 5)
+        surf._gettextrun('abc', pygame.Color(255, 255, 255), pygame.Color(0, 0, 0))
+        surf.clearglyphcache()
+        self.assertEqual(len(surf._textruncache), 0)
+
+
+class TextStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.surf = pygcurse.PygcurseSurface(20, 5)
+        self.updates = []
+        update = self.surf.update
+        def countingupdate():
+            self.updates.append(1)
+            update()
+        self.surf.update = countingupdate
+
+    def test_throttled_redraw_is_delivered_by_next_write(self):
+        stream = pygcurse.PygcurseTextStream(self.surf, buffering='line', maxfps=2)
+        stream.write('a\n')
+        stream.write('b\n')
+        self.assertEqual(len(self.updates), 1)
+        self.assertEqual(self.surf.getchar(0, 1), 'b') # in the cells, but not drawn yet
+        stream._lastredraw -= 1 # as if half a second had passed
+        stream.write('c') # no newline, but the put-off redraw is due
+        self.assertEqual(len(self.updates), 2)
+        self.assertFalse(stream._redrawpending)
+        self.assertEqual(self.surf.getchar(0, 2), 'c')
+
+    def test_flush_redraws(self):
+        stream = pygcurse.PygcurseTextStream(self.surf, buffering='line', maxfps=2)
+        stream.write('a\n')
+        stream.write('b\n')
+        stream.flush()
+        self.assertEqual(len(self.updates), 2)
+        self.assertFalse(stream._redrawpending)
+
+
+def _postkeys(text):
+    for char in text:
+        key = (char == '\r') and pygame.K_RETURN or ord(char)
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, unicode=char, mod=0))
+        pygame.event.post(pygame.event.Event(pygame.KEYUP, key=key, unicode=char, mod=0))
+
+
+class EventWaitTest(unittest.TestCase):
+    def setUp(self):
+        pygame.event.clear()
+
+    def test_other_events_keep_their_order(self):
+        for i in range(3):
+            pygame.event.post(pygame.event.Event(pygame.USEREVENT, n=i))
+        _postkeys('a')
+        pygame.event.post(pygame.event.Event(pygame.USEREVENT, n=3))
+        events = pygcurse._waitforevents((pygame.KEYDOWN,), pygame.time.get_ticks() + 50)
+        self.assertEqual([event.unicode for event in events], ['a'])
+        self.assertEqual([event.n for event in pygame.event.get(pygame.USEREVENT)], [0, 1, 2, 3])
+
+    def test_timeout_leaves_other_events(self):
+        for i in range(3):
+            pygame.event.post(pygame.event.Event(pygame.USEREVENT, n=i))
+        self.assertEqual(pygcurse._waitforevents((pygame.KEYDOWN,), pygame.time.get_ticks() + 30), [])
+        self.assertEqual([event.n for event in pygame.event.get(pygame.USEREVENT)], [0, 1, 2])
+
+    def test_input_calls_callback_while_idle(self):
+        surf = pygcurse.PygcurseSurface(20, 5)
+        surf.inputcursorblinking = False
+        calls = []
+        def callback():
+            calls.append(1)
+            if len(calls) == 3:
+                _postkeys('hi\r') # typed after input() has been waiting with no key events
+        self.assertEqual(surf.input(callbackfn=callback), 'hi')
+        self.assertTrue(len(calls) >= 3)
+
+
+def _type(inputobj, text):
+    # Sends inputobj the key down events of typing text.
+    for char in text:
+        inputobj.sendkeyevent(pygame.event.Event(pygame.KEYDOWN, key=ord(char), unicode=char, mod=0))
+
+
+class InputTest(unittest.TestCase):
+    def setUp(self):
+        self.surf = pygcurse.PygcurseSurface(40, 5)
+        self.surf.autoupdate = False
+
+    def test_paste_matches_typing(self):
+        text = 'ax \tbz\ty c' # (no digits, since interpretkeyevent() maps their keys to letters)
+        for whitelistchars, blacklistchars, maxlength in ((None, None, None), ('xyz ', None, None), (None, ' \t', None),
+                                                          ('', None, None), ('abc\t', 'b', None), (None, None, 5)):
+            typed = pygcurse.PygcurseInput(self.surf, x=0, y=0, maxlength=maxlength, whitelistchars=whitelistchars, blacklistchars=blacklistchars)
+            pasted = pygcurse.PygcurseInput(self.surf, x=0, y=1, maxlength=maxlength, whitelistchars=whitelistchars, blacklistchars=blacklistchars)
+            _type(typed, text)
+            pasted.paste(text)
+            self.assertEqual(pasted.text, typed.text, (whitelistchars, blacklistchars, maxlength))
+            self.assertEqual(pasted.cursor, typed.cursor)
+
+    def test_gapbuffer_matches_list(self):
+        rng = random.Random(18)
+        for trial in range(50):
+            buf = pygcurse._GapBuffer('start')
+            chars = list('start')
+            for i in range(60):
+                action, index = rng.choice(('insert', 'delete', 'replace', 'settext')), rng.randint(0, len(chars))
+                text = ''.join([rng.choice('abcdef') for j in range(rng.randint(0, 12))])
+                if action == 'insert':
+                    buf.insert(index, text)
+                    chars[index:index] = list(text)
+                elif action == 'delete':
+                    count = rng.randint(1, 5)
+                    buf.delete(index, count)
+                    del chars[index:index + count]
+                elif action == 'replace':
+                    buf.replace(index, text)
+                    chars[index:index + len(text)] = list(text)
+                else:
+                    buf.settext(text)
+                    chars = list(text)
+                self.assertEqual(buf.gettext(), ''.join(chars))
+                self.assertEqual(len(buf), len(chars))
+                start = rng.randint(0, len(chars))
+                end = rng.randint(start, len(chars) + 2)
+                self.assertEqual(buf.gettext(start, end), ''.join(chars[start:end]))
+
+    def _assertdrawnasfresh(self, surf, inputobj):
+        # Checks that what inputobj drew on surf over its edits is the same as drawing its text once on a new surface.
+        freshsurf = pygcurse.PygcurseSurface(surf.width, surf.height)
+        freshsurf.autoupdate = False
+        freshinput = pygcurse.PygcurseInput(freshsurf, inputobj.prompt, x=inputobj.startx, y=inputobj.starty, maxlength=40)
+        freshinput.text = inputobj.text
+        freshinput.cursor = inputobj.cursor
+        freshinput.update()
+        self.assertEqual(surf.getchars(), freshsurf.getchars(), repr(inputobj.text))
+        self.assertEqual(surf.inputcursor, freshsurf.inputcursor)
+
+    def test_incremental_redraw_matches_fresh_draw(self):
+        rng = random.Random(180)
+        keys = [pygame.K_LEFT, pygame.K_RIGHT, pygame.K_HOME, pygame.K_END, pygame.K_INSERT] + [pygame.K_BACKSPACE, pygame.K_DELETE] * 3
+        for trial in range(10):
+            surf = pygcurse.PygcurseSurface(12, 6)
+            surf.autoupdate = False
+            inputobj = pygcurse.PygcurseInput(surf, 'name? ', x=0, y=0, maxlength=40)
+            for i in range(60):
+                if rng.random() < 0.5:
+                    _type(inputobj, rng.choice('abcdefgh '))
+                else:
+                    inputobj.sendkeyevent(pygame.event.Event(pygame.KEYDOWN, key=rng.choice(keys), unicode='', mod=0))
+                if rng.random() < 0.5:
+                    inputobj.update() # so that some updates have several edits to redraw
+                    self._assertdrawnasfresh(surf, inputobj)
+
+
+def _randomtext(rng, numlines):
+    # Returns random lines of words (some empty, some long enough to wrap several times), separated by newlines.
+    lines = []
+    for i in range(numlines):
+        words = [''.join([rng.choice('abcdefg') for j in range(rng.randint(1, 9))]) for k in range(rng.choice((0, 1, 3, 8, 20)))]
+        lines.append(' '.join(words))
+    return '\n'.join(lines)
+
+
+class TextboxTest(unittest.TestCase):
+    def setUp(self):
+        self.surf = pygcurse.PygcurseSurface(30, 12)
+        self.surf.autoupdate = False
+
+    def _wrappedrows(self, text, width, wrap):
+        # All the rows of text, wrapped from scratch, along with the index of each line's first row.
+        rows = []
+        linestarts = []
+        for line in text.split('\n'):
+            linestarts.append(len(rows))
+            if wrap:
+                rows.extend(textwrap.wrap(line, width=width) or [''])
+            else:
+                rows.extend([line[i:i + width] for i in range(0, len(line), width)] or [''])
+        return rows, linestarts
+
+    def test_wrapping_as_text_is_appended(self):
+        rng = random.Random(20)
+        for wrap in (True, False):
+            box = pygcurse.PygcurseTextbox(self.surf, (1, 1, 20, 10), wrap=wrap)
+            for i in range(30):
+                if rng.random() < 0.8:
+                    box.text += rng.choice(('', '\n', ' ')) + _randomtext(rng, rng.randint(1, 3))
+                else:
+                    box.text = _randomtext(rng, 4) # not appended, so it's all wrapped again
+                rows, linestarts = self._wrappedrows(box.text, 18, wrap)
+                self.assertEqual(box.getdisplayedtext(), rows[:8])
+
+    def test_scrolling_matches_wrapped_rows(self):
+        rng = random.Random(21)
+        for wrap in (True, False):
+            box = pygcurse.PygcurseTextbox(self.surf, (1, 1, 20, 8), text=_randomtext(rng, 12), wrap=wrap)
+            box.scrollable = True
+            rows, linestarts = self._wrappedrows(box.text, 18, wrap)
+            height = 6
+            lastpos = max(0, len(rows) - height) # the position that shows the last row at the bottom
+            pos = 0
+            for i in range(80):
+                action = rng.choice(('up', 'down', 'down', 'line', 'percent', 'append'))
+                if action == 'up':
+                    amount = rng.randint(1, 10)
+                    box.scrollup(amount)
+                    pos = max(0, pos - amount)
+                elif action == 'down':
+                    amount = rng.randint(1, 10)
+                    box.scrolldown(amount)
+                    pos = min(pos + amount, lastpos)
+                elif action == 'line':
+                    line = rng.randint(0, len(linestarts) + 2)
+                    box.scrolltoline(line)
+                    pos = min(linestarts[min(line, len(linestarts) - 1)], lastpos)
+                elif action == 'percent':
+                    percent = rng.randint(0, 100)
+                    box.scrolltopercent(percent)
+                    line = box.text.count('\n', 0, int(len(box.text) * percent / 100.0))
+                    pos = min(linestarts[line], lastpos)
+                else:
+                    box.text += '\n' + _randomtext(rng, 3) # the scroll position stays where it is
+                    rows, linestarts = self._wrappedrows(box.text, 18, wrap)
+                    lastpos = max(0, len(rows) - height)
+                self.assertEqual(box.getdisplayedtext(), rows[pos:pos + height], (action, pos))
+
+            box.update()
+            self.assertEqual([row.rstrip() for row in self.surf.getchars((2, 2, 18, 6))], [row.rstrip() for row in rows[pos:pos + height]])
+
+            # scrolling down to one row past the end, or far past it, stops with the last row at the bottom
+            for amount in (lastpos + 1, lastpos + 1000):
+                box.scrolltoline(0)
+                box.scrolldown(amount)
+                self.assertEqual(box.getdisplayedtext(), rows[lastpos:], amount)
+
+
+class WidgetManagerTest(unittest.TestCase):
+    def _newsurface(self):
+        surf = pygcurse.PygcurseSurface(30, 14)
+        surf.autoupdate = False
+        for y in range(14):
+            surf.putchars(('%d' % y) * 30, 0, y, fgcolor=['red', 'lime', 'white'][y % 3], bgcolor=['navy', 'black'][y % 2])
+        return surf
+
+    def _allcells(self, surf):
+        return [[surf._cells.getcell(x, y) for x in range(surf.width)] for y in range(surf.height)]
+
+    def test_matches_full_redraw(self):
+        rng = random.Random(22)
+        surf = self._newsurface()
+        manager = pygcurse.PygcurseWidgetManager(surf)
+        boxes = [pygcurse.PygcurseTextbox(surf, (rng.randint(0, 20), rng.randint(0, 8), 10, 6), text='box %d' % i, shadow=(i == 1) and pygcurse.SOUTHEAST or None) for i in range(4)]
+        for box in boxes[:3]:
+            manager.add(box)
+        for i in range(60):
+            box = rng.choice(boxes)
+            action = rng.choice(('text', 'move', 'resize', 'color', 'shadow', 'remove', 'add', 'nothing'))
+            if action == 'text':
+                box.text = ' '.join(['word%d' % rng.randint(0, 99) for j in range(rng.randint(0, 6))])
+            elif action == 'move':
+                box.x, box.y = rng.randint(-3, 26), rng.randint(-3, 12)
+            elif action == 'resize':
+                box.width, box.height = rng.randint(3, 14), rng.randint(3, 8)
+            elif action == 'color':
+                box.bgcolor = rng.choice((pygame.Color(0, 0, 128), pygame.Color(128, 0, 0)))
+            elif action == 'shadow':
+                box.shadow = (box.shadow is None) and pygcurse.SOUTHEAST or None
+            elif action == 'remove':
+                manager.remove(box)
+            elif action == 'add':
+                manager.add(box)
+            manager.update()
+
+            # the same textboxes drawn from scratch over the same background
+            freshsurf = self._newsurface()
+            for widget in manager.widgets:
+                widget.update(freshsurf)
+            self.assertEqual(self._allcells(surf), self._allcells(freshsurf), (i, action))
+
+        surf.update()
+        self.assertEqual(_pixels(surf), _repaintedpixels(surf))
+
+    def test_unchanged_textboxes_are_not_redrawn(self):
+        surf = self._newsurface()
+        manager = pygcurse.PygcurseWidgetManager(surf)
+        boxes = [pygcurse.PygcurseTextbox(surf, (0, 0, 10, 5), text='a'), pygcurse.PygcurseTextbox(surf, (15, 5, 10, 5), text='b')]
+        for box in boxes:
+            manager.add(box)
+        manager.update()
+        surf.update()
+        manager.update()
+        self.assertEqual(surf.dirtycount, 0)
+        boxes[1].text = 'changed'
+        manager.update()
+        self.assertTrue(0 < surf.dirtycount <= 10 * 5) # only the second textbox's cells
+
+
+def _publicnames(cls):
+    return set([name for name in dir(cls) if not name.startswith('_')])
+
+
+def _surfaceapicalls(surf):
+    # One call for each public method and property of PygcurseSurface, keyed by name. Each returns (or raises) whatever the surface does.
+    font = pygame.font.Font(None, 20)
+    calls = {
+        'addlayer': lambda: surf.addlayer(),
+        'addshadow': lambda: surf.addshadow(region=(0, 0, 3, 2)),
+        'batch': lambda: surf.batch().__enter__() or surf.batch().__exit__(None, None, None),
+        'blitto': lambda: surf.blitto(pygame.Surface((400, 400))),
+        'clearatlases': lambda: surf.clearatlases(),
+        'clearglyphcache': lambda: surf.clearglyphcache(),
+        'clearscrollback': lambda: surf.clearscrollback(),
+        'darken': lambda: surf.darken(10, (0, 0, 2, 2)),
+        'drawline': lambda: surf.drawline((0, 0), (3, 2), '*'),
+        'drawlines': lambda: surf.drawlines([(0, 0), (3, 0), (3, 2)], closed=True),
+        'erase': lambda: surf.erase((0, 0, 2, 2)),
+        'fill': lambda: surf.fill('#', 'red', 'blue', (1, 1, 3, 2)),
+        'getchar': lambda: surf.getchar(1, 1),
+        'getcharatpixel': lambda: surf.getcharatpixel(1, 1),
+        'getchars': lambda: surf.getchars((0, 0, 3, 2)),
+        'getcoordinatesatpixel': lambda: surf.getcoordinatesatpixel(15, 15),
+        'getdisplayedcolors': lambda: surf.getdisplayedcolors(1, 1),
+        'getleftpixel': lambda: surf.getleftpixel(1),
+        'getnthcellfrom': lambda: surf.getnthcellfrom(0, 0, 12),
+        'getregion': lambda: surf.getregion((1, 1, 100, 100)),
+        'gettopleftpixel': lambda: surf.gettopleftpixel(1, 1),
+        'gettoppixel': lambda: surf.gettoppixel(1),
+        'input': lambda: surf.input(),
+        'invertbgcolor': lambda: surf.invertbgcolor((0, 0, 2, 2)),
+        'invertcolors': lambda: surf.invertcolors((0, 0, 2, 2)),
+        'invertfgcolor': lambda: surf.invertfgcolor((0, 0, 2, 2)),
+        'isonscreen': lambda: surf.isonscreen(1, 1),
+        'lighten': lambda: surf.lighten(10, (0, 0, 2, 2)),
+        'paint': lambda: surf.paint(1, 1, 'green'),
+        'paste': lambda: surf.paste((0, 0, 2, 2), surf, (2, 2, 2, 2)),
+        'pastechars': lambda: surf.pastechars((0, 0, 2, 2), surf, (2, 2, 2, 2)),
+        'pastecolor': lambda: surf.pastecolor((0, 0, 2, 2), surf, (2, 2, 2, 2)),
+        'pastetint': lambda: surf.pastetint((0, 0, 2, 2), surf, (2, 2, 2, 2)),
+        'popcursor': lambda: surf.pushcursor() or surf.popcursor(),
+        'pushcursor': lambda: surf.pushcursor() or surf.popcursor(),
+        'putchar': lambda: surf.putchar('@', 1, 1, 'red'),
+        'putchars': lambda: surf.putchars('abc', 1, 1),
+        'pygprint': lambda: surf.pygprint('hello', 'world'),
+        'raw_input': lambda: surf.raw_input(),
+        'read': lambda: surf.read(),
+        'removelayer': lambda: surf.removelayer(None),
+        'resize': lambda: surf.resize(4, 4),
+        'reversecolors': lambda: surf.reversecolors((0, 0, 2, 2)),
+        'scrollbackdown': lambda: surf.scrollbackdown(1),
+        'scrollbackup': lambda: surf.scrollbackup(1),
+        'setbgcolor': lambda: surf.setbgcolor('blue', (0, 0, 2, 2)),
+        'setbrightness': lambda: surf.setbrightness(20, (0, 0, 2, 2)),
+        'setfgcolor': lambda: surf.setfgcolor('red', (0, 0, 2, 2)),
+        'setscreencolors': lambda: surf.setscreencolors('white', 'navy', clear=True),
+        'settint': lambda: surf.settint(10, 0, 0, (0, 0, 2, 2)),
+        'subsurface': lambda: surf.subsurface((1, 1, 2, 2)).write('xy'),
+        'tint': lambda: surf.tint(10, 0, 0, (0, 0, 2, 2)),
+        'update': lambda: surf.update(),
+        'write': lambda: surf.write('hello\nthere\tworld ' * 3),
+        'writekeyevent': lambda: surf.writekeyevent(pygame.event.Event(pygame.KEYDOWN, key=ord('a'), unicode='a', mod=0)),
+        'font': lambda: setattr(surf, 'font', font),
+        'inputcursor': lambda: setattr(surf, 'inputcursor', (1, 1)),
+        'inputcursormode': lambda: setattr(surf, 'inputcursormode', 'box'),
+        'scrollbacksize': lambda: setattr(surf, 'scrollbacksize', 5),
+        'scrollbackoffset': lambda: setattr(surf, 'scrollbackoffset', 0),
+        'cursor': lambda: setattr(surf, 'cursor', (1, 1)),
+        'cursorx': lambda: setattr(surf, 'cursorx', 2),
+        'cursory': lambda: setattr(surf, 'cursory', 2),
+        'fgcolor': lambda: setattr(surf, 'fgcolor', 'yellow'),
+        'bgcolor': lambda: setattr(surf, 'bgcolor', 'black'),
+        'colors': lambda: setattr(surf, 'colors', ('yellow', 'black')),
+        'autoupdate': lambda: setattr(surf, 'autoupdate', True),
+        'tabsize': lambda: setattr(surf, 'tabsize', 4),
+        'width': lambda: setattr(surf, 'width', 4),
+        'height': lambda: setattr(surf, 'height', 4),
+        'size': lambda: setattr(surf, 'size', (4, 4)),
+        'pixelwidth': lambda: setattr(surf, 'pixelwidth', 100),
+        'pixelheight': lambda: setattr(surf, 'pixelheight', 100),
+        'pixelsize': lambda: setattr(surf, 'pixelsize', (100, 100)),
+    }
+    for name in ('antialias', 'atlasmode', 'bgarraymode', 'runrendering', 'autoblit'):
+        calls[name] = (lambda name: lambda: setattr(surf, name, not getattr(surf, name)))(name)
+    for name, value in (('atlascount', 8), ('glyphcachesize', 100), ('autodisplayupdate', False)):
+        calls[name] = (lambda name, value: lambda: setattr(surf, name, value))(name, value)
+    for name in _publicnames(pygcurse.PygcurseSurface):
+        if name not in calls: # the read-only properties
+            calls[name] = (lambda name: lambda: getattr(surf, name))(name)
+    return calls
+
+
+def _pixels(surf):
+    return pygame.image.tostring(surf.surface, 'RGBA')
+
+
+def _repaintedpixels(surf):
+    # Returns the pixels of surf after repainting every cell from scratch.
+    surf._resetfrontbuffer()
+    surf.update()
+    return _pixels(surf)
+
+
+def _cellpixel(surf, x, y):
+    # Returns the (r, g, b) color of the top-left pixel of the cell at x, y, which is always background (or the box cursor).
+    return tuple(surf.surface.get_at((surf.cellwidth * x, surf.cellheight * y)))[:3]
+
+
+def _rendermodes():
+    # Keyword arguments for the constructor and the rendering settings of each way of drawing the cells.
+    modes = [({}, {'runrendering': False}), ({}, {}), ({}, {'atlasmode': True})]
+    if pygcurse.numpy is not None:
+        modes += [({'usenumpy': True}, {}), ({'usenumpy': True}, {'bgarraymode': True}), ({}, {'bgarraymode': True, 'atlasmode': True})]
+    return modes
+
+
+class RenderTest(unittest.TestCase):
+    def _drawingsteps(self, surf):
+        # Each of these changes the cells in a different way. They are drawn one at a time by update().
+        return [lambda: surf.write('hello world\tTab\n' * 3),
+                lambda: surf.fill('x', 'red', 'blue', (2, 2, 5, 4)),
+                lambda: surf.tint(30, -20, 0, (0, 0, 10, 6)),
+                lambda: surf.putchars('abc def', 5, 5, fgcolor='yellow'),
+                lambda: surf.drawline((0, 0), (20, 9), '*', 'lime'),
+                lambda: surf.addshadow(region=(3, 3, 5, 5)),
+                lambda: surf.settint(0, 0, 0, (0, 0, 4, 4)),
+                lambda: surf.write('line\n' * 14), # scrolls the drawn pixels
+                lambda: surf.erase((1, 1, 3, 2)),
+                lambda: surf.invertcolors((0, 0, 6, 3)),
+                lambda: surf.paste((0, 0, 4, 2), surf, (10, 6, 4, 2)),
+                lambda: surf.setscreencolors('white', 'navy', clear=True),
+                lambda: surf.pygprint('hi', 'there', fgcolor='red'),
+                lambda: None]
+
+    def test_incremental_matches_full_repaint(self):
+        for kwargs, settings in _rendermodes():
+            surf = pygcurse.PygcurseSurface(24, 10, **kwargs)
+            surf.autoupdate = False
+            for name, value in settings.items():
+                setattr(surf, name, value)
+            for i, step in enumerate(self._drawingsteps(surf)):
+                before = surf.surface.copy()
+                step()
+                updatedrects = surf.update()
+                self.assertEqual(_pixels(surf), _repaintedpixels(surf), (kwargs, settings, i))
+
+                # everything outside of the returned rects is left as it was
+                for rect in updatedrects:
+                    before.fill((0, 0, 0, 0), rect)
+                    before.blit(surf.surface, rect, rect, special_flags=pygame.BLEND_RGBA_ADD) # copies the pixels exactly, instead of alpha blending them
+                self.assertEqual(pygame.image.tostring(before, 'RGBA'), _pixels(surf), (kwargs, settings, i))
+
+    def test_modes_draw_the_same(self):
+        drawn = []
+        for kwargs, settings in _rendermodes():
+            surf = pygcurse.PygcurseSurface(24, 10, **kwargs)
+            surf.autoupdate = False
+            surf.antialias = False # atlas mode blends antialiased edges over the background, which can round a channel differently by 1
+            for name, value in settings.items():
+                setattr(surf, name, value)
+            for step in self._drawingsteps(surf)[:-3]:
+                step()
+                surf.update()
+            drawn.append(_pixels(surf))
+        for i in range(1, len(drawn)):
+            self.assertTrue(drawn[i] == drawn[0], _rendermodes()[i])
+
+    def test_scrolled_pixels_match_cells(self):
+        for kwargs, settings in _rendermodes():
+            surf = pygcurse.PygcurseSurface(10, 4, **kwargs)
+            surf.autoupdate = False
+            for name, value in settings.items():
+                setattr(surf, name, value)
+            for y in range(4):
+                surf.putchars('row %d' % y, 0, y, fgcolor=['red', 'lime'][y % 2])
+            surf.update()
+            surf.cursor = (0, 3)
+            surf.write('\n\n') # moves the drawn pixels up two rows
+            surf.update()
+            surf.putchars('row 0', 0, 0, fgcolor='red') # what was drawn in this row before the scroll
+            surf.update()
+            self.assertEqual(_pixels(surf), _repaintedpixels(surf), (kwargs, settings))
+
+    def test_update_with_nothing_to_draw(self):
+        surf = pygcurse.PygcurseSurface(10, 5)
+        surf.autoupdate = False
+        surf.write('hello')
+        self.assertNotEqual(surf.update(), [])
+        self.assertEqual(surf.update(), [])
+        surf.putchar('h', 0, 0) # the same as what is drawn
+        self.assertEqual(surf.update(), [])
+
+
+class DisplayedCellsTest(unittest.TestCase):
+    def setUp(self):
+        self.surf = pygcurse.PygcurseSurface(10, 5)
+        self.surf.autoupdate = False
+        self.surf.inputcursorblinking = False
+        self.surf.inputcursormode = 'box'
+        self.surf.fill('.', 'white', 'blue')
+
+    def test_input_cursor_under_layer(self):
+        layer = self.surf.addlayer()
+        layer.putchar('L', 0, 0, 'yellow', 'red')
+        self.surf.update()
+        self.assertEqual(self.surf.getdisplayedcolors(0, 0), (pygcurse.colornames['yellow'], pygcurse.colornames['red']))
+        self.surf.inputcursor = (0, 0)
+        self.surf.update()
+        self.assertEqual(_cellpixel(self.surf, 0, 0), (255, 255, 0)) # the box cursor swaps the layer's colors, not the surface's
+        self.surf.inputcursor = (3, 3)
+        self.surf.update()
+        self.assertEqual(_cellpixel(self.surf, 0, 0), (255, 0, 0)) # repainted with the layer's cell
+        self.assertEqual(_pixels(self.surf), _repaintedpixels(self.surf))
+
+    def test_input_cursor_in_scrollback_view(self):
+        self.surf.scrollbacksize = 10
+        self.surf.write('\n' * 6, fgcolor='white', bgcolor='blue') # scrolls two blue rows into the history
+        self.surf.fill(' ', 'white', 'green')
+        self.surf.scrollbackup(2)
+        self.surf.update()
+        self.assertEqual(self.surf.getdisplayedcolors(0, 0), (pygcurse.colornames['white'], pygcurse.colornames['blue']))
+        self.surf.inputcursor = (0, 0)
+        self.surf.update()
+        self.surf.inputcursor = (3, 4)
+        self.surf.update()
+        self.assertEqual(_cellpixel(self.surf, 0, 0), (0, 0, 255)) # the history row, not the live green one
+        self.assertEqual(_pixels(self.surf), _repaintedpixels(self.surf))
+
+    def test_subsurface_colors_include_layers(self):
+        layer = self.surf.addlayer()
+        layer.putchar('L', 3, 2, 'yellow', 'red')
+        sub = self.surf.subsurface((2, 1, 4, 3))
+        self.assertEqual(sub.getdisplayedcolors(1, 1), (pygcurse.colornames['yellow'], pygcurse.colornames['red']))
+        self.assertEqual(sub.getdisplayedcolors(4, 1), (None, None))
+
+
+class LayerTest(unittest.TestCase):
+    COLORS = ['red', 'lime', 'white', 'navy', 'yellow']
+
+    def _randomcolors(self, rng):
+        return rng.choice(self.COLORS), rng.choice(self.COLORS + [pygcurse.ERASECOLOR])
+
+    def _composite(self, base, layers):
+        # The reference model: each visible layer's cells (a dict of (x, y) to (char, fgcolor, bgcolor)) drawn over the base cells, from the lowest z to the highest.
+        cells = dict(base)
+        for layer, layercells in sorted(layers, key=lambda item: item[0].z):
+            if not layer.visible:
+                continue
+            for xy, (char, fgcolor, bgcolor) in layercells.items():
+                if pygame.Color(bgcolor).a == 0:
+                    bgcolor = cells[xy][2] # only covers the character and foreground color
+                cells[xy] = (char, fgcolor, bgcolor)
+        return cells
+
+    def test_matches_reference_model(self):
+        width, height = 12, 6
+        for kwargs, settings in _rendermodes():
+            rng = random.Random(23)
+            surf = pygcurse.PygcurseSurface(width, height, **kwargs)
+            reference = pygcurse.PygcurseSurface(width, height, **kwargs)
+            for s in (surf, reference):
+                s.autoupdate = False
+                for name, value in settings.items():
+                    setattr(s, name, value)
+            surf.fill('.', 'white', 'blue')
+            base = dict([((x, y), ('.', 'white', 'blue')) for x in range(width) for y in range(height)])
+            layers = []
+            for i in range(80):
+                action = layers and rng.choice(('base', 'putchars', 'putchars', 'fill', 'erase', 'z', 'visible', 'remove', 'add')) or 'add'
+                layer, layercells = layers and rng.choice(layers) or (None, None)
+                x, y = rng.randint(-2, width - 1), rng.randint(0, height - 1)
+                region = (rng.randint(0, width - 1), rng.randint(0, height - 1), rng.randint(1, 5), rng.randint(1, 3))
+                regioncells = [(ix, iy) for ix in range(region[0], min(width, region[0] + region[2])) for iy in range(region[1], min(height, region[1] + region[3]))]
+                if action == 'base':
+                    fgcolor, bgcolor = rng.choice(self.COLORS), rng.choice(self.COLORS)
+                    x = rng.randint(0, width - 4) # the surface's putchars() wraps instead of leaving characters out
+                    surf.putchars('base', x, y, fgcolor, bgcolor)
+                    base.update([((x + j, y), ('base'[j], fgcolor, bgcolor)) for j in range(4)])
+                elif action == 'putchars':
+                    fgcolor, bgcolor = self._randomcolors(rng)
+                    layer.putchars('@#%', x, y, fgcolor, bgcolor)
+                    layercells.update([((x + j, y), ('@#%'[j], fgcolor, bgcolor)) for j in range(3) if 0 <= x + j < width])
+                elif action == 'fill':
+                    fgcolor, bgcolor = self._randomcolors(rng)
+                    layer.fill('=', fgcolor, bgcolor, region)
+                    layercells.update([(xy, ('=', fgcolor, bgcolor)) for xy in regioncells])
+                elif action == 'erase':
+                    layer.erase(region)
+                    for xy in regioncells:
+                        layercells.pop(xy, None)
+                elif action == 'z':
+                    layer.z = rng.random() * 10
+                elif action == 'visible':
+                    layer.visible = not layer.visible
+                elif action == 'remove':
+                    surf.removelayer(layer)
+                    layers.remove((layer, layercells))
+                elif action == 'add':
+                    layers.append((surf.addlayer(rng.random() * 10), {}))
+                surf.update()
+
+                # the same cells drawn directly on a surface without layers
+                for (cx, cy), (char, fgcolor, bgcolor) in self._composite(base, layers).items():
+                    reference.putchar(char, cx, cy, fgcolor, bgcolor)
+                reference.update()
+                self.assertEqual(_pixels(surf), _pixels(reference), (kwargs, settings, i, action))
+            self.assertEqual(_pixels(surf), _repaintedpixels(surf), (kwargs, settings))
+
+    def test_moving_sprite_only_repaints_its_cells(self):
+        surf = pygcurse.PygcurseSurface(10, 5)
+        surf.autoupdate = False
+        surf.fill('.', 'white', 'blue')
+        sprite = surf.addlayer()
+        surf.update()
+        for x in range(8):
+            sprite.erase()
+            sprite.putchars('<>', x, 2, 'yellow')
+            rects = surf.update()
+            self.assertTrue(len(rects) <= 3, rects) # the sprite's old and new cells
+            self.assertEqual(surf.getdisplayedcolors(x, 2), (pygcurse.colornames['yellow'], pygcurse.colornames['blue']))
+        self.assertEqual(_pixels(surf), _repaintedpixels(surf))
+
+    def test_reordering_layers(self):
+        surf = pygcurse.PygcurseSurface(10, 5)
+        surf.autoupdate = False
+        lower, upper = surf.addlayer(), surf.addlayer()
+        lower.fill('L', 'white', 'red', (0, 0, 6, 3))
+        upper.fill('U', 'white', 'lime', (3, 1, 6, 3))
+        surf.update()
+        self.assertEqual(_cellpixel(surf, 4, 2), (0, 255, 0))
+        lower.z = upper.z + 1
+        surf.update()
+        self.assertEqual(_cellpixel(surf, 4, 2), (255, 0, 0))
+        lower.visible = False
+        surf.update()
+        self.assertEqual(_cellpixel(surf, 4, 2), (0, 255, 0))
+        self.assertEqual(_pixels(surf), _repaintedpixels(surf))
+
+
+class SubsurfaceTest(unittest.TestCase):
+    UNSUPPORTED = ('addlayer', 'input', 'raw_input', 'resize', 'scrollbacksize', 'width', 'height', 'size', 'pixelwidth', 'pixelheight', 'pixelsize')
+
+    def setUp(self):
+        self.parent = pygcurse.PygcurseSurface(20, 10)
+        self.parent.autoupdate = False
+        self.sub = self.parent.subsurface((2, 3, 10, 5))
+
+    def test_every_inherited_public_member(self):
+        for name, call in sorted(_surfaceapicalls(self.sub).items()):
+            if name in self.UNSUPPORTED:
+                try:
+                    call()
+                except Exception as exc:
+                    self.assertEqual(type(exc), Exception, name) # a clear error, not an AttributeError from a missing attribute
+                else:
+                    self.fail('%s should raise an Exception on a subsurface' % name)
+            else:
+                call()
+
+    def test_draws_on_parent_cells(self):
+        self.sub.write('hello')
+        self.assertEqual(self.parent.getchars((2, 3, 5, 1)), ['hello'])
+        self.sub.fill('#', region=(8, 4, 5, 5))
+        self.assertEqual(self.parent.getchar(11, 7), '#')
+        self.assertEqual(self.parent.getchar(12, 7), None) # cut off at the edge of the region
+
+    def test_parent_settings_are_shared(self):
+        self.assertEqual(self.sub.cellsize, self.parent.cellsize)
+        font = pygame.font.Font(None, 24)
+        self.sub.font = font
+        self.assertTrue(self.parent.font is font)
+        self.assertEqual(self.sub.surface.get_size(), (10 * self.parent.cellwidth, 5 * self.parent.cellheight))
+        self.sub.atlasmode = True
+        self.assertTrue(self.parent.atlasmode)
+
+    def test_inputcursor_uses_subsurface_coordinates(self):
+        self.sub.inputcursor = (1, 1)
+        self.assertEqual(self.parent.inputcursor, (3, 4))
+        self.assertEqual(self.sub.inputcursor, (1, 1))
+        self.sub.inputcursor = (20, 20) # off the subsurface, so ignored
+        self.assertEqual(self.parent.inputcursor, (3, 4))
+
+    def test_surface_shares_pixels(self):
+        self.sub.fill(' ', bgcolor=(255, 0, 0), region=(0, 0, 1, 1))
+        self.sub.update()
+        self.assertEqual(self.sub.surface.get_at((0, 0)), self.parent.surface.get_at((2 * self.parent.cellwidth, 3 * self.parent.cellheight)))
+        self.assertEqual(tuple(self.sub.surface.get_at((0, 0)))[:3], (255, 0, 0))
+
+
+class PadTest(unittest.TestCase):
+    NOPIXELS = ('blitto', 'getcharatpixel', 'getcoordinatesatpixel', 'gettopleftpixel', 'gettoppixel', 'getleftpixel',
+                'font', 'cellwidth', 'cellheight', 'cellsize', 'surface', 'pixelwidth', 'pixelheight', 'pixelsize', 'pixelrect',
+                'antialias', 'runrendering', 'atlasmode', 'atlascount', 'bgarraymode', 'autoblit', 'autodisplayupdate',
+                'glyphcachesize', 'glyphcachehits', 'glyphcachemisses')
+    UNSUPPORTED = NOPIXELS + ('addlayer', 'input', 'raw_input', 'resize', 'scrollbacksize', 'width', 'height', 'size', 'inputcursor', 'inputcursormode')
+
+    def setUp(self):
+        self.pad = pygcurse.PygcursePad(300, 200)
+
+    def test_every_inherited_public_member(self):
+        for name, call in sorted(_surfaceapicalls(self.pad).items()):
+            if name in self.UNSUPPORTED:
+                try:
+                    call()
+                except Exception as exc:
+                    self.assertEqual(type(exc), Exception, name) # a clear error, not an AttributeError from a missing attribute
+                else:
+                    self.fail('%s should raise an Exception on a pad' % name)
+            else:
+                call()
+
+    def _assertpixelsmatchrepaint(self, surf):
+        drawn = pygame.image.tostring(surf.surface, 'RGBA')
+        surf._resetfrontbuffer()
+        surf.update()
+        self.assertEqual(drawn, pygame.image.tostring(surf.surface, 'RGBA'))
+
+    def _fillpad(self):
+        for y in range(40):
+            self.pad.putchars(('%d.#' % y) * 10, 0, y, ['red', 'green', 'white'][y % 3], 'black')
+
+    def test_refresh_pans(self):
+        self._fillpad()
+        surf = pygcurse.PygcurseSurface(20, 10)
+        surf.autoupdate = False
+        for padx, pady in ((0, 0), (1, 0), (3, 2), (2, 1), (2, 1), (30, 30)):
+            self.pad.refresh(surf, padx, pady, (2, 2, 12, 6))
+            surf.update()
+            self.assertEqual(surf.getchars((2, 2, 12, 1)), self.pad.getchars((padx, pady, 12, 1)))
+            self._assertpixelsmatchrepaint(surf)
+
+    def test_refresh_onto_subsurface(self):
+        self._fillpad()
+        surf = pygcurse.PygcurseSurface(20, 10)
+        surf.autoupdate = False
+        sub = surf.subsurface((3, 2, 12, 6))
+        for padx, pady in ((0, 0), (1, 0), (1, 2), (0, 1)):
+            self.pad.refresh(sub, padx, pady)
+            surf.update()
+            self.assertEqual(sub.getchars(), self.pad.getchars((padx, pady, 12, 6)))
+            self._assertpixelsmatchrepaint(surf)
+
+    def test_refresh_onto_pad(self):
+        self._fillpad()
+        otherpad = pygcurse.PygcursePad(10, 5)
+        self.pad.refresh(otherpad, 0, 0)
+        self.pad.refresh(otherpad, 1, 1)
+        self.assertEqual(otherpad.getchars(), self.pad.getchars((1, 1, 10, 5)))
+
+
+if __name__ == '__main__':
+    unittest.main()